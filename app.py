@@ -1,9 +1,26 @@
 import streamlit as st
 import pandas as pd
 import json
+import os
 from datetime import datetime
 import re
-from typing import List, Dict, Any
+import time
+import uuid
+from typing import List, Dict, Any, Optional
+
+from techmart.api import start_api_server
+from techmart.cart import Cart
+from techmart.catalog import format_price, get_catalog, watch_catalog
+from techmart.chat_history import ChatTranscript
+from techmart.compare import table_html
+from techmart.engine import ChatEngine, Event
+from techmart.filters import SearchFilters, describe
+from techmart.gallery import ALL, SORT_OPTIONS, GalleryQuery, card_html, page_rows, select_rows
+from techmart.inventory import get_inventory
+from techmart.metrics import METRICS, count, span, timed
+from techmart.query_cache import QUERY_CACHE
+from techmart.state import SessionSync, get_state_backend
+from techmart.trace import get_trace_recorder
 
 # Page configuration
 st.set_page_config(
@@ -14,7 +31,8 @@ st.set_page_config(
 )
 
 # Custom CSS for better styling
-st.markdown("""
+with span('render.css'):
+    st.markdown("""
 <style>
     .main-header {
         background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
@@ -75,228 +93,186 @@ st.markdown("""
         gap: 10px;
         margin-top: 10px;
     }
+    .comparison-table {
+        width: 100%;
+        border-collapse: collapse;
+        margin: 1rem 0;
+    }
+    .comparison-table th, .comparison-table td {
+        border: 1px solid #dee2e6;
+        padding: 0.5rem;
+        text-align: left;
+        vertical-align: top;
+    }
+    .comparison-table .best-value {
+        background-color: #e8f5e8;
+        font-weight: bold;
+    }
 </style>
-""", unsafe_allow_html=True)
+    """, unsafe_allow_html=True)
 
 class EcommerceBot:
     def __init__(self):
+        # Shared across sessions; only reloaded when products.csv changes
+        self.catalog = get_catalog()
         self.products_df = self.load_products()
-        if self.products_df.empty:
-            self.products_df = self.create_sample_csv()
+        self.inventory = get_inventory(self.catalog)
+        self.engine = ChatEngine(self.catalog, self.inventory)
+        # None unless TECHMART_TRACE names a trace file
+        self.trace = get_trace_recorder()
         self.initialize_session_state()
+        # Keep this session's stock holds alive while it is active
+        self.inventory.touch(st.session_state.session_id)
     
-    def load_products(self):
-        """Load products from CSV file"""
-        try:
-            return pd.read_csv('products.csv')
-        except FileNotFoundError:
-            # Don't show error in production, just return empty DataFrame
-            return pd.DataFrame()
-    
-    def create_sample_csv(self):
-        """Create sample CSV data for fallback"""
-        sample_data = {
-            'id': list(range(1, 11)),
-            'name': [
-                'HP Pavilion Gaming 15', 'Dell Inspiron 15 3000', 'Lenovo ThinkPad E14', 'HP EliteBook 840 G8',
-                'Dell XPS 13 9310', 'Lenovo Legion 5 15ACH6H', 'HP Spectre x360 14', 'Dell Latitude 5520',
-                'Lenovo IdeaPad 3 15ITL6', 'HP Omen 15-en1013dx'
-            ],
-            'brand': ['HP', 'Dell', 'Lenovo', 'HP', 'Dell', 'Lenovo', 'HP', 'Dell', 'Lenovo', 'HP'],
-            'category': [
-                'Gaming Laptop', 'Budget Laptop', 'Business Laptop', 'Business Laptop', 'Ultrabook',
-                'Gaming Laptop', '2-in-1 Laptop', 'Business Laptop', 'Budget Laptop', 'Gaming Laptop'
-            ],
-            'price': [425000, 365000, 520000, 685000, 735000, 615000, 695000, 465000, 385000, 575000],
-            'stock_quantity': [15, 25, 12, 8, 6, 10, 7, 18, 22, 14],
-            'specifications': [
-                'Intel Core i5-11300H, 8GB RAM, 512GB SSD, NVIDIA GTX 1650, 15.6" FHD Display, Windows 11',
-                'Intel Core i3-1115G4, 4GB RAM, 1TB HDD, Intel UHD Graphics, 15.6" HD Display, Windows 11',
-                'Intel Core i5-1135G7, 8GB RAM, 256GB SSD, Intel Iris Xe Graphics, 14" FHD Display, Windows 11 Pro',
-                'Intel Core i7-1165G7, 16GB RAM, 512GB SSD, Intel Iris Xe Graphics, 14" FHD Display, Windows 11 Pro',
-                'Intel Core i7-1165G7, 16GB RAM, 512GB SSD, Intel Iris Xe Graphics, 13.3" 4K OLED Display, Windows 11',
-                'AMD Ryzen 5 5600H, 8GB RAM, 512GB SSD, NVIDIA RTX 3060, 15.6" FHD 120Hz Display, Windows 11',
-                'Intel Core i7-1165G7, 16GB RAM, 1TB SSD, Intel Iris Xe Graphics, 13.5" 3K2K OLED Touchscreen, Windows 11',
-                'Intel Core i5-1135G7, 8GB RAM, 256GB SSD, Intel Iris Xe Graphics, 15.6" FHD Display, Windows 11 Pro',
-                'Intel Core i3-1115G4, 4GB RAM, 1TB HDD, Intel UHD Graphics, 15.6" HD Display, Windows 11',
-                'AMD Ryzen 7 5800H, 8GB RAM, 512GB SSD, NVIDIA RTX 3060, 15.6" FHD 144Hz Display, Windows 11'
-            ],
-            'image_url': [f'https://via.placeholder.com/300x200/{"0073e6" if brand == "HP" else "007DB8" if brand == "Dell" else "E2231A"}/FFFFFF?text={brand}+Laptop' 
-                         for brand in ['HP', 'Dell', 'Lenovo', 'HP', 'Dell', 'Lenovo', 'HP', 'Dell', 'Lenovo', 'HP']]
-        }
-        return pd.DataFrame(sample_data)
+    def load_products(self) -> pd.DataFrame:
+        """Return the shared product table (parsed once per process)"""
+        return self.catalog.df
     
     def initialize_session_state(self):
         """Initialize session state variables"""
+        # Cart, chat and results live in the state backend too, so any worker can resume the session
+        if '_state_sync' not in st.session_state:
+            session_id = self._url_session_id() or uuid.uuid4().hex
+            st.session_state.session_id = session_id
+            st.session_state._state_sync = SessionSync(get_state_backend(), session_id)
+            self._set_url_session_id(session_id)
+        st.session_state._state_sync.pull(st.session_state)
+        
         session_vars = {
-            'chat_history': [],
-            'cart': [],
+            'chat_extra': 0,
             'current_order': {},
             'user_name': None,
             'viewing_product': None,
             'redirect_to_checkout': False,
             'last_results': [],
             'show_search_results_buttons': False,
-            'search_results_products': []
+            'search_results_products': [],
+            'comparing': [],
+            'gallery_page': 1
         }
         
         for key, default_value in session_vars.items():
             if key not in st.session_state:
                 st.session_state[key] = default_value
+        
+        # Per-session objects must not be shared through the defaults dict
+        if 'chat_history' not in st.session_state:
+            st.session_state.chat_history = ChatTranscript()
+        if 'cart' not in st.session_state:
+            st.session_state.cart = Cart()
+        if 'search_filters' not in st.session_state:
+            st.session_state.search_filters = SearchFilters()
+    
+    @staticmethod
+    def _url_session_id() -> Optional[str]:
+        """The ``sid`` query parameter of the page URL, if any"""
+        if hasattr(st, 'query_params'):
+            return st.query_params.get('sid')
+        return (st.experimental_get_query_params().get('sid') or [None])[0]
+    
+    @staticmethod
+    def _set_url_session_id(session_id: str) -> None:
+        """Put the session id in the URL so a reload (or another worker) resumes the session"""
+        if hasattr(st, 'query_params'):
+            st.query_params['sid'] = session_id
+        else:
+            st.experimental_set_query_params(sid=session_id)
+    
+    def save_session_state(self):
+        """Write this rerun's changes to the shared keys (one backend write at most)"""
+        try:
+            st.session_state._state_sync.push(st.session_state)
+        except Exception:
+            st.warning("Your session could not be saved; it may not survive a page reload.")
     
     def search_products(self, query: str) -> List[Dict]:
         """Search products based on query"""
-        if self.products_df.empty:
-            return []
-        
-        query_lower = query.lower()
-        
-        # Search in multiple columns
-        mask = (
-            self.products_df['name'].str.lower().str.contains(query_lower, na=False) |
-            self.products_df['brand'].str.lower().str.contains(query_lower, na=False) |
-            self.products_df['category'].str.lower().str.contains(query_lower, na=False) |
-            self.products_df['specifications'].str.lower().str.contains(query_lower, na=False)
-        )
-        
-        results = self.products_df[mask].to_dict('records')
-        return results
+        return self.engine.search_products(query)
     
     def format_price(self, price: float) -> str:
         """Format price in Nigerian Naira"""
-        return f"₦{price:,.2f}"
+        return format_price(price)
     
     def process_user_message(self, message: str) -> str:
         """Process user message and generate bot response"""
-        message_lower = message.lower()
-        
-        # Reset search results buttons when new message is processed
-        st.session_state.show_search_results_buttons = False
-        st.session_state.search_results_products = []
+        start = time.perf_counter()
+        response = self.engine.process_message(st.session_state, message)
+        if self.trace is not None:
+            self.trace.message(st.session_state.session_id, message, response, time.perf_counter() - start)
         
-        # Handle name collection first
-        if not st.session_state.user_name:
-            if any(greeting in message_lower for greeting in ['hi', 'hello', 'hey', 'good morning', 'good afternoon']):
-                return "Hello! Welcome to TechMart! 👋 What's your name?"
-            
-            # Try to extract name from various patterns
-            name_patterns = [
-                r"(?:my name is|i'm|i am|call me)\s+([a-zA-Z]+)",
-                r"^([a-zA-Z]+)$",  # Just a single word (likely a name)
-            ]
-            
-            for pattern in name_patterns:
-                match = re.search(pattern, message_lower)
-                if match:
-                    name = match.group(1).capitalize()
-                    st.session_state.user_name = name
-                    return f"Nice to meet you, {name}! 😊 I'm here to help you find the perfect laptop. You can ask me about our HP, Dell, or Lenovo laptops, or tell me what you're looking for."
-            
-            return "Could you please tell me your name? You can say 'My name is [Your Name]' or just type your name."
-        
-        # Greetings (after name is known)
-        if any(greeting in message_lower for greeting in ['hi', 'hello', 'hey', 'good morning', 'good afternoon']):
-            return f"Hello {st.session_state.user_name}! How can I help you find the perfect laptop today? 😊"
-        
-        # Product search
-        if any(keyword in message_lower for keyword in ['laptop', 'hp', 'dell', 'lenovo', 'search', 'find', 'looking for', 'gaming', 'business', 'budget']):
-            results = self.search_products(message)
-            if results:
-                st.session_state.last_results = results[:5]  # Store results for potential ordering
-                st.session_state.show_search_results_buttons = True
-                st.session_state.search_results_products = results[:5]
-                
-                response = f"Great choice, {st.session_state.user_name}! I found {len(results)} laptops that match your search:\n\n"
-                for idx, product in enumerate(results[:5], 1):
-                    response += f"{idx}. **{product['name']}**\n"
-                    response += f"   Price: {self.format_price(product['price'])}\n"
-                    response += f"   Stock: {product['stock_quantity']} units available\n\n"
-                response += "You can use the buttons below to view details or add products to your cart!"
-                return response
-            else:
-                return f"Sorry {st.session_state.user_name}, I couldn't find any laptops matching your search. Could you try different keywords? We have HP, Dell, and Lenovo laptops available."
+        # Search results buttons only follow the reply that produced them
+        st.session_state.show_search_results_buttons = bool(response.product_ids)
+        st.session_state.search_results_products = self.catalog.get_products(response.product_ids)
+        if response.intent == 'compare' and response.product_ids:
+            st.session_state.comparing = response.product_ids
         
-        # Handle product ordering from search results
-        if 'last_results' in st.session_state and st.session_state.last_results:
-            for product in st.session_state.last_results:
-                if any(word in message_lower for word in product['name'].lower().split()):
-                    if 'add' in message_lower or 'cart' in message_lower or 'buy' in message_lower:
-                        self.add_to_cart(product['id'])
-                        return f"Perfect! I've added {product['name']} to your cart. Would you like to continue shopping or proceed to checkout?"
-        
-        # Price range queries
-        price_match = re.search(r'(\d+)k?\s*-\s*(\d+)k?|under\s*(\d+)k?|below\s*(\d+)k?', message_lower)
-        if price_match or 'price' in message_lower or 'cost' in message_lower or 'budget' in message_lower:
-            return f"Great question, {st.session_state.user_name}! Our laptops range from ₦350,000 to ₦750,000. What's your budget range? I can help you find something perfect within your budget!"
-        
-        # Cart inquiries
-        if 'cart' in message_lower or 'checkout' in message_lower:
-            if st.session_state.cart:
-                total = sum(item['price'] * item['quantity'] for item in st.session_state.cart)
-                response = f"Here's your cart, {st.session_state.user_name}:\n\n"
-                for item in st.session_state.cart:
-                    response += f"• {item['name']} x{item['quantity']} - {self.format_price(item['price'] * item['quantity'])}\n"
-                response += f"\n**Total: {self.format_price(total)}**\n\nReady to checkout?"
-                return response
-            else:
-                return f"Your cart is empty, {st.session_state.user_name}. Browse our products and add some laptops to your cart!"
-        
-        # Help
-        if 'help' in message_lower:
-            return f"""I'm here to help you, {st.session_state.user_name}! Here's what I can do:
-            
-            • Find laptops by brand (HP, Dell, Lenovo)
-            • Search by specifications or price range
-            • Help you add products to your cart
-            • Provide product details and comparisons
-            • Assist with your order
-            
-            Just ask me anything about our laptops!"""
-        
-        # Default response
-        return f"I'm here to help you find the perfect laptop, {st.session_state.user_name}! You can ask me about specific brands, price ranges, or specifications. What are you looking for today?"
+        for event in response.events:
+            self._show_event(event)
+        return response.text
     
-    def add_to_cart(self, product_id: int):
-        """Add product to cart and redirect to checkout"""
-        try:
-            product = self.products_df[self.products_df['id'] == product_id].iloc[0]
-            
-            # Check if product already in cart
-            for item in st.session_state.cart:
-                if item['id'] == product_id:
-                    item['quantity'] += 1
-                    st.success(f"Added another {product['name']} to cart!")
-                    st.session_state.redirect_to_checkout = True
-                    return
-            
-            # Add new item to cart
-            cart_item = {
-                'id': product['id'],
-                'name': product['name'],
-                'price': product['price'],
-                'quantity': 1,
-                'brand': product['brand']
-            }
-            st.session_state.cart.append(cart_item)
-            st.success(f"Added {product['name']} to cart!")
+    def _show_event(self, event: Event) -> None:
+        """Surface an engine side effect in the UI"""
+        if event.kind == 'cart_add':
+            st.success(event.message)
             st.session_state.redirect_to_checkout = True
+        elif event.kind == 'out_of_stock':
+            st.warning(event.message)
+        else:
+            st.error(event.message)
+    
+    def add_to_cart(self, product_id: int, action: str = 'cart') -> bool:
+        """Reserve a unit, add product to cart and redirect to checkout
+
+        ``action`` names the button (its key prefix) in recorded traces.
+        """
+        try:
+            start = time.perf_counter()
+            event = self.engine.add_to_cart(st.session_state, product_id)
+            self.record_action(action, product_id, [event], time.perf_counter() - start)
+            self._show_event(event)
+            return event.kind == 'cart_add'
         except Exception as e:
             st.error("Error adding product to cart. Please try again.")
+            return False
     
-    def view_product(self, product_id: int):
+    def change_quantity(self, action: str, product_id: int, quantity: int) -> None:
+        """Set a cart line's quantity through the engine, which keeps the stock hold in step
+
+        Reruns when the cart changed; otherwise the reason stays on screen.
+        """
+        start = time.perf_counter()
+        event = self.engine.set_quantity(st.session_state, product_id, quantity)
+        self.record_action(action, product_id, [event], time.perf_counter() - start)
+        if event.kind in ('cart_update', 'cart_remove'):
+            st.rerun()
+        st.sidebar.warning(event.message)
+    
+    def view_product(self, product_id: int, action: str = 'view'):
         """Set product to view"""
         st.session_state.viewing_product = product_id
+        self.record_action(action, product_id, [])
+    
+    def record_action(self, action: str, product_id: Optional[int], events: Optional[List[Event]] = None,
+                      seconds: float = 0.0) -> None:
+        """Append a button action to the trace, when tracing is on"""
+        if self.trace is not None:
+            self.trace.action(st.session_state.session_id, action, product_id, events, seconds)
     
     def display_search_results_buttons(self):
         """Display interactive buttons for search results"""
         if st.session_state.show_search_results_buttons and st.session_state.search_results_products:
             st.markdown("### Quick Actions for Search Results")
             
+            results = st.session_state.search_results_products
+            if len(results) >= 2 and st.button("📊 Compare These", key="compare_results"):
+                st.session_state.comparing = [product['id'] for product in results]
+                st.rerun()
+            
             for product in st.session_state.search_results_products:
                 st.markdown(f"""
                 <div class="search-result-card">
                     <h5>{product['name']}</h5>
-                    <p><strong>Price:</strong> {self.format_price(product['price'])} | <strong>Stock:</strong> {product['stock_quantity']} units</p>
+                    <p><strong>Price:</strong> {self.format_price(product['price'])} | <strong>Stock:</strong> {self.inventory.available(product['id'])} units</p>
                     <p><small>{product['specifications'][:100]}...</small></p>
                 </div>
                 """, unsafe_allow_html=True)
@@ -305,20 +281,20 @@ class EcommerceBot:
                     col1, col2 = st.columns(2)
                     with col1:
                         if st.button(f"View Details", key=f"search_view_{product['id']}", type="secondary"):
-                            self.view_product(product['id'])
+                            self.view_product(product['id'], 'search_view')
                             st.rerun()
                     
                     with col2:
                         if st.button(f"Add to Cart", key=f"search_cart_{product['id']}", type="primary"):
-                            self.add_to_cart(product['id'])
+                            self.add_to_cart(product['id'], 'search_cart')
                             st.rerun()
                 except Exception as e:
                     # Fallback to simple buttons without columns
                     if st.button(f"View Details - {product['name']}", key=f"search_view_fallback_{product['id']}"):
-                        self.view_product(product['id'])
+                        self.view_product(product['id'], 'search_view')
                         st.rerun()
                     if st.button(f"Add to Cart - {product['name']}", key=f"search_cart_fallback_{product['id']}"):
-                        self.add_to_cart(product['id'])
+                        self.add_to_cart(product['id'], 'search_cart')
                         st.rerun()
                 
                 st.markdown("---")
@@ -327,7 +303,10 @@ class EcommerceBot:
         """Display detailed product view"""
         if st.session_state.viewing_product:
             try:
-                product = self.products_df[self.products_df['id'] == st.session_state.viewing_product].iloc[0]
+                product = self.catalog.get_product(st.session_state.viewing_product)
+                if product is None:
+                    st.session_state.viewing_product = None
+                    return
                 
                 st.markdown(f"""
                 <div class="product-view-modal">
@@ -335,7 +314,7 @@ class EcommerceBot:
                     <h4>Brand: {product['brand']}</h4>
                     <h4>Category: {product['category']}</h4>
                     <h3 class="price-tag">{self.format_price(product['price'])}</h3>
-                    <p><strong>Stock Available:</strong> {product['stock_quantity']} units</p>
+                    <p><strong>Stock Available:</strong> {self.inventory.available(product['id'])} units</p>
                     <h4>Full Specifications:</h4>
                     <p>{product['specifications']}</p>
                 </div>
@@ -345,7 +324,7 @@ class EcommerceBot:
                     col1, col2, col3 = st.columns(3)
                     with col1:
                         if st.button("Add to Cart", key=f"view_cart_{product['id']}", type="primary"):
-                            self.add_to_cart(product['id'])
+                            self.add_to_cart(product['id'], 'view_cart')
                             st.rerun()
                     
                     with col2:
@@ -360,15 +339,60 @@ class EcommerceBot:
                 except Exception:
                     # Fallback to simple buttons
                     if st.button(f"Add to Cart - {product['name']}", key=f"view_cart_fallback_{product['id']}"):
-                        self.add_to_cart(product['id'])
+                        self.add_to_cart(product['id'], 'view_cart')
                         st.rerun()
                     if st.button("Close View", key=f"close_view_fallback_{product['id']}"):
                         st.session_state.viewing_product = None
                         st.rerun()
+                
+                self.display_recommendations(product['id'])
             except Exception as e:
                 st.error("Error displaying product details.")
                 st.session_state.viewing_product = None
     
+    @timed('render.comparison')
+    def display_comparison(self):
+        """Aligned spec table for the compared products, best values highlighted"""
+        table = self.engine.compare(st.session_state.comparing)
+        if len(table.product_ids) < 2:
+            st.session_state.comparing = []
+            return
+        
+        st.markdown("### 📊 Side-by-Side Comparison")
+        st.markdown(table_html(self.engine.catalog, table), unsafe_allow_html=True)
+        
+        for column, product_id in zip(st.columns(len(table.product_ids)), table.product_ids):
+            with column:
+                if st.button("View", key=f"compare_view_{product_id}"):
+                    self.view_product(product_id, 'compare_view')
+                    st.rerun()
+                if st.button("Add to Cart", key=f"compare_cart_{product_id}", type="primary"):
+                    self.add_to_cart(product_id, 'compare_cart')
+                    st.rerun()
+        
+        if st.button("Close Comparison", key="close_comparison"):
+            st.session_state.comparing = []
+            st.rerun()
+    
+    @timed('render.recommendations')
+    def display_recommendations(self, product_id: int):
+        """Similar laptops, cheaper alternatives and upgrades below the product view"""
+        recommendations = self.engine.recommendations(product_id)
+        titles = {'similar': "🔁 Similar Laptops", 'cheaper': "💸 Cheaper Alternatives", 'upgrades': "⬆️ Upgrades"}
+        sections = [(kind, products) for kind, products in recommendations.items() if products]
+        if not sections:
+            return
+        
+        for column, (kind, products) in zip(st.columns(len(sections)), sections):
+            with column:
+                st.markdown(f"#### {titles[kind]}")
+                for product in products:
+                    st.markdown(f"**{product['name']}**  \n{self.format_price(product['price'])}")
+                    if st.button("View", key=f"rec_{kind}_{product_id}_{product['id']}"):
+                        self.view_product(product['id'], 'rec_view')
+                        st.rerun()
+    
+    @timed('render.gallery')
     def display_products_gallery(self):
         """Display products in a grid layout with better error handling"""
         if self.products_df.empty:
@@ -380,6 +404,11 @@ class EcommerceBot:
             self.display_product_view()
             return
         
+        # Side-by-side comparison requested from chat or the search results
+        if st.session_state.comparing:
+            self.display_comparison()
+            return
+        
         # Show search results buttons if available
         if st.session_state.show_search_results_buttons:
             self.display_search_results_buttons()
@@ -387,6 +416,17 @@ class EcommerceBot:
         
         st.markdown("### 🛍️ Our Premium Laptop Collection")
         
+        query = self._gallery_controls()
+        rows = select_rows(self.catalog, query)
+        if not len(rows):
+            st.info("No laptops match these filters.")
+            return
+        
+        # Only the visible page is turned into widgets
+        visible_rows, page, page_count = page_rows(rows, st.session_state.gallery_page)
+        st.session_state.gallery_page = page
+        st.caption(f"Showing {len(visible_rows)} of {len(rows)} laptops · Page {page} of {page_count}")
+        
         # Display products with better error handling
         try:
             # Try to create columns, fallback to single column if fails
@@ -395,31 +435,63 @@ class EcommerceBot:
         except Exception:
             use_columns = False
         
-        for idx, product in self.products_df.iterrows():
+        for idx, row in enumerate(visible_rows):
             try:
+                product = self.catalog.record(row)
                 # Use columns if available, otherwise single column
                 if use_columns:
                     with cols[idx % 2]:
-                        self._display_single_product(product, idx)
+                        self._display_single_product(product, row)
                 else:
-                    self._display_single_product(product, idx)
+                    self._display_single_product(product, row)
             except Exception as e:
                 # Skip problematic products but continue with others
                 continue
+        
+        self._gallery_pager(page, page_count)
+    
+    def _gallery_controls(self) -> GalleryQuery:
+        """Render the filter/sort controls and return the selected query"""
+        def reset_page():
+            st.session_state.gallery_page = 1
+        
+        price_index = self.catalog.price_index
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            brand = st.selectbox("Brand", [ALL] + self.catalog.brands, key="gallery_brand", on_change=reset_page)
+        with col2:
+            category = st.selectbox("Category", [ALL] + self.catalog.categories, key="gallery_category", on_change=reset_page)
+        with col3:
+            sort = st.selectbox("Sort by", SORT_OPTIONS, key="gallery_sort", on_change=reset_page)
+        
+        min_price, max_price = price_index.min_price, price_index.max_price
+        if min_price < max_price:
+            min_price, max_price = st.slider(
+                "Price range (₦)", min_value=min_price, max_value=max_price,
+                value=(min_price, max_price), step=5000, key="gallery_price", on_change=reset_page
+            )
+        return GalleryQuery(brand=brand, category=category, min_price=min_price, max_price=max_price, sort=sort)
+    
+    def _gallery_pager(self, page: int, page_count: int):
+        """Previous/next page buttons under the gallery"""
+        if page_count <= 1:
+            return
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("◀ Previous", key="gallery_prev", disabled=page <= 1):
+                st.session_state.gallery_page = page - 1
+                st.rerun()
+        with col2:
+            st.markdown(f"<p style='text-align: center;'>Page {page} of {page_count}</p>", unsafe_allow_html=True)
+        with col3:
+            if st.button("Next ▶", key="gallery_next", disabled=page >= page_count):
+                st.session_state.gallery_page = page + 1
+                st.rerun()
     
-    def _display_single_product(self, product, idx):
+    def _display_single_product(self, product, row):
         """Display a single product card"""
         try:
-            st.markdown(f"""
-            <div class="product-card">
-                <h4>{product['name']}</h4>
-                <p><strong>Brand:</strong> {product['brand']}</p>
-                <p><strong>Category:</strong> {product['category']}</p>
-                <p class="price-tag">{self.format_price(product['price'])}</p>
-                <p><strong>Stock:</strong> {product['stock_quantity']} units</p>
-                <p><small>{product['specifications'][:80]}...</small></p>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(card_html(self.catalog, row, self.inventory.available(product['id'])), unsafe_allow_html=True)
             
             # Try to use columns for buttons, fallback to stacked buttons
             try:
@@ -444,28 +516,40 @@ class EcommerceBot:
             # Skip if there's any error with this product
             pass
     
+    @timed('render.chat')
     def display_chat_interface(self):
         """Display chat interface"""
         st.markdown("### 🤖 Chat with our AI Assistant")
         
-        # Chat history
+        # Chat history: only the recent window, from pre-rendered HTML
         try:
-            for message in st.session_state.chat_history:
-                if message['role'] == 'user':
-                    st.markdown(f"""
-                    <div class="chat-message user-message">
-                        <strong>You:</strong> {message['content']}
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                    <div class="chat-message bot-message">
-                        <strong>Assistant:</strong> {message['content']}
-                    </div>
-                    """, unsafe_allow_html=True)
+            transcript = st.session_state.chat_history
+            extra = st.session_state.chat_extra
+            hidden = transcript.hidden_count(extra)
+            if hidden:
+                if st.button(f"Load earlier messages ({hidden} more)", key="chat_load_earlier"):
+                    st.session_state.chat_extra = extra + transcript.window
+                    st.rerun()
+            elif transcript.dropped:
+                st.caption(f"{transcript.dropped} older messages were cleared to keep the chat fast.")
+            
+            for message in transcript.visible(extra):
+                st.markdown(message.html, unsafe_allow_html=True)
         except Exception:
             st.error("Error displaying chat history.")
-        
+
+        # Filters carried over from earlier messages ("dell" + "under 500k" + "with 16GB")
+        filters = st.session_state.search_filters
+        if not filters.is_empty():
+            filter_col, reset_col = st.columns([4, 1])
+            with filter_col:
+                st.caption(f"Active filters: {describe(filters)}")
+            with reset_col:
+                if st.button("Reset filters", key="reset_filters"):
+                    self.record_action('reset_filters', None)
+                    st.session_state.search_filters = SearchFilters()
+                    st.rerun()
+
         # Chat input form
         try:
             with st.form(key="chat_form", clear_on_submit=True):
@@ -474,17 +558,19 @@ class EcommerceBot:
             
             if submit_button and user_input.strip():
                 # Add user message to history
-                st.session_state.chat_history.append({"role": "user", "content": user_input})
+                st.session_state.chat_history.append("user", user_input)
                 
                 # Get bot response
                 bot_response = self.process_user_message(user_input)
-                st.session_state.chat_history.append({"role": "bot", "content": bot_response})
+                st.session_state.chat_history.append("bot", bot_response)
+                st.session_state.chat_extra = 0
                 
                 # Rerun to show new messages
                 st.rerun()
         except Exception as e:
             st.error("Error with chat interface. Please refresh the page.")
     
+    @timed('render.sidebar')
     def display_cart_sidebar(self):
         """Display shopping cart in sidebar"""
         try:
@@ -495,28 +581,35 @@ class EcommerceBot:
                 st.sidebar.markdown(f"**Customer:** {st.session_state.user_name}")
                 st.sidebar.markdown("---")
             
-            if st.session_state.cart:
-                total = 0
-                for i, item in enumerate(st.session_state.cart):
-                    st.sidebar.markdown(f"**{item['name']}**")
-                    st.sidebar.markdown(f"Quantity: {item['quantity']}")
-                    st.sidebar.markdown(f"Price: {self.format_price(item['price'] * item['quantity'])}")
+            cart = self.engine.priced_cart(st.session_state)
+            if cart:
+                for line in cart:
+                    st.sidebar.markdown(f"**{line.name}**")
+                    st.sidebar.markdown(f"Quantity: {line.quantity}")
+                    st.sidebar.markdown(f"Price: {self.format_price(line.subtotal)}")
                     
-                    if st.sidebar.button(f"Remove", key=f"remove_{i}"):
-                        st.session_state.cart.pop(i)
-                        st.rerun()
+                    # Keys follow the product id, so they stay put when other lines go away
+                    col1, col2, col3 = st.sidebar.columns(3)
+                    if col1.button("➖", key=f"decrement_{line.widget_key}"):
+                        self.change_quantity('decrement', line.product_id, line.quantity - 1)
+                    if col2.button("➕", key=f"increment_{line.widget_key}"):
+                        self.change_quantity('increment', line.product_id, line.quantity + 1)
+                    if col3.button("Remove", key=f"remove_{line.widget_key}"):
+                        self.change_quantity('remove', line.product_id, 0)
                     
-                    total += item['price'] * item['quantity']
                     st.sidebar.markdown("---")
                 
-                st.sidebar.markdown(f"### Total: {self.format_price(total)}")
+                st.sidebar.markdown(f"### Total: {self.format_price(cart.total)}")
                 
                 if st.sidebar.button("Proceed to Checkout", type="primary"):
                     st.session_state.redirect_to_checkout = True
                     st.rerun()
                 
                 if st.sidebar.button("Clear Cart"):
-                    st.session_state.cart = []
+                    start = time.perf_counter()
+                    events = [self.engine.set_quantity(st.session_state, line.product_id, 0) for line in list(cart)]
+                    self.record_action('clear_cart', None, events, time.perf_counter() - start)
+                    count('cart.clear')
                     st.rerun()
             else:
                 st.sidebar.info("Your cart is empty")
@@ -530,6 +623,18 @@ class EcommerceBot:
         except Exception as e:
             st.sidebar.error("Error displaying cart.")
     
+    def display_debug_panel(self):
+        """Latency percentiles and counters for this process (TECHMART_DEBUG=1)"""
+        snapshot = METRICS.snapshot()
+        with st.sidebar.expander("⏱️ Performance"):
+            if snapshot['stages']:
+                stages = pd.DataFrame.from_dict(snapshot['stages'], orient='index').round(2)
+                st.dataframe(stages)
+            st.json(snapshot['counters'])
+            st.caption("Search query cache")
+            st.json(QUERY_CACHE.stats())
+    
+    @timed('render.checkout')
     def display_checkout(self):
         """Display checkout form"""
         try:
@@ -550,32 +655,24 @@ class EcommerceBot:
                 address = st.text_area("Delivery Address*", placeholder="Enter your complete delivery address")
                 
                 st.markdown("#### Order Summary")
-                total = sum(item['price'] * item['quantity'] for item in st.session_state.cart)
+                cart = self.engine.priced_cart(st.session_state)
+                total = cart.total
                 
-                for item in st.session_state.cart:
-                    st.write(f"• {item['name']} x{item['quantity']} - {self.format_price(item['price'] * item['quantity'])}")
+                for line in cart:
+                    st.write(f"• {line.name} x{line.quantity} - {self.format_price(line.subtotal)}")
                 
                 st.markdown(f"**Total Amount: {self.format_price(total)}**")
                 
                 submitted = st.form_submit_button("Place Order", type="primary")
                 
                 if submitted:
-                    if name and email and phone and address:
-                        # Create order record
-                        order_data = {
-                            'order_id': f"ORD{datetime.now().strftime('%Y%m%d%H%M%S')}",
-                            'customer_name': name,
-                            'email': email,
-                            'phone': phone,
-                            'address': address,
-                            'items': st.session_state.cart.copy(),
-                            'total': total,
-                            'order_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                            'status': 'Confirmed'
-                        }
-                        
-                        # Save order (in real app, this would go to database)
-                        st.success("🎉 Order placed successfully!")
+                    customer = {'customer_name': name, 'email': email, 'phone': phone, 'address': address}
+                    order_data, events = self.engine.checkout(st.session_state, customer)
+                    if order_data is None:
+                        for event in events:
+                            st.error(event.message)
+                    else:
+                        st.success(events[0].message)
                         st.markdown(f"""
                         <div class="order-summary">
                             <h4>Order Confirmation</h4>
@@ -587,15 +684,14 @@ class EcommerceBot:
                         </div>
                         """, unsafe_allow_html=True)
                         
-                        # Clear cart and reset redirect flag
-                        st.session_state.cart = []
+                        # Reset redirect flag (the engine has cleared the cart)
                         st.session_state.redirect_to_checkout = False
-                    else:
-                        st.error("Please fill in all required fields.")
         except Exception as e:
             st.error("Error displaying checkout form. Please try again.")
 
+@timed('rerun')
 def main():
+    bot = None
     try:
         # Header
         st.markdown("""
@@ -605,12 +701,27 @@ def main():
         </div>
         """, unsafe_allow_html=True)
         
+        # Pick up products.csv edits in the background (see techmart/catalog.py)
+        watch_catalog()
+        
         # Initialize bot
         bot = EcommerceBot()
         
+        # Optional JSON chat API served from this process (see techmart/api.py)
+        api_port = os.environ.get('TECHMART_API_PORT')
+        if api_port:
+            try:
+                start_api_server(os.environ.get('TECHMART_API_HOST', '127.0.0.1'), int(api_port))
+            except OSError:
+                st.warning(f"Chat API could not start on port {api_port}.")
+        
         # Sidebar for cart
         bot.display_cart_sidebar()
         
+        # Hidden performance panel for local debugging
+        if os.environ.get('TECHMART_DEBUG'):
+            bot.display_debug_panel()
+        
         # Handle redirect to checkout
         if st.session_state.get('redirect_to_checkout', False):
             # Create tabs but set checkout as default
@@ -675,6 +786,10 @@ def main():
     except Exception as e:
         st.error("An error occurred. Please refresh the page.")
         st.error(f"Error details: {str(e)}")
+    finally:
+        # Also runs when st.rerun() cuts the script short
+        if bot is not None:
+            bot.save_session_state()
 
 if __name__ == "__main__":
     main()
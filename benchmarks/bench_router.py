@@ -0,0 +1,61 @@
+"""Microbenchmark: intent routing cost vs. keyword table size
+
+Grows every intent's phrase list with synthetic keywords and times
+``IntentRouter.classify`` against the old ``any(k in message for k in ...)``
+chain. The router's per-message cost should stay flat while the naive scan
+grows linearly with the table.
+
+Usage: python benchmarks/bench_router.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from techmart.router import INTENTS, Intent, IntentRouter  # noqa: E402
+
+MESSAGES = [
+    'show me dell gaming laptops',
+    'hp laptops under 500k',
+    'add the thinkpad to my cart',
+    'what can you do',
+    'I need something with 16GB RAM and an RTX GPU for video editing',
+]
+
+SIZES = [10, 100, 1_000, 10_000]
+
+
+def grown_intents(extra: int):
+    """Return the default table with ``extra`` synthetic phrases per intent"""
+    return [
+        Intent(intent.name, intent.priority,
+               intent.phrases + tuple(f'{intent.name}kw{n}' for n in range(extra)), intent.weight)
+        for intent in INTENTS
+    ]
+
+
+def naive_classify(intents, message: str) -> str:
+    message = message.lower()
+    for intent in intents:
+        if any(phrase in message for phrase in intent.phrases):
+            return intent.name
+    return 'default'
+
+
+def main(repeat: int = 2_000) -> None:
+    print(f"{'phrases':>10} {'router us/msg':>14} {'naive us/msg':>13}")
+    for size in SIZES:
+        intents = grown_intents(size)
+        router = IntentRouter(intents)
+        total = sum(len(intent.phrases) for intent in intents)
+        runs = max(repeat // (1 + size // 100), 20)
+
+        router_time = timeit.timeit(lambda: [router.classify(m) for m in MESSAGES], number=runs)
+        naive_time = timeit.timeit(lambda: [naive_classify(intents, m) for m in MESSAGES], number=runs)
+        per_message = runs * len(MESSAGES) / 1e6
+        print(f'{total:>10} {router_time / per_message:>14.1f} {naive_time / per_message:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""Benchmark suite for the bot's hot paths on synthetic catalogs
+
+For each catalog size (50, 5k and 500k rows by default) this writes a
+synthetic ``products.csv`` and measures:
+
+- ``load_products``: cold catalog load (CSV parse, spec columns, indexes)
+- ``load_snapshot``: cold catalog load from a compiled columnar snapshot
+- ``reload_delta``: hot reload after a 10-row edit (diff plus patch, no CSV parse)
+- ``search_products``: ranked search with spec/price constraints (query cache off)
+- ``search_cached``: the same queries through the query cache
+- ``search_fuzzy``: search with misspelled product words (corrections not memoized)
+- ``process_user_message``: full chat turns from a synthetic trace
+- ``refine_search``: a follow-up turn ("under 600k with 16GB") narrowing a brand search
+- ``add_to_cart``: stock reservation plus cart update
+- ``recommend``: similar, cheaper and upgrade lists for one product
+- ``compare``: comparison table for three products (cold, no memoized tables)
+- ``gallery_prepare``: filter/sort, page slice and card HTML for one page
+  (``gallery_prepare_cold`` with the selection and card caches cleared)
+
+Each case reports throughput, p50/p95/p99 latency and peak traced memory,
+written as JSON. ``--compare`` diffs two result files and exits non-zero
+when a case got slower (p50) or bigger (peak memory) beyond the threshold.
+
+Usage:
+    python benchmarks/bench_suite.py --out results.json [--sizes 50,5000]
+    python benchmarks/bench_suite.py --compare base.json head.json [--threshold 0.1]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import generate_trace, write_catalog  # noqa: E402
+from techmart.catalog import PRODUCT_COLUMNS, clear_catalog_cache, compile_snapshot, get_catalog  # noqa: E402
+from techmart.engine import ChatEngine, SessionState  # noqa: E402
+from techmart.gallery import ALL, SORT_OPTIONS, GalleryQuery, card_html, page_rows, select_rows  # noqa: E402
+from techmart.inventory import InventoryService  # noqa: E402
+from techmart.metrics import quantiles  # noqa: E402
+from techmart.query_cache import QUERY_CACHE  # noqa: E402
+
+SIZES = [50, 5_000, 500_000]
+
+SEED = 42
+
+# Calls traced for peak memory (tracing is slow, so fewer than the timed runs)
+MEMORY_OPS = 20
+
+# Peak memory changes smaller than this are noise, whatever the ratio
+MEMORY_NOISE_KIB = 64
+
+
+def measure(func: Callable[[int], object], ops: int, memory_ops: int = MEMORY_OPS) -> Dict[str, float]:
+    """Time ``func(i)`` for ``i in range(ops)``, then trace a few calls for peak memory"""
+    samples = []
+    started = time.perf_counter()
+    for i in range(ops):
+        start = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - start)
+    total = time.perf_counter() - started
+    p50, p95, p99 = quantiles(samples)
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for i in range(min(ops, memory_ops)):
+        func(i)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    return {
+        'ops': ops,
+        'total_s': round(total, 6),
+        'ops_per_s': round(ops / total, 2) if total else 0.0,
+        'p50_us': round(p50 * 1e6, 2),
+        'p95_us': round(p95 * 1e6, 2),
+        'p99_us': round(p99 * 1e6, 2),
+        'peak_kib': round(max(peak, 0) / 1024, 1),
+    }
+
+
+def bench_size(rows: int, workdir: str, scale: float) -> Dict[str, Dict[str, float]]:
+    path = os.path.join(workdir, f'products_{rows}.csv')
+    write_catalog(path, rows, SEED)
+    big = rows >= 100_000
+
+    def load(_):
+        clear_catalog_cache()
+        return get_catalog(path)
+
+    load_ops = max(1, int((2 if big else 10) * scale))
+    results = {'load_products': measure(load, load_ops, memory_ops=1)}
+    compile_snapshot(path)
+    results['load_snapshot'] = measure(load, load_ops, memory_ops=1)
+    catalog = get_catalog(path)
+    engine = ChatEngine(catalog, InventoryService(catalog))
+
+    edited = catalog.df[PRODUCT_COLUMNS].copy()
+    edit_rows = random.Random(SEED).sample(range(rows), min(rows, 10))
+    edited.loc[edit_rows, 'price'] += 1_000
+    edited.loc[edit_rows, 'stock_quantity'] = 1
+    results['reload_delta'] = measure(lambda i: catalog.patched(edited, (i, rows)), max(2, int((5 if big else 50) * scale)),
+                                      memory_ops=2)
+
+    trace = generate_trace(sessions=50, turns=max(2, int(20 * scale)), seed=SEED)
+    queries = [message for _, message in trace if not message.startswith('my name')]
+    uncached = ChatEngine(catalog, engine.inventory, query_cache=None)
+    search_ops = max(10, int((100 if big else 1_000) * scale))
+    results['search_products'] = measure(lambda i: uncached.search_products(queries[i % len(queries)]), search_ops)
+    results['search_cached'] = measure(lambda i: engine.search_products(queries[i % len(queries)]), search_ops)
+
+    typos = ['lenovo thinkpd', 'inspirion', 'dell latitde', 'hp elitbook', 'legoin gaming', 'spectr x360']
+
+    def fuzzy_search(i):
+        catalog.fuzzy_index._memo.clear()
+        return uncached.search_products(typos[i % len(typos)])
+
+    fuzzy_search(0)  # the deletion index is built once per catalog
+    results['search_fuzzy'] = measure(fuzzy_search, search_ops)
+
+    sessions = [SessionState() for _ in range(50)]
+    # Introductions first, so the timed turns are real queries
+    for session, message in trace[:len(sessions)]:
+        engine.process_message(sessions[session], message)
+    turns = trace[len(sessions):len(sessions) + max(10, int((200 if big else 1_000) * scale))]
+    results['process_user_message'] = measure(lambda i: engine.process_message(sessions[turns[i][0]], turns[i][1]),
+                                              len(turns))
+
+    # Follow-up turns start from the filters a brand search left behind (query cache off)
+    brand_searches = []
+    for brand in catalog.brands:
+        session = SessionState(user_name='Bench')
+        uncached.process_message(session, f'show me {brand} laptops')
+        brand_searches.append((session, session.search_filters))
+    refinements = ['under 600k with 16gb', 'with 16gb ram', 'under 500k', 'gaming under 700k']
+
+    def refine(i):
+        session, filters = brand_searches[i % len(brand_searches)]
+        session.search_filters = filters
+        return uncached.process_message(session, refinements[i % len(refinements)])
+
+    results['refine_search'] = measure(refine, search_ops)
+
+    rnd = random.Random(SEED)
+    product_ids = [rnd.randint(1, rows) for _ in range(max(10, int(2_000 * scale)))]
+    shoppers = [SessionState() for _ in range(100)]
+    results['add_to_cart'] = measure(lambda i: engine.add_to_cart(shoppers[i % len(shoppers)], product_ids[i]),
+                                     len(product_ids))
+
+    engine.recommendations(product_ids[0])  # feature matrix and index are built once per catalog
+    results['recommend'] = measure(lambda i: engine.recommendations(product_ids[i]), len(product_ids) // 2)
+
+    def compare(i):
+        catalog.derived.pop('comparison_table', None)
+        return engine.compare(product_ids[i:i + 3])
+
+    results['compare'] = measure(compare, len(product_ids) // 2)
+
+    brands = [ALL] + catalog.brands
+    categories = [ALL] + catalog.categories[:5]
+    gallery_queries = [GalleryQuery(brand=rnd.choice(brands), category=rnd.choice(categories), sort=rnd.choice(SORT_OPTIONS))
+                       for _ in range(200)]
+
+    def prepare(i, cold=False):
+        if cold:
+            catalog.derived.clear()
+        rows_on_page, _, _ = page_rows(select_rows(catalog, gallery_queries[i % len(gallery_queries)]), 1 + i % 3)
+        return [card_html(catalog, row, 0) for row in rows_on_page]
+
+    gallery_ops = max(10, int(1_000 * scale))
+    results['gallery_prepare'] = measure(prepare, gallery_ops)
+    results['gallery_prepare_cold'] = measure(lambda i: prepare(i, cold=True), max(5, gallery_ops // 10))
+
+    QUERY_CACHE.clear()
+    clear_catalog_cache()
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(sizes: List[int], scale: float) -> Dict:
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': SEED,
+            'scale': scale,
+        },
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in sizes:
+            print(f"-- {rows} rows", file=sys.stderr)
+            report['results'][str(rows)] = results = bench_size(rows, workdir, scale)
+            for case, stats in results.items():
+                print(f"   {case:<22} {stats['ops_per_s']:>12.1f} ops/s  p50 {stats['p50_us']:>11.1f}us  "
+                      f"p99 {stats['p99_us']:>11.1f}us  peak {stats['peak_kib']:>10.1f}KiB", file=sys.stderr)
+    return report
+
+
+def compare(base: Dict, head: Dict, threshold: float) -> bool:
+    """Print a per-case diff; returns True if anything regressed"""
+    print(f"base {base['meta']['commit']}  ->  head {head['meta']['commit']}  (threshold {threshold:.0%})")
+    print(f"{'rows':>7} {'case':<22} {'p50 us':>21} {'change':>8} {'peak KiB':>23} {'change':>8}")
+    regressed = False
+    for rows, cases in head['results'].items():
+        for case, new in cases.items():
+            old = base['results'].get(rows, {}).get(case)
+            if old is None:
+                print(f"{rows:>7} {case:<22} {'(new)':>21}")
+                continue
+            time_change = new['p50_us'] / old['p50_us'] - 1 if old['p50_us'] else 0.0
+            memory_change = new['peak_kib'] / old['peak_kib'] - 1 if old['peak_kib'] else 0.0
+            flag = ''
+            memory_grew = memory_change > threshold and new['peak_kib'] - old['peak_kib'] > MEMORY_NOISE_KIB
+            if time_change > threshold or memory_grew:
+                flag, regressed = '  REGRESSION', True
+            elif time_change < -threshold:
+                flag = '  faster'
+            print(f"{rows:>7} {case:<22} {old['p50_us']:>10.1f}->{new['p50_us']:<10.1f} {time_change:>+8.1%} "
+                  f"{old['peak_kib']:>11.1f}->{new['peak_kib']:<11.1f} {memory_change:>+8.1%}{flag}")
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark TechMart hot paths on synthetic catalogs")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in SIZES),
+                        help="comma-separated catalog sizes (rows)")
+    parser.add_argument('--scale', type=float, default=1.0, help="multiply the number of timed operations")
+    parser.add_argument('--out', help="write results JSON here (default: stdout)")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'HEAD'), help="diff two result files")
+    parser.add_argument('--threshold', type=float, default=0.10, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        with open(args.compare[1]) as f:
+            head = json.load(f)
+        sys.exit(1 if compare(base, head, args.threshold) else 0)
+
+    report = run([int(size) for size in args.sizes.split(',')], args.scale)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
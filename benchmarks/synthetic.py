@@ -0,0 +1,106 @@
+"""Deterministic synthetic catalogs and chat traces for the benchmarks
+
+Catalogs follow the ``products.csv`` schema and the same specification
+format, so spec parsing, search and price filters see realistic data at
+any size. Traces are sequences of ``(session, message)`` turns that mix
+greetings, searches, price and spec queries, orders and cart checks.
+"""
+import random
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+MODELS = {
+    'HP': ['Pavilion', 'EliteBook', 'Spectre x360', 'Envy', 'Omen', 'ProBook', 'ZBook', 'Victus', 'Stream'],
+    'Dell': ['Inspiron', 'XPS', 'Latitude', 'Vostro', 'Precision', 'Alienware', 'G15'],
+    'Lenovo': ['ThinkPad', 'IdeaPad', 'Legion', 'Yoga', 'ThinkBook', 'V15'],
+}
+
+CATEGORIES = ['Gaming Laptop', 'Budget Laptop', 'Business Laptop', '2-in-1 Laptop', 'Ultrabook',
+              'Mid-range Laptop', 'Mobile Workstation', 'Workstation', 'Premium Laptop', 'Creator Laptop']
+
+CPUS = ['Intel Core i3-1115G4', 'Intel Core i5-1135G7', 'Intel Core i5-11300H', 'Intel Core i7-1165G7',
+        'Intel Core i7-11800H', 'Intel Core i9-11950H', 'AMD Ryzen 5 5500U', 'AMD Ryzen 7 5800H',
+        'AMD Ryzen 9 5900HX', 'Intel Celeron N4000']
+RAM = [4, 8, 16, 32, 64]
+STORAGE = ['256GB SSD', '512GB SSD', '1TB SSD', '2TB SSD', '1TB HDD', '64GB eMMC']
+GPUS = ['Intel UHD Graphics', 'Intel Iris Xe Graphics', 'AMD Radeon Graphics', 'NVIDIA GTX 1650',
+        'NVIDIA RTX 3050', 'NVIDIA RTX 3060', 'NVIDIA RTX 3070', 'NVIDIA RTX 3080', 'NVIDIA RTX A2000']
+SCREENS = ['13.3" FHD Display', '14" FHD Display', '15.6" FHD 144Hz Display', '15.6" 4K Display',
+           '16" QHD 165Hz Display', '17.3" FHD 144Hz Display', '14" FHD Touchscreen']
+OSES = ['Windows 11', 'Windows 11 Pro', 'Windows 11 S']
+
+BRAND_COLORS = {'HP': '0073e6', 'Dell': '007DB8', 'Lenovo': 'E2231A'}
+
+
+def generate_catalog(rows: int, seed: int = 0) -> pd.DataFrame:
+    """A ``rows``-product catalog in the ``products.csv`` schema"""
+    rng = np.random.default_rng(seed)
+    brands = list(MODELS)
+    brand_idx = rng.integers(0, len(brands), rows)
+    model_pick = rng.integers(0, 1_000_000, rows)
+    pick = {name: rng.integers(0, len(values), rows)
+            for name, values in [('category', CATEGORIES), ('cpu', CPUS), ('ram', RAM), ('storage', STORAGE),
+                                 ('gpu', GPUS), ('screen', SCREENS), ('os', OSES)]}
+    prices = (rng.integers(150, 1600, rows) * 1000).tolist()
+    stock = rng.integers(0, 40, rows).tolist()
+
+    names, brand_col, specs, images = [], [], [], []
+    for i in range(rows):
+        brand = brands[brand_idx[i]]
+        models = MODELS[brand]
+        model = models[model_pick[i] % len(models)]
+        names.append(f"{brand} {model} {model_pick[i] % 97 + 3} G{model_pick[i] % 9 + 1}-{i}")
+        brand_col.append(brand)
+        specs.append(', '.join([
+            CPUS[pick['cpu'][i]], f"{RAM[pick['ram'][i]]}GB RAM", STORAGE[pick['storage'][i]],
+            GPUS[pick['gpu'][i]], SCREENS[pick['screen'][i]], OSES[pick['os'][i]],
+        ]))
+        images.append(f"https://via.placeholder.com/300x200/{BRAND_COLORS[brand]}/FFFFFF?text={brand}+{model.replace(' ', '+')}")
+
+    return pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'name': names,
+        'brand': brand_col,
+        'category': [CATEGORIES[c] for c in pick['category']],
+        'price': prices,
+        'stock_quantity': stock,
+        'specifications': specs,
+        'image_url': images,
+    })
+
+
+def write_catalog(path: str, rows: int, seed: int = 0) -> None:
+    generate_catalog(rows, seed).to_csv(path, index=False)
+
+
+def generate_trace(sessions: int, turns: int, seed: int = 0) -> List[Tuple[int, str]]:
+    """``sessions * turns`` chat turns, interleaved across sessions
+
+    Every session opens by giving its name, then draws from a fixed mix of
+    message templates.
+    """
+    rnd = random.Random(seed)
+    templates = [
+        (4, lambda: f"show me {rnd.choice(list(MODELS)).lower()} {rnd.choice(['gaming', 'business', 'budget', ''])} laptops"),
+        (3, lambda: f"{rnd.choice(list(MODELS))} laptops under {rnd.choice([300, 450, 600, 900])}k"),
+        (2, lambda: f"I need a laptop with {rnd.choice(RAM)}GB RAM and an {rnd.choice(['RTX', 'SSD', 'i7', 'Ryzen'])}"),
+        (2, lambda: f"add the {rnd.choice([m for models in MODELS.values() for m in models]).lower()} to my cart"),
+        (1, lambda: "what's in my cart"),
+        (1, lambda: f"price range between {rnd.choice([200, 400])}k and {rnd.choice([600, 900])}k"),
+        (1, lambda: "what can you do"),
+        (1, lambda: "hello"),
+    ]
+    weights = [weight for weight, _ in templates]
+    names = ['Ada', 'Bola', 'Chidi', 'Dayo', 'Emeka', 'Funmi', 'Gozie', 'Hauwa']
+
+    trace = []
+    for turn in range(turns):
+        for session in range(sessions):
+            if turn == 0:
+                message = f"my name is {names[session % len(names)]}"
+            else:
+                message = rnd.choices(templates, weights)[0][1]()
+            trace.append((session, ' '.join(message.split())))
+    return trace
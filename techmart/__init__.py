@@ -0,0 +1 @@
+"""Shared, Streamlit-independent building blocks for the TechMart bot"""
@@ -0,0 +1,385 @@
+"""Asyncio HTTP/JSON API for chat, search, cart and checkout
+
+Serves the same ``ChatEngine`` that backs the Streamlit page, so mobile
+apps and messaging bridges get identical answers without a script rerun
+per message. Standard library only: a small HTTP/1.1 server (keep-alive,
+JSON bodies) on ``asyncio.start_server``. Engine calls are in-memory and
+short and order writes are queued, so requests are handled inline on the
+event loop and one core serves thousands of lightweight sessions.
+
+Endpoints::
+
+    POST /chat      {"session_id"?, "message"}
+    GET  /search    ?q=...&limit=...
+    GET  /cart      ?session_id=...
+    POST /cart      {"session_id", "product_id", "quantity"?}   (no quantity: add one unit)
+    POST /checkout  {"session_id", "customer_name", "email", "phone", "address"}
+    GET  /metrics   Prometheus text dump of ``techmart.metrics``
+
+Every response carries the ``session_id`` to send with the next request;
+unknown or expired ids start a fresh session.
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from techmart.catalog import PRODUCT_COLUMNS, watch_catalog
+from techmart.engine import CUSTOMER_FIELDS, ChatEngine, Event, SessionState
+from techmart.metrics import METRICS, span
+from techmart.trace import get_trace_recorder
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8502
+
+# Sessions idle for longer than this are dropped and their stock holds released
+SESSION_TTL = 30 * 60
+MAX_SESSIONS = 100_000
+
+MAX_BODY = 64 * 1024
+KEEPALIVE_TIMEOUT = 15.0
+MAX_SEARCH_LIMIT = 100
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+# HTTP status for requests that end in a failure event
+_EVENT_STATUS = {'out_of_stock': 409, 'cart_error': 404, 'cart_empty': 400, 'invalid': 400}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class BadRequest(ApiError):
+    """The request itself is invalid: malformed JSON or a missing or mistyped field"""
+
+    def __init__(self, message: str):
+        super().__init__(400, message)
+
+
+def _integer(data: Dict[str, Any], key: str, default: Optional[int] = None) -> Optional[int]:
+    """``data[key]`` as an int; JSON numbers and digit strings (query parameters) are accepted
+
+    Missing or null values give ``default``; anything else raises a 400.
+    """
+    value = data.get(key)
+    if value is None:
+        return default
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    elif isinstance(value, int) and not isinstance(value, bool):
+        return value
+    elif isinstance(value, float) and value.is_integer():
+        return int(value)
+    raise BadRequest(f"'{key}' must be an integer")
+
+
+class SessionStore:
+    """Bounded LRU of sessions with idle-TTL eviction
+
+    Only touched from the event loop thread, so it needs no locking.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, ttl: float = SESSION_TTL,
+                 on_evict: Optional[Callable[[SessionState], None]] = None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.on_evict = on_evict
+        # session id -> (state, last seen), least recently used first
+        self._sessions: 'OrderedDict[str, Tuple[SessionState, float]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: Optional[str] = None) -> SessionState:
+        """The live session for ``session_id``, or a new one"""
+        now = time.monotonic()
+        self._evict(now)
+        entry = self._sessions.get(session_id) if session_id else None
+        state = entry[0] if entry else SessionState()
+        self._sessions[state.session_id] = (state, now)
+        self._sessions.move_to_end(state.session_id)
+        if len(self._sessions) > self.max_sessions:
+            self._drop(next(iter(self._sessions)))
+        return state
+
+    def _evict(self, now: float) -> None:
+        while self._sessions:
+            session_id, (_, last_seen) = next(iter(self._sessions.items()))
+            if now - last_seen < self.ttl:
+                break
+            self._drop(session_id)
+
+    def _drop(self, session_id: str) -> None:
+        state, _ = self._sessions.pop(session_id)
+        if self.on_evict is not None:
+            self.on_evict(state)
+
+
+class ChatApi:
+    """Request routing and JSON handlers on top of a ``ChatEngine``"""
+
+    def __init__(self, engine: Optional[ChatEngine] = None, sessions: Optional[SessionStore] = None):
+        self.engine = engine or ChatEngine()
+        self.sessions = sessions or SessionStore(on_evict=self._release)
+        # None unless TECHMART_TRACE names a trace file
+        self.trace = get_trace_recorder()
+        self.routes = {
+            ('POST', '/chat'): self.chat,
+            ('GET', '/search'): self.search,
+            ('GET', '/cart'): self.cart,
+            ('POST', '/cart'): self.update_cart,
+            ('POST', '/checkout'): self.checkout,
+            ('GET', '/metrics'): self.metrics,
+        }
+
+    def _release(self, state: SessionState) -> None:
+        self.engine.inventory.release(state.session_id)
+
+    def _session(self, data: Dict[str, Any]) -> SessionState:
+        session_id = data.get('session_id')
+        if session_id is not None and not isinstance(session_id, str):
+            raise BadRequest("'session_id' must be a string")
+        state = self.sessions.get(session_id)
+        # Keep the session's stock holds alive while it is active
+        self.engine.inventory.touch(state.session_id)
+        return state
+
+    def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Any]:
+        """Run the handler for a request; returns ``(status, payload)``
+
+        The payload is a dict to send as JSON, or plain text (``/metrics``).
+        """
+        with span('api.request'):
+            return self._dispatch(method, target, body)
+
+    def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Any]:
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            if any(path == url.path for _, path in self.routes):
+                return 405, {'error': f"{method} not allowed on {url.path}"}
+            return 404, {'error': f"No such endpoint: {url.path}"}
+        try:
+            data = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            if body:
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    raise BadRequest("Malformed JSON body") from None
+                if not isinstance(payload, dict):
+                    raise BadRequest("Request body must be a JSON object")
+                data.update(payload)
+            return handler(data)
+        except ApiError as e:
+            return e.status, {'error': e.message}
+        except Exception:
+            return 500, {'error': "Internal error"}
+
+    def _product(self, product: Dict[str, Any]) -> Dict[str, Any]:
+        fields = {column: product[column] for column in PRODUCT_COLUMNS}
+        fields['stock_quantity'] = self.engine.inventory.available(product['id'])
+        return fields
+
+    def _cart(self, state: SessionState) -> Dict[str, Any]:
+        cart = self.engine.priced_cart(state)
+        return {'items': cart.to_items(), 'total': cart.total, 'count': cart.count}
+
+    @staticmethod
+    def _status(events: List[Event]) -> int:
+        return max((_EVENT_STATUS.get(event.kind, 200) for event in events), default=200)
+
+    def chat(self, data: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        message = data.get('message')
+        if not isinstance(message, str) or not message.strip():
+            raise BadRequest("'message' is required")
+        state = self._session(data)
+        start = time.perf_counter()
+        response = self.engine.process_message(state, message)
+        if self.trace is not None:
+            self.trace.message(state.session_id, message, response, time.perf_counter() - start)
+        result = response.to_dict()
+        result['session_id'] = state.session_id
+        result['products'] = [self._product(product)
+                              for product in self.engine.catalog.get_products(response.product_ids)]
+        return 200, result
+
+    def search(self, data: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        query = data.get('q', '')
+        if not isinstance(query, str):
+            raise BadRequest("'q' must be a string")
+        limit = min(max(_integer(data, 'limit', 20), 1), MAX_SEARCH_LIMIT)
+        total, results = self.engine.search_page(query, limit) if query else (0, [])
+        return 200, {'query': query, 'count': total, 'products': [self._product(product) for product in results]}
+
+    def cart(self, data: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        state = self._session(data)
+        return 200, {'session_id': state.session_id, **self._cart(state)}
+
+    def update_cart(self, data: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        product_id = _integer(data, 'product_id')
+        if product_id is None:
+            raise BadRequest("'product_id' is required")
+        quantity = _integer(data, 'quantity')
+        state = self._session(data)
+        start = time.perf_counter()
+        if quantity is None:
+            events = [self.engine.add_to_cart(state, product_id)]
+        elif product_id in state.cart:
+            events = [self.engine.set_quantity(state, product_id, quantity)]
+        elif quantity > 0:
+            events = [self.engine.add_to_cart(state, product_id)]
+            if events[0].kind == 'cart_add' and quantity > 1:
+                events.append(self.engine.set_quantity(state, product_id, quantity))
+        else:
+            events = []
+        if self.trace is not None:
+            self.trace.action(state.session_id, 'cart' if quantity is None else 'quantity', product_id, events,
+                              time.perf_counter() - start, quantity)
+        return self._status(events), {'session_id': state.session_id, 'events': [e._asdict() for e in events],
+                                      **self._cart(state)}
+
+    def metrics(self, data: Dict[str, Any]) -> Tuple[int, str]:
+        return 200, METRICS.prometheus()
+
+    def checkout(self, data: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        customer = {}
+        for key in CUSTOMER_FIELDS:
+            value = data.get(key)
+            if not isinstance(value, str) or not value.strip():
+                raise BadRequest(f"'{key}' must be a non-empty string")
+            customer[key] = value.strip()
+        state = self._session(data)
+        order, events = self.engine.checkout(state, customer)
+        return self._status(events), {'session_id': state.session_id, 'order': order,
+                                      'events': [e._asdict() for e in events]}
+
+
+class ApiServer:
+    """Minimal HTTP/1.1 front end for ``ChatApi``"""
+
+    def __init__(self, api: Optional[ChatApi] = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        self.api = api or ChatApi()
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': "Malformed request line"}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length') or 0)
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {'error': "Request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                status, payload = self.api.dispatch(method.upper(), target, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool) -> None:
+        if isinstance(payload, str):
+            body, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body, content_type = json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8'
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+_server: Optional[ApiServer] = None
+_server_lock = threading.Lock()
+
+
+def start_api_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> ApiServer:
+    """Run the API on a background event loop thread (once per process)
+
+    Lets the Streamlit process serve the JSON API next to the page; later
+    calls return the already running server. Raises ``OSError`` if the
+    port cannot be bound.
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            server = ApiServer(host=host, port=port)
+            started = threading.Event()
+            errors: List[OSError] = []
+
+            def run():
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                try:
+                    loop.run_until_complete(server.start())
+                except OSError as e:
+                    errors.append(e)
+                    return
+                finally:
+                    started.set()
+                loop.run_until_complete(server.serve_forever())
+
+            threading.Thread(target=run, name='techmart-api', daemon=True).start()
+            started.wait()
+            if errors:
+                raise errors[0]
+            _server = server
+    return _server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the TechMart chat API")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    watch_catalog()
+    server = ApiServer(host=args.host, port=args.port)
+    print(f"TechMart API listening on http://{args.host}:{args.port}")
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Shopping cart keyed by product id with an incrementally maintained total"""
+from typing import Any, Dict, Iterator, List, Optional
+
+from techmart.catalog import Catalog
+
+
+class CartLine:
+    """One product in the cart"""
+    __slots__ = ('product_id', 'name', 'brand', 'price', 'quantity')
+
+    def __init__(self, product_id: int, name: str, brand: str, price: int, quantity: int = 0):
+        self.product_id = product_id
+        self.name = name
+        self.brand = brand
+        self.price = price
+        self.quantity = quantity
+
+    @property
+    def subtotal(self) -> int:
+        return self.price * self.quantity
+
+    @property
+    def widget_key(self) -> str:
+        """Suffix for Streamlit widget keys; stable while the line exists"""
+        return str(self.product_id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'id': self.product_id, 'name': self.name, 'price': self.price,
+                'quantity': self.quantity, 'brand': self.brand}
+
+
+class Cart:
+    """Lines keyed by product id; ``total`` and ``count`` update in O(1) per change"""
+
+    def __init__(self):
+        self._lines: Dict[int, CartLine] = {}
+        self.total = 0
+        self.count = 0
+        # Bumped on every change, so state backends can skip an unchanged cart
+        self.revision = 0
+        # Catalog version the line prices were last checked against (see ``reprice``)
+        self.catalog_version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __bool__(self) -> bool:
+        return bool(self._lines)
+
+    def __iter__(self) -> Iterator[CartLine]:
+        return iter(list(self._lines.values()))
+
+    def __contains__(self, product_id: int) -> bool:
+        return int(product_id) in self._lines
+
+    def get(self, product_id: int) -> Optional[CartLine]:
+        return self._lines.get(int(product_id))
+
+    def quantity(self, product_id: int) -> int:
+        line = self._lines.get(int(product_id))
+        return line.quantity if line else 0
+
+    def add(self, product: Dict[str, Any], quantity: int = 1) -> CartLine:
+        """Add ``quantity`` units of a catalog product record"""
+        product_id = int(product['id'])
+        line = self._lines.get(product_id)
+        if line is None:
+            line = self._lines[product_id] = CartLine(product_id, product['name'], product['brand'], int(product['price']))
+        self.set_quantity(product_id, line.quantity + quantity)
+        return line
+
+    def set_quantity(self, product_id: int, quantity: int) -> None:
+        """Set a line's quantity; zero or less removes the line"""
+        line = self._lines.get(int(product_id))
+        if line is None:
+            return
+        quantity = max(quantity, 0)
+        delta = quantity - line.quantity
+        self.total += delta * line.price
+        self.count += delta
+        self.revision += 1
+        line.quantity = quantity
+        if quantity == 0:
+            del self._lines[line.product_id]
+
+    def reprice(self, catalog: Catalog) -> bool:
+        """Refresh line prices, names and brands from ``catalog``; True if any changed
+
+        A no-op while ``catalog`` is the version last checked. Products the
+        catalog no longer has keep their last price.
+        """
+        if catalog.version == self.catalog_version:
+            return False
+        self.catalog_version = catalog.version
+        changed = False
+        for line in self._lines.values():
+            product = catalog.get_product(line.product_id)
+            if product is None:
+                continue
+            current = (int(product['price']), product['name'], product['brand'])
+            if current != (line.price, line.name, line.brand):
+                line.price, line.name, line.brand = current
+                changed = True
+        if changed:
+            self.total = sum(line.subtotal for line in self._lines.values())
+            self.revision += 1
+        return changed
+
+    def increment(self, product_id: int, quantity: int = 1) -> None:
+        self.set_quantity(product_id, self.quantity(product_id) + quantity)
+
+    def decrement(self, product_id: int, quantity: int = 1) -> None:
+        self.set_quantity(product_id, self.quantity(product_id) - quantity)
+
+    def remove(self, product_id: int) -> Optional[CartLine]:
+        line = self._lines.get(int(product_id))
+        if line is not None:
+            self.set_quantity(line.product_id, 0)
+        return line
+
+    def clear(self) -> None:
+        self._lines.clear()
+        self.total = 0
+        self.count = 0
+        self.revision += 1
+
+    def to_items(self) -> List[Dict[str, Any]]:
+        """Plain dicts for order records"""
+        return [line.to_dict() for line in self._lines.values()]
+
+    def to_state(self) -> List[List[Any]]:
+        """Compact ``[id, quantity, price, name, brand]`` rows for session state backends"""
+        return [[line.product_id, line.quantity, line.price, line.name, line.brand] for line in self._lines.values()]
+
+    @classmethod
+    def from_state(cls, rows: List[List[Any]]) -> 'Cart':
+        """Inverse of ``to_state``"""
+        cart = cls()
+        for product_id, quantity, price, name, brand in rows:
+            cart._lines[product_id] = CartLine(product_id, name, brand, price, quantity)
+            cart.total += price * quantity
+            cart.count += quantity
+        return cart
@@ -0,0 +1,551 @@
+"""Process-wide product catalog shared by every session
+
+Streamlit re-executes ``app.py`` on every interaction, but imported modules
+stay loaded, so the catalog cached here is parsed once per process and
+reused by all sessions until ``products.csv`` changes on disk.
+
+When the file changes, the new rows are diffed against the cached catalog
+by id and only the changed products are re-parsed, re-indexed and
+re-rendered (see ``Catalog.patched``). ``watch_catalog`` does this from a
+background thread, so reruns never wait for a reload.
+"""
+import copy
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from techmart.fuzzy import FuzzyIndex
+from techmart.metrics import count, span
+from techmart.pricing import PriceIndex
+from techmart.search import SearchIndex, tokenize
+from techmart.snapshot import read_snapshot, write_snapshot
+from techmart.specs import SpecFilter, parse_spec_filter, parse_specifications
+
+DEFAULT_CATALOG_PATH = 'products.csv'
+
+# How often (seconds) a cached catalog re-checks its source file
+STAT_INTERVAL = 1.0
+
+# CSV files at least this large are loaded with the streaming ingester
+STREAMING_THRESHOLD = 32 * 1024 * 1024
+
+# Rebuild from scratch once this share of the rows changed since the last full build
+DELTA_REBUILD_FRACTION = 0.25
+
+PRODUCT_COLUMNS = ['id', 'name', 'brand', 'category', 'price', 'stock_quantity', 'specifications', 'image_url']
+TEXT_COLUMNS = ['name', 'brand', 'category', 'specifications']
+
+_versions = itertools.count(1)
+
+# Guards the lazy per-version fuzzy index build
+_fuzzy_lock = threading.Lock()
+
+
+def format_price(price: float) -> str:
+    """Format price in Nigerian Naira"""
+    return f"₦{price:,.2f}"
+
+
+def sample_products() -> pd.DataFrame:
+    """Create sample product data used when products.csv is missing"""
+    brands = ['HP', 'Dell', 'Lenovo', 'HP', 'Dell', 'Lenovo', 'HP', 'Dell', 'Lenovo', 'HP']
+    sample_data = {
+        'id': list(range(1, 11)),
+        'name': [
+            'HP Pavilion Gaming 15', 'Dell Inspiron 15 3000', 'Lenovo ThinkPad E14', 'HP EliteBook 840 G8',
+            'Dell XPS 13 9310', 'Lenovo Legion 5 15ACH6H', 'HP Spectre x360 14', 'Dell Latitude 5520',
+            'Lenovo IdeaPad 3 15ITL6', 'HP Omen 15-en1013dx'
+        ],
+        'brand': brands,
+        'category': [
+            'Gaming Laptop', 'Budget Laptop', 'Business Laptop', 'Business Laptop', 'Ultrabook',
+            'Gaming Laptop', '2-in-1 Laptop', 'Business Laptop', 'Budget Laptop', 'Gaming Laptop'
+        ],
+        'price': [425000, 365000, 520000, 685000, 735000, 615000, 695000, 465000, 385000, 575000],
+        'stock_quantity': [15, 25, 12, 8, 6, 10, 7, 18, 22, 14],
+        'specifications': [
+            'Intel Core i5-11300H, 8GB RAM, 512GB SSD, NVIDIA GTX 1650, 15.6" FHD Display, Windows 11',
+            'Intel Core i3-1115G4, 4GB RAM, 1TB HDD, Intel UHD Graphics, 15.6" HD Display, Windows 11',
+            'Intel Core i5-1135G7, 8GB RAM, 256GB SSD, Intel Iris Xe Graphics, 14" FHD Display, Windows 11 Pro',
+            'Intel Core i7-1165G7, 16GB RAM, 512GB SSD, Intel Iris Xe Graphics, 14" FHD Display, Windows 11 Pro',
+            'Intel Core i7-1165G7, 16GB RAM, 512GB SSD, Intel Iris Xe Graphics, 13.3" 4K OLED Display, Windows 11',
+            'AMD Ryzen 5 5600H, 8GB RAM, 512GB SSD, NVIDIA RTX 3060, 15.6" FHD 120Hz Display, Windows 11',
+            'Intel Core i7-1165G7, 16GB RAM, 1TB SSD, Intel Iris Xe Graphics, 13.5" 3K2K OLED Touchscreen, Windows 11',
+            'Intel Core i5-1135G7, 8GB RAM, 256GB SSD, Intel Iris Xe Graphics, 15.6" FHD Display, Windows 11 Pro',
+            'Intel Core i3-1115G4, 4GB RAM, 1TB HDD, Intel UHD Graphics, 15.6" HD Display, Windows 11',
+            'AMD Ryzen 7 5800H, 8GB RAM, 512GB SSD, NVIDIA RTX 3060, 15.6" FHD 144Hz Display, Windows 11'
+        ],
+        'image_url': [f'https://via.placeholder.com/300x200/{"0073e6" if brand == "HP" else "007DB8" if brand == "Dell" else "E2231A"}/FFFFFF?text={brand}+Laptop'
+                      for brand in brands]
+    }
+    return pd.DataFrame(sample_data)
+
+
+class CatalogDelta(NamedTuple):
+    """Products that differ between a patched catalog and the version it was patched from"""
+    base_version: int
+    changed_ids: List[int]
+    removed_ids: List[int]
+
+
+def _patch_column(old: pd.Series, size: int, rows: np.ndarray, values: pd.Series) -> Any:
+    """``old`` resized to ``size`` with ``values`` written at ``rows``
+
+    Any rows added past the end of ``old`` are among ``rows``.
+    """
+    if isinstance(old.dtype, pd.CategoricalDtype):
+        categories = old.cat.categories
+        categories = categories.append(values.cat.categories.difference(categories))
+        codes = np.full(size, -1, dtype=np.int32)
+        codes[:min(size, len(old))] = old.cat.codes.to_numpy()[:size]
+        codes[rows] = categories.get_indexer(values.astype(object))
+        return pd.Categorical.from_codes(codes, categories)
+    if size > len(old):
+        # Grow with placeholder rows of the right dtype; they are overwritten below
+        patched = pd.concat([old, values.iloc[:size - len(old)]], ignore_index=True)
+    else:
+        patched = old.iloc[:size].copy()
+    patched.iloc[rows] = values.to_numpy()
+    return patched
+
+
+class DerivedMemo:
+    """Bounded LRU of results computed from one catalog version
+
+    Kept in ``Catalog.derived`` rather than a module-level ``lru_cache``, so
+    an old catalog and everything memoized from it are freed together. Not a
+    dict, so a delta reload drops it instead of carrying it over.
+    """
+    __slots__ = ('maxsize', '_entries', '_lock')
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Catalog:
+    """Immutable snapshot of the product table plus derived columns
+
+    Instances are shared across sessions and threads; never mutate ``df``
+    or the arrays hanging off it. A changed source file produces a new
+    ``Catalog`` with a new ``version`` instead.
+    """
+
+    def __init__(self, df: pd.DataFrame, source: str, signature: Optional[Tuple[int, int]] = None):
+        df = self._prepare(df)
+        self._setup(df, source, signature, SearchIndex.build(df), PriceIndex(df['price'].to_numpy()))
+
+    @classmethod
+    def from_prepared(cls, df: pd.DataFrame, source: str, signature: Optional[Tuple[int, int]],
+                      search_index: SearchIndex, price_index: PriceIndex) -> 'Catalog':
+        """Wrap an already prepared table and its prebuilt indexes (snapshot loads)"""
+        catalog = cls.__new__(cls)
+        catalog._setup(df, source, signature, search_index, price_index)
+        return catalog
+
+    def _setup(self, df: pd.DataFrame, source: str, signature: Optional[Tuple[int, int]],
+               search_index: SearchIndex, price_index: PriceIndex, row_by_id: Optional[Dict[int, int]] = None,
+               columns: Optional[Dict[str, List[Any]]] = None) -> None:
+        self.source = source
+        self.signature = signature
+        self.version = next(_versions)
+        self.df = df
+        self.search_index = search_index
+        self.price_index = price_index
+        # id -> row position, plus plain per-column lists for O(1) record assembly
+        if row_by_id is None:
+            row_by_id = {product_id: row for row, product_id in enumerate(self.df['id'].tolist())}
+        self.row_by_id: Dict[int, int] = row_by_id
+        self._columns = columns or {column: self.df[column].tolist() for column in PRODUCT_COLUMNS}
+        self.brands = sorted(self.df['brand'].unique().tolist())
+        self.categories = sorted(self.df['category'].unique().tolist())
+        # Lazily built per-version artifacts (rendered card HTML, sort orders, ...).
+        # Dicts keyed by row position survive a delta reload minus the changed rows;
+        # anything else, including ``DerivedMemo`` entries, starts over.
+        self.derived: Dict[str, Any] = {}
+        # Set when this version was patched from another one (see ``patched``)
+        self.delta: Optional[CatalogDelta] = None
+        self.patched_rows = 0
+
+    @staticmethod
+    def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+        """Coerce the product columns to the types every catalog version uses
+
+        Rows whose id or price is blank or not a number are dropped (and
+        counted as ``catalog.rows_rejected``) instead of failing the load,
+        as ``techmart.ingest`` does for feeds. A blank or invalid stock
+        count reads as 0.
+        """
+        df = df.reset_index(drop=True).copy()
+        ids = pd.to_numeric(df['id'], errors='coerce')
+        prices = pd.to_numeric(df['price'], errors='coerce')
+        bad = (ids.isna() | (ids % 1 != 0) | prices.isna() | (prices < 0)).to_numpy()
+        if bad.any():
+            count('catalog.rows_rejected', int(bad.sum()))
+            df, ids, prices = df[~bad].reset_index(drop=True), ids[~bad], prices[~bad]
+        df['id'] = ids.astype('int64').to_numpy()
+        df['price'] = prices.round().astype('int64').to_numpy()
+        stock = pd.to_numeric(df['stock_quantity'], errors='coerce')
+        df['stock_quantity'] = stock.where(stock >= 0, 0).fillna(0).astype('int64')
+        for column in TEXT_COLUMNS + ['image_url']:
+            df[column] = df[column].fillna('').astype(str)
+        return df
+
+    @staticmethod
+    def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+        df = Catalog._normalize(df)
+
+        # Derived columns computed once per catalog version
+        for column in TEXT_COLUMNS:
+            df[f'{column}_lower'] = df[column].str.lower()
+        df['price_display'] = [format_price(price) for price in df['price']]
+        return pd.concat([df, parse_specifications(df['specifications'])], axis=1)
+
+    def patched(self, df: pd.DataFrame, signature: Optional[Tuple[int, int]]) -> Optional['Catalog']:
+        """A new version holding the products in ``df``, re-deriving only what changed
+
+        Products are matched by id. Changed and added products are parsed,
+        indexed and rendered again; everything else carries over, including
+        the row positions of untouched products. New products take the
+        slots of removed ones or are appended, so row order can differ from
+        the file. Returns None when a full rebuild is the better choice:
+        duplicate ids, different columns, or more than
+        ``DELTA_REBUILD_FRACTION`` of the rows changed since the last one.
+        """
+        new = self._normalize(df)
+        old_count, size = len(self), len(new)
+        raw_columns = list(new.columns)
+        if (any(column not in self.df.columns for column in raw_columns) or not new['id'].is_unique
+                or len(self.row_by_id) != old_count):
+            return None
+
+        old_ids = self.df['id'].to_numpy()
+        old_row = pd.Index(old_ids).get_indexer(new['id'].to_numpy())
+        common = np.flatnonzero(old_row >= 0)
+        added = np.flatnonzero(old_row < 0)
+        alive = np.zeros(old_count, dtype=bool)
+        alive[old_row[common]] = True
+        removed = np.flatnonzero(~alive)
+
+        changed = np.zeros(len(common), dtype=bool)
+        text_changed = np.zeros(len(common), dtype=bool)
+        for column in raw_columns:
+            # Series comparison stays vectorized for Arrow-backed string columns too
+            differs = (new[column].iloc[common].reset_index(drop=True)
+                       != self.df[column].iloc[old_row[common]].reset_index(drop=True)).to_numpy()
+            changed |= differs
+            if column in TEXT_COLUMNS:
+                text_changed |= differs
+        if not changed.any() and not len(added) and not len(removed):
+            # Touched but identical: same version under the new signature
+            catalog = copy.copy(self)
+            catalog.signature = signature
+            return catalog
+        touched = self.patched_rows + int(changed.sum()) + len(added) + len(removed)
+        if touched > DELTA_REBUILD_FRACTION * max(old_count, size):
+            return None
+
+        # Untouched products keep their rows. Added products fill the slots of
+        # removed ones (or extend the table); if the table shrinks, products
+        # past its new end move into the remaining slots.
+        position = np.arange(old_count)
+        position[removed] = -1
+        free = np.concatenate([removed[removed < size], np.arange(old_count, size)])
+        movers = np.flatnonzero(alive[size:]) + size
+        position[movers] = free[:len(movers)]
+        target = np.empty(size, dtype=np.int64)
+        target[common] = position[old_row[common]]
+        target[added] = free[len(movers):]
+        moved = target[common] != old_row[common]
+
+        rewrite = np.concatenate([common[changed | moved], added])
+        part = self._prepare(new.iloc[rewrite])
+        if not part.columns.equals(self.df.columns):
+            return None
+        rows = target[rewrite]
+        patched_df = pd.DataFrame({column: _patch_column(self.df[column], size, rows, part[column])
+                                   for column in self.df.columns}, copy=False)
+
+        columns = {}
+        for column, values in self._columns.items():
+            values = values[:size] + [None] * (size - old_count)
+            for row, value in zip(rows.tolist(), part[column].tolist()):
+                values[row] = value
+            columns[column] = values
+        row_by_id = dict(self.row_by_id)
+        for product_id in old_ids[removed].tolist():
+            del row_by_id[product_id]
+        row_by_id.update(zip(part['id'].tolist(), rows.tolist()))
+
+        # Price-only and stock-only changes leave the search postings alone
+        reindexed = np.concatenate([common[text_changed | moved], added])
+        unindexed = np.concatenate([old_row[common[text_changed | moved]], removed])
+        search_index = self.search_index.patched(self.df.iloc[unindexed], unindexed.tolist(),
+                                                 patched_df.iloc[target[reindexed]], target[reindexed].tolist(),
+                                                 columns['id'])
+        price_index = self.price_index.patched(patched_df['price'].to_numpy(), rows)
+
+        catalog = Catalog.__new__(Catalog)
+        catalog._setup(patched_df, self.source, signature, search_index, price_index, row_by_id, columns)
+        stale = set(rows.tolist())
+        for key, value in list(self.derived.items()):
+            if isinstance(value, dict):
+                catalog.derived[key] = {row: item for row, item in dict(value).items()
+                                        if row < size and row not in stale}
+        catalog.delta = CatalogDelta(self.version, part['id'].tolist(), old_ids[removed].tolist())
+        catalog.patched_rows = touched
+        return catalog
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """Return product ids ranked by relevance to ``query``"""
+        return self.search_index.search(query, limit)
+
+    def record(self, row: int) -> Dict[str, Any]:
+        """Product fields at row position ``row`` as a plain dict"""
+        return {column: values[row] for column, values in self._columns.items()}
+
+    def records(self, rows: Iterable[int]) -> List[Dict[str, Any]]:
+        return [self.record(row) for row in rows]
+
+    def get_product(self, product_id: int) -> Optional[Dict[str, Any]]:
+        """Look up a product by id in constant time (``None`` if unknown)"""
+        row = self.row_by_id.get(int(product_id))
+        return None if row is None else self.record(row)
+
+    def get_products(self, product_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Batch lookup preserving order; unknown ids are skipped"""
+        rows = (self.row_by_id.get(int(product_id)) for product_id in product_ids)
+        return [self.record(row) for row in rows if row is not None]
+
+    def memoized(self, name: str, key: Hashable, build: Callable[[], Any], maxsize: int = 64) -> Any:
+        """``build()`` memoized under ``key`` in this version's ``name`` memo (see ``DerivedMemo``)"""
+        memo = self.derived.get(name)
+        if memo is None:
+            memo = self.derived.setdefault(name, DerivedMemo(maxsize))
+        return memo.get(key, build)
+
+    @property
+    def fuzzy_index(self) -> FuzzyIndex:
+        """Typo-tolerant lookup over the search vocabulary, built on first use"""
+        index = self.derived.get('fuzzy_index')
+        if index is None:
+            with _fuzzy_lock:
+                index = self.derived.get('fuzzy_index')
+                if index is None:
+                    postings = self.search_index.postings
+                    with span('catalog.fuzzy_build'):
+                        index = self.derived['fuzzy_index'] = FuzzyIndex(
+                            postings, self._columns['name'], frequency=lambda term: len(postings[term]))
+        return index
+
+    def correct_terms(self, terms: Iterable[str]) -> List[str]:
+        """``terms`` with words the search index lacks replaced by their closest indexed spelling
+
+        A correction is dropped when no product has it together with the
+        correctly spelled words, so chat filler ("good") never turns into
+        an unrelated product word ("gold").
+        """
+        terms = list(terms)
+        postings = self.search_index.postings
+        if all(term in postings for term in terms):
+            return terms
+        known = [term for term in terms if term in postings]
+        corrected: List[str] = []
+        for term in terms:
+            if term in postings:
+                corrected.append(term)
+                continue
+            replacement = self.fuzzy_index.correct(term)
+            if replacement and self.search_index.co_occur(known + list(replacement)):
+                count('search.corrected')
+                corrected.extend(replacement)
+        return corrected
+
+    def correct_query(self, query: str) -> str:
+        """Search text for ``query`` with misspelled product words corrected"""
+        return ' '.join(self.correct_terms(tokenize(query)))
+
+    def parse_query(self, query: str) -> Tuple[SpecFilter, List[str]]:
+        """Split a chat query into its spec/price constraints and corrected search terms"""
+        spec, text = parse_spec_filter(query)
+        return spec, self.correct_terms(tokenize(text))
+
+    def find_rows(self, query: str) -> List[int]:
+        """Row positions matching a chat query's text and spec/price constraints"""
+        return self.match_rows(*self.parse_query(query))
+
+    def match_rows(self, spec: SpecFilter, terms: List[str]) -> List[int]:
+        """Row positions for parsed query parts (see ``parse_query``), best match first"""
+        text = ' '.join(terms)
+        if spec.is_empty():
+            return self.search_index.search_rows(text)
+        mask = spec.mask(self.df)
+        if self.search_index.has_terms(text):
+            return [row for row in self.search_index.search_rows(text) if mask[row]]
+        # Constraint-only queries come back cheapest first
+        rows = self.price_index.range_rows(spec.min_price, spec.max_price)
+        return rows[mask[rows]].tolist()
+
+    def filter_rows(self, spec: SpecFilter) -> np.ndarray:
+        """Return row positions matching ``spec`` (vectorized over parsed columns)"""
+        return np.flatnonzero(spec.mask(self.df))
+
+    def filter(self, spec: SpecFilter) -> List[int]:
+        """Return product ids matching ``spec`` in catalog order"""
+        return self.df['id'].to_numpy()[self.filter_rows(spec)].tolist()
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    @property
+    def empty(self) -> bool:
+        return self.df.empty
+
+
+# path -> (catalog, last stat check as monotonic time)
+_catalogs: Dict[str, Tuple[Catalog, float]] = {}
+_lock = threading.Lock()
+# path -> background reload thread (see watch_catalog)
+_watchers: Dict[str, threading.Thread] = {}
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """``(mtime_ns, size)`` of ``path``, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load(path: str, signature: Optional[Tuple[int, int]], previous: Optional[Catalog] = None) -> Catalog:
+    df = None
+    patchable = previous is not None and previous.signature is not None
+    if signature is not None:
+        if not patchable:
+            # A compiled snapshot of this exact file skips CSV parsing and index builds
+            parts = read_snapshot(path, signature)
+            if parts is not None:
+                count('catalog.snapshot_load')
+                return Catalog.from_prepared(parts.df, path, signature, parts.search_index, parts.price_index)
+            if signature[1] >= STREAMING_THRESHOLD:
+                # Big feeds are parsed chunk by chunk across worker processes
+                from techmart.ingest import ingest_catalog  # techmart.ingest imports this module
+                catalog = ingest_catalog(path).catalog
+                if not catalog.empty:
+                    return catalog
+        try:
+            df = pd.read_csv(path)
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            df = None
+        if patchable and df is not None and not df.empty:
+            # An edit to a loaded catalog: re-derive only the changed products
+            catalog = previous.patched(df, signature)
+            if catalog is not None:
+                count('catalog.delta_reload')
+                return catalog
+    if df is None or df.empty:
+        # Don't show error in production, fall back to the built-in sample data
+        df = sample_products()
+    return Catalog(df, path, signature)
+
+
+def _refresh(path: str, now: float) -> Catalog:
+    """Reload ``path`` if it changed since it was cached (caller holds ``_lock``)"""
+    cached = _catalogs.get(path)
+    signature = file_signature(path)
+    if cached is not None and cached[0].signature == signature:
+        _catalogs[path] = (cached[0], now)
+        count('catalog.cache_hit')
+        return cached[0]
+    count('catalog.cache_miss')
+    with span('catalog.load'):
+        catalog = _load(path, signature, cached[0] if cached else None)
+    # Swapped in whole: reruns still holding the old version keep a consistent view
+    _catalogs[path] = (catalog, now)
+    return catalog
+
+
+def get_catalog(path: str = DEFAULT_CATALOG_PATH) -> Catalog:
+    """Return the shared catalog for ``path``, reloading only if the file changed
+
+    The file is stat'ed at most once every ``STAT_INTERVAL`` seconds, so a
+    typical rerun costs a single dictionary lookup. Paths with a running
+    ``watch_catalog`` thread are never stat'ed here at all.
+    """
+    path = os.path.abspath(path)
+    cached = _catalogs.get(path)
+    now = time.monotonic()
+    if cached is not None and (path in _watchers or now - cached[1] < STAT_INTERVAL):
+        count('catalog.cache_hit')
+        return cached[0]
+
+    with _lock:
+        return _refresh(path, now)
+
+
+def watch_catalog(path: str = DEFAULT_CATALOG_PATH, interval: float = STAT_INTERVAL) -> None:
+    """Reload ``path`` from a background thread whenever it changes (once per path)
+
+    Readers then never stat the file or wait for a reload: they get the
+    current version until the watcher swaps in the next one.
+    """
+    path = os.path.abspath(path)
+    if path in _watchers:
+        return
+    with _lock:
+        if path in _watchers:
+            return
+        _refresh(path, time.monotonic())
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    with _lock:
+                        _refresh(path, time.monotonic())
+                except Exception:
+                    # e.g. a half-written file; the next tick retries
+                    count('catalog.reload_error')
+
+        thread = threading.Thread(target=run, name='techmart-catalog-watcher', daemon=True)
+        thread.start()
+        _watchers[path] = thread
+
+
+def compile_snapshot(path: str = DEFAULT_CATALOG_PATH) -> str:
+    """Parse ``path`` and write its columnar snapshot; returns the snapshot directory"""
+    path = os.path.abspath(path)
+    signature = file_signature(path)
+    df = pd.read_csv(path)
+    if file_signature(path) != signature:
+        raise RuntimeError(f"{path} changed while it was being compiled")
+    return write_snapshot(Catalog(df, path, signature))
+
+
+def clear_catalog_cache() -> None:
+    """Drop every cached catalog (the next access reloads from disk)"""
+    with _lock:
+        _catalogs.clear()
@@ -0,0 +1,159 @@
+"""Bounded per-session chat transcript
+
+Each message is rendered to HTML once, when it is appended, so a rerun only
+re-emits the last ``window`` prepared fragments. Messages that fall out of
+the ``keep_full`` most recent ones are compacted to a short plain-text
+preview (markup stripped, cut at a word boundary), and the
+oldest compacted ones are dropped once the transcript exceeds its character
+budget, which caps per-session memory no matter how long the chat runs.
+"""
+import html
+import re
+from collections import deque
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+DEFAULT_WINDOW = 20
+DEFAULT_KEEP_FULL = 50
+DEFAULT_MAX_CHARS = 100_000
+COMPACT_CHARS = 160
+
+_TAG_RE = re.compile(r'<[^>]*>')
+_MARKDOWN_RE = re.compile(r'\*+|`+|~~|__|^\s*#+\s*', re.MULTILINE)
+
+
+class ChatMessage(NamedTuple):
+    role: str
+    content: str
+    html: str
+    compacted: bool = False
+
+
+def compact_preview(content: str, limit: int = COMPACT_CHARS) -> str:
+    """Plain-text preview of a message: markup removed, cut at a word boundary
+
+    Cutting the raw text could split a ``**bold**`` pair or an HTML tag and
+    break the rendering of every bubble after it.
+
+    >>> compact_preview("Found **3 laptops**:\\n\\n1. <b>HP</b> Omen", 80)
+    'Found 3 laptops: 1. HP Omen'
+    >>> compact_preview("**Dell XPS 13** is a great ultrabook for students", 24)
+    'Dell XPS 13 is a great…'
+    """
+    text = ' '.join(_MARKDOWN_RE.sub('', html.unescape(_TAG_RE.sub(' ', content))).split())
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    if ' ' in cut:
+        cut = cut[:cut.rindex(' ')]
+    return cut.rstrip(' ,;:.') + '…'
+
+
+def render_message_html(role: str, content: str, compacted: bool = False) -> str:
+    """Markup for one chat bubble (user text and previews are escaped, bot markdown is kept)"""
+    if role == 'user':
+        return f"""
+                    <div class="chat-message user-message">
+                        <strong>You:</strong> {html.escape(content)}
+                    </div>
+                    """
+    if compacted:
+        content = html.escape(content)
+    return f"""
+                    <div class="chat-message bot-message">
+                        <strong>Assistant:</strong> {content}
+                    </div>
+                    """
+
+
+class ChatTranscript:
+    """Windowed chat history with compaction and a hard size cap"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW, keep_full: int = DEFAULT_KEEP_FULL,
+                 max_chars: int = DEFAULT_MAX_CHARS):
+        self.window = window
+        self.keep_full = max(keep_full, window)
+        self.max_chars = max_chars
+        self._messages: deque = deque()
+        self._full_count = 0
+        self._chars = 0
+        self.dropped = 0
+        # Bumped on every change, so state backends can skip an unchanged transcript
+        self.revision = 0
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[ChatMessage]:
+        return iter(self._messages)
+
+    @staticmethod
+    def _size(message: ChatMessage) -> int:
+        return len(message.content) + len(message.html)
+
+    def append(self, role: str, content: str) -> ChatMessage:
+        message = ChatMessage(role, content, render_message_html(role, content))
+        self._messages.append(message)
+        self._full_count += 1
+        self._chars += self._size(message)
+        self._compact()
+        self.revision += 1
+        return message
+
+    def _compact(self) -> None:
+        # Shrink the oldest full message(s) beyond keep_full into previews
+        if self._full_count > self.keep_full:
+            first_full = len(self._messages) - self._full_count
+            for index in range(first_full, first_full + self._full_count - self.keep_full):
+                old = self._messages[index]
+                preview = compact_preview(old.content)
+                new = ChatMessage(old.role, preview, render_message_html(old.role, preview, True), True)
+                self._messages[index] = new
+                self._chars += self._size(new) - self._size(old)
+            self._full_count = self.keep_full
+
+        while self._chars > self.max_chars and len(self._messages) > 1:
+            old = self._messages.popleft()
+            self._chars -= self._size(old)
+            if not old.compacted:
+                self._full_count -= 1
+            self.dropped += 1
+
+    def visible(self, extra: int = 0) -> List[ChatMessage]:
+        """The most recent ``window + extra`` messages, oldest first"""
+        count = min(len(self._messages), self.window + max(extra, 0))
+        start = len(self._messages) - count
+        return [self._messages[index] for index in range(start, len(self._messages))]
+
+    def hidden_count(self, extra: int = 0) -> int:
+        """How many kept messages sit above the visible window"""
+        return max(0, len(self._messages) - self.window - max(extra, 0))
+
+    def last(self) -> Optional[ChatMessage]:
+        return self._messages[-1] if self._messages else None
+
+    def clear(self) -> None:
+        self._messages.clear()
+        self._full_count = 0
+        self._chars = 0
+        self.revision += 1
+
+    def to_state(self) -> Dict[str, Any]:
+        """Messages as ``[role, content]`` (``[role, content, 1]`` when compacted); HTML is not stored"""
+        return {
+            'messages': [[m.role, m.content, 1] if m.compacted else [m.role, m.content] for m in self._messages],
+            'dropped': self.dropped,
+            'limits': [self.window, self.keep_full, self.max_chars],
+        }
+
+    @classmethod
+    def from_state(cls, data: Dict[str, Any]) -> 'ChatTranscript':
+        """Inverse of ``to_state``; bubble HTML is rendered again"""
+        transcript = cls(*data['limits'])
+        for role, content, *compacted in data['messages']:
+            message = ChatMessage(role, content, render_message_html(role, content, bool(compacted)), bool(compacted))
+            transcript._messages.append(message)
+            transcript._chars += transcript._size(message)
+            if not message.compacted:
+                transcript._full_count += 1
+        transcript.dropped = data['dropped']
+        return transcript
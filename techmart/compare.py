@@ -0,0 +1,165 @@
+"""Side-by-side product comparison
+
+``resolve_products`` picks the 2-5 laptops a chat message asks to compare:
+by position in the last results ("compare 1 and 3", "the first two"), by
+name among the last results, or by a catalog search per named product.
+``comparison_table`` then reads just their cells and lines up their
+parsed spec fields, marking the best value in each row. Tables are
+memoized per catalog version and product-id tuple.
+"""
+import html
+import re
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from techmart.catalog import Catalog, format_price
+from techmart.search import tokenize
+
+MIN_COMPARE = 2
+MAX_COMPARE = 5
+
+# Tables (and their markup) remembered per catalog version
+COMPARE_CACHE_SIZE = 256
+
+_COMPARE_WORDS_RE = re.compile(
+    r"\b(?:compare|comparison|differences?|between|which is better|what'?s|side by side)\b")
+_SEPARATOR_RE = re.compile(r',|&|\b(?:and|vs\.?|versus|against|with|or|to)\b')
+_ORDINALS = {'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5,
+             '1st': 1, '2nd': 2, '3rd': 3, '4th': 4, '5th': 5}
+_FILLER = {'the', 'one', 'number', 'no', '#', 'laptop', 'item'}
+_COUNTS = {'two': 2, 'three': 3, 'four': 4, 'five': 5}
+_LEADING_RE = re.compile(r'\b(?:first|top)\s+(two|three|four|five|[2-5])\b')
+
+
+class ComparisonRow(NamedTuple):
+    label: str
+    cells: Tuple[str, ...]
+    best: Tuple[bool, ...]
+
+
+class ComparisonTable(NamedTuple):
+    product_ids: Tuple[int, ...]
+    names: Tuple[str, ...]
+    rows: Tuple[ComparisonRow, ...]
+
+
+def _storage(product: Any) -> str:
+    kind = product['storage_type'].upper() if product['storage_type'] != 'unknown' else ''
+    size = product['storage_gb']
+    amount = f"{size // 1024}TB" if size and size % 1024 == 0 else f"{size}GB"
+    return f"{amount} {kind}".strip() if size else '—'
+
+
+def _cpu(product: Any) -> str:
+    family = product['cpu_family']
+    if family == 'other':
+        return '—'
+    name = f"Core {family}" if family.startswith('i') else family.title()
+    return f"{name} (gen {product['cpu_generation']})" if product['cpu_generation'] else name
+
+
+# (label, display, rank key where higher is better or None when there is no "best")
+FIELDS: List[Tuple[str, Callable[[Any], str], Optional[Callable[[Any], Any]]]] = [
+    ('Price', lambda p: format_price(p['price']), lambda p: -p['price']),
+    ('Brand', lambda p: p['brand'], None),
+    ('Category', lambda p: p['category'], None),
+    # Generations are numbered differently per vendor, so only the tier ranks
+    ('CPU', _cpu, lambda p: p['cpu_tier']),
+    ('RAM', lambda p: f"{p['ram_gb']}GB" if p['ram_gb'] else '—', lambda p: p['ram_gb']),
+    ('Storage', _storage, lambda p: (p['storage_type'] == 'ssd', p['storage_gb'])),
+    ('Graphics', lambda p: p['gpu'] or '—', lambda p: (p['gpu_dedicated'], p['gpu_model'])),
+    ('Screen', lambda p: f'{p["screen_in"]:g}"' if p['screen_in'] else '—', None),
+    ('Refresh rate', lambda p: f"{p['refresh_hz']}Hz", lambda p: p['refresh_hz']),
+    ('OS', lambda p: p['os'].title() if p['os'] != 'none' else '—', None),
+]
+
+_COLUMNS = ['id', 'name', 'brand', 'category', 'price', 'cpu_family', 'cpu_tier', 'cpu_generation', 'ram_gb',
+            'storage_gb', 'storage_type', 'gpu', 'gpu_dedicated', 'gpu_model', 'screen_in', 'refresh_hz', 'os']
+
+
+def comparison_table(catalog: Catalog, product_ids: Tuple[int, ...]) -> ComparisonTable:
+    """Aligned spec rows for ``product_ids`` (unknown ids are skipped), memoized per catalog version"""
+    return catalog.memoized('comparison_table', product_ids, lambda: _build_table(catalog, product_ids),
+                            COMPARE_CACHE_SIZE)
+
+
+def _build_table(catalog: Catalog, product_ids: Tuple[int, ...]) -> ComparisonTable:
+    rows = [catalog.row_by_id[product_id] for product_id in product_ids if product_id in catalog.row_by_id]
+    # Scalar reads of just the compared cells; slicing a frame costs more for a handful of rows
+    columns = [(name, catalog.df[name]) for name in _COLUMNS]
+    products = [{name: values.iat[row] for name, values in columns} for row in rows]
+
+    table_rows = []
+    for label, display, rank in FIELDS:
+        cells = tuple(display(product) for product in products)
+        best = (False,) * len(products)
+        if rank is not None and len(products) > 1:
+            keys = [rank(product) for product in products]
+            top = max(keys)
+            if any(key != top for key in keys):
+                best = tuple(key == top for key in keys)
+        table_rows.append(ComparisonRow(label, cells, best))
+    return ComparisonTable(tuple(int(product['id']) for product in products),
+                           tuple(product['name'] for product in products), tuple(table_rows))
+
+
+def resolve_products(catalog: Catalog, message: str, last_results: Sequence[int]) -> List[int]:
+    """Ids of the products ``message`` asks to compare, in the order named"""
+    text = message.lower()
+    leading = _LEADING_RE.search(text)
+    if leading:
+        count = _COUNTS.get(leading.group(1)) or int(leading.group(1))
+        return list(last_results[:count])
+
+    chosen: List[int] = []
+    last_names = [(product['id'], set(tokenize(product['name']))) for product in catalog.get_products(last_results)]
+    for segment in _SEPARATOR_RE.split(_COMPARE_WORDS_RE.sub(' ', text)):
+        words = [word for word in segment.split() if word not in _FILLER]
+        if len(words) == 1 and (words[0] in _ORDINALS or words[0].isdigit()):
+            position = _ORDINALS.get(words[0]) or int(words[0])
+            if 0 < position <= len(last_results):
+                chosen.append(last_results[position - 1])
+                continue
+        terms = set(catalog.correct_terms(tokenize(segment)))
+        if not terms:
+            continue
+        # A product from the last reply whose name has every word wins over a fresh search
+        named = [product_id for product_id, name in last_names if terms <= name]
+        if named:
+            chosen.append(named[0])
+            continue
+        found = catalog.search_index.search(' '.join(terms), limit=1)
+        if found:
+            chosen.append(found[0])
+
+    ids = list(dict.fromkeys(chosen))
+    if len(ids) < MIN_COMPARE:
+        # "compare them" / "which is better?" refers to the last results
+        ids = list(dict.fromkeys(ids + list(last_results)))
+    return ids[:MAX_COMPARE]
+
+
+def table_text(table: ComparisonTable) -> str:
+    """Plain chat rendering: one line per field, best values in bold"""
+    lines = [' vs '.join(f"**{name}**" for name in table.names), '']
+    for row in table.rows:
+        cells = [f"**{cell}** ✓" if best else cell for cell, best in zip(row.cells, row.best)]
+        lines.append(f"• {row.label}: " + ' | '.join(cells))
+    return '\n'.join(lines)
+
+
+def table_html(catalog: Catalog, table: ComparisonTable) -> str:
+    """Markup for the comparison view; best cells carry the ``best-value`` class
+
+    Memoized next to the table in ``catalog``, the version ``table`` was built from.
+    """
+    return catalog.memoized('comparison_html', table, lambda: _render_html(table), COMPARE_CACHE_SIZE)
+
+
+def _render_html(table: ComparisonTable) -> str:
+    header = ''.join(f"<th>{html.escape(name)}</th>" for name in table.names)
+    body = ''
+    for row in table.rows:
+        cells = ''.join(f'<td class="best-value">{html.escape(cell)}</td>' if best else f"<td>{html.escape(cell)}</td>"
+                        for cell, best in zip(row.cells, row.best))
+        body += f"<tr><th>{row.label}</th>{cells}</tr>"
+    return f'<table class="comparison-table"><tr><th></th>{header}</tr>{body}</table>'
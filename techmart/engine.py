@@ -0,0 +1,460 @@
+"""Headless chat engine: the bot's conversation logic without Streamlit
+
+``ChatEngine.process_message`` takes an explicit session state object and
+returns a ``BotResponse`` describing the reply text, the products to show
+and any side effects (cart changes) as ``Event`` records. The Streamlit app
+is a thin adapter that copies those results into ``st.session_state`` and
+widgets; batch replays, load tests and other frontends drive the engine
+directly with plain ``SessionState`` objects.
+"""
+import re
+import uuid
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from techmart.cart import Cart
+from techmart.catalog import Catalog, format_price, get_catalog
+from techmart.compare import MIN_COMPARE, ComparisonTable, comparison_table, resolve_products, table_text
+from techmart.filters import SearchFilters, describe, merge, narrow, narrows, parse_filters, starts_new_search
+from techmart.inventory import InventoryService, get_inventory
+from techmart.metrics import count, span, timed
+from techmart.orders import OrderStore, get_order_store
+from techmart.query_cache import QUERY_CACHE, CachedSearch, QueryCache
+from techmart.recommend import get_recommender
+from techmart.router import ROUTER, IntentRouter
+from techmart.search import tokenize
+
+# How many results a chat reply lists (and offers buttons for)
+MAX_CHAT_RESULTS = 5
+
+RECOMMENDATION_KINDS = ('similar', 'cheaper', 'upgrades')
+
+CUSTOMER_FIELDS = ('customer_name', 'email', 'phone', 'address')
+
+_NAME_PATTERNS = [
+    re.compile(r"(?:my name is|i'm|i am|call me)\s+([a-zA-Z]+)"),
+    re.compile(r"^([a-zA-Z]+)$"),  # Just a single word (likely a name)
+]
+
+
+class SessionState:
+    """Conversation state for one shopper
+
+    Mirrors the chat-related keys of ``st.session_state`` so the engine can
+    run on either; anything with these attributes works.
+    """
+
+    def __init__(self, session_id: Optional[str] = None, user_name: Optional[str] = None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.user_name = user_name
+        self.cart = Cart()
+        self.last_results: List[int] = []
+        self.search_filters = SearchFilters()
+
+
+class Event(NamedTuple):
+    """A side effect of handling a message, for the frontend to surface"""
+    kind: str
+    product_id: Optional[int] = None
+    message: str = ''
+
+
+@dataclass
+class BotResponse:
+    text: str
+    intent: str
+    product_ids: List[int] = field(default_factory=list)
+    events: List[Event] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'text': self.text,
+            'intent': self.intent,
+            'product_ids': self.product_ids,
+            'events': [event._asdict() for event in self.events],
+        }
+
+
+class Listing(NamedTuple):
+    """A formatted results reply minus the live stock lines (memoized per cached search)"""
+    product_ids: Tuple[int, ...]
+    heads: Tuple[str, ...]
+    footer: str
+
+
+class ChatEngine:
+    """Stateless bot logic; all per-shopper state lives in the session object"""
+
+    def __init__(self, catalog: Optional[Catalog] = None, inventory: Optional[InventoryService] = None,
+                 router: IntentRouter = ROUTER, orders: Optional[OrderStore] = None,
+                 query_cache: Optional[QueryCache] = QUERY_CACHE):
+        self._catalog = catalog
+        self._inventory = inventory
+        self._orders = orders
+        self.router = router
+        # None disables result caching (every search runs against the index)
+        self.query_cache = query_cache
+
+    @property
+    def catalog(self) -> Catalog:
+        # Unpinned engines follow catalog reloads
+        return self._catalog or get_catalog()
+
+    @property
+    def inventory(self) -> InventoryService:
+        return self._inventory or get_inventory(self.catalog)
+
+    @property
+    def orders(self) -> OrderStore:
+        return self._orders or get_order_store()
+
+    def search_products(self, query: str, limit: Optional[int] = None) -> List[Dict]:
+        """Search products based on query (the best ``limit`` when given)"""
+        return self.search_page(query, limit)[1]
+
+    def search_page(self, query: str, limit: Optional[int] = None) -> Tuple[int, List[Dict]]:
+        """``(match count, records)`` for ``query``; records are assembled for the best ``limit`` rows only"""
+        catalog = self.catalog
+        if catalog.empty:
+            return 0, []
+        rows = self._search(catalog, query).rows
+        return len(rows), catalog.records(rows[:limit].tolist())
+
+    @timed('search')
+    def _search(self, catalog: Catalog, query: str) -> CachedSearch:
+        """Ranked rows for ``query``, shared with earlier queries that normalize the same way"""
+        # Ranked lookup in the prebuilt index, narrowed by any parsed spec constraints
+        spec, terms = catalog.parse_query(query)
+        return self._match(catalog, spec, terms)
+
+    def _match(self, catalog: Catalog, spec, terms: Sequence[str]) -> CachedSearch:
+        if self.query_cache is None:
+            return CachedSearch(np.asarray(catalog.match_rows(spec, terms), dtype=np.int32), 0.0)
+        key = (spec.key(), tuple(sorted(set(terms))))
+        cached = self.query_cache.get(catalog.version, key)
+        if cached is None:
+            cached = self.query_cache.put(catalog.version, key, catalog.match_rows(spec, terms))
+        return cached
+
+    @timed('refine')
+    def _refine(self, state, update: SearchFilters) -> Tuple[SearchFilters, Optional[CachedSearch]]:
+        """The session's filters refined by ``update``, with their ranked candidate rows
+
+        A refinement that only tightens the filters tests the previous
+        candidates instead of searching the catalog again.
+        """
+        catalog = self.catalog
+        previous = state.search_filters
+        refined = merge(previous, update)
+        if (previous.rows is not None and previous.version == catalog.version and not previous.is_empty()
+                and narrows(previous, refined)):
+            count('filters.narrowed')
+            refined.rows, cached = narrow(catalog, previous, refined), None
+        else:
+            cached = self._match(catalog, refined.spec, refined.words)
+            refined.rows = cached.rows
+        refined.version = catalog.version
+        return refined, cached
+
+    def _filtered_response(self, state, update: SearchFilters, intent: str, intro: str) -> Optional[BotResponse]:
+        """Results for the session's filters refined by ``update`` (None if a new search finds nothing)
+
+        The filters are only kept when something matches, so a dead-end
+        refinement can be undone by simply asking for something else.
+        """
+        user_name = state.user_name
+        refining = not starts_new_search(state.search_filters, update)
+        refined, cached = self._refine(state, update)
+        if not len(refined.rows):
+            if refining:
+                return BotResponse(f"Sorry {user_name}, none of the laptops matching {describe(state.search_filters)} fit that too. Try changing one thing, or say 'reset filters' to start over.", intent)
+            return None
+        state.search_filters = refined
+        if refining:
+            intro = f"Got it, {user_name}! {{count}} laptops match {describe(refined)}:"
+        intro = intro.replace('{count}', str(len(refined.rows)))
+        return self._results_response(state, self.catalog.records(refined.rows[:MAX_CHAT_RESULTS].tolist()), intent,
+                                      intro, cached=cached)
+
+    @timed('compare')
+    def compare(self, product_ids: Sequence[int]) -> ComparisonTable:
+        """Side-by-side spec table for the given products (memoized per catalog version)"""
+        return comparison_table(self.catalog, tuple(int(product_id) for product_id in product_ids))
+
+    @timed('recommend')
+    def recommendations(self, product_id: int, limit: int = 3, exclude: Sequence[int] = (),
+                        kinds: Sequence[str] = RECOMMENDATION_KINDS) -> Dict[str, List[Dict]]:
+        """Similar laptops, cheaper alternatives and upgrades for a product, by kind"""
+        catalog = self.catalog
+        row = catalog.row_by_id.get(int(product_id))
+        if row is None:
+            return {kind: [] for kind in kinds}
+        recommender = get_recommender(catalog)
+        skip = [catalog.row_by_id[pid] for pid in exclude if pid in catalog.row_by_id]
+        return {kind: catalog.records(getattr(recommender, kind)(row, limit, skip)) for kind in kinds}
+
+    def priced_cart(self, state) -> Cart:
+        """The session's cart with its line prices refreshed from the current catalog version"""
+        cart = state.cart
+        if cart.reprice(self.catalog):
+            count('cart.repriced')
+        return cart
+
+    def add_to_cart(self, state, product_id: int) -> Event:
+        """Reserve a unit and add the product to the session's cart"""
+        product = self.catalog.get_product(product_id)
+        if product is None:
+            return Event('cart_error', product_id, "Sorry, that product is no longer available.")
+        if not self.inventory.reserve(state.session_id, product['id']):
+            count('cart.out_of_stock')
+            return Event('out_of_stock', product['id'], f"Sorry, {product['name']} is out of stock.")
+        already_in_cart = product['id'] in state.cart
+        self.priced_cart(state).add(product)
+        count('cart.add')
+        if already_in_cart:
+            return Event('cart_add', product['id'], f"Added another {product['name']} to cart!")
+        return Event('cart_add', product['id'], f"Added {product['name']} to cart!")
+
+    def set_quantity(self, state, product_id: int, quantity: int) -> Event:
+        """Change a cart line's quantity, keeping the stock hold in step; 0 removes it"""
+        line = state.cart.get(product_id)
+        if line is None:
+            return Event('cart_error', product_id, "That product is not in your cart.")
+        quantity = max(int(quantity), 0)
+        if not self.inventory.set_hold(state.session_id, line.product_id, quantity):
+            count('cart.out_of_stock')
+            return Event('out_of_stock', line.product_id, f"Sorry, no more units of {line.name} are available.")
+        state.cart.set_quantity(line.product_id, quantity)
+        if quantity == 0:
+            count('cart.remove')
+            return Event('cart_remove', line.product_id, f"Removed {line.name} from cart.")
+        count('cart.update')
+        return Event('cart_update', line.product_id, f"{line.name} quantity set to {quantity}.")
+
+    @timed('checkout')
+    def checkout(self, state, customer: Dict[str, str]) -> Tuple[Optional[Dict], List[Event]]:
+        """Place an order for the session's cart
+
+        Returns ``(order, events)``; ``order`` is None when the cart is empty,
+        a line is short on stock or no longer sold, or a customer field is
+        missing, and the events say why. Lines are charged at the current
+        catalog price.
+        """
+        cart = self.priced_cart(state)
+        if not cart:
+            return None, [Event('cart_empty', message="Your cart is empty. Add some products first!")]
+        gone = [line for line in cart if line.product_id not in self.catalog.row_by_id]
+        if gone:
+            return None, [Event('cart_error', line.product_id,
+                                f"Sorry, {line.name} is no longer available. Please remove it from your cart.")
+                          for line in gone]
+
+        # Re-confirm stock for every line (holds may have expired while browsing)
+        short = [line for line in cart
+                 if not self.inventory.set_hold(state.session_id, line.product_id, line.quantity)]
+        if short:
+            return None, [Event('out_of_stock', line.product_id,
+                                f"Sorry, only {self.inventory.available(line.product_id) + self.inventory.held(state.session_id, line.product_id)} units of {line.name} are left. Please update your cart.")
+                          for line in short]
+        if not all(isinstance(customer.get(key), str) and customer[key].strip() for key in CUSTOMER_FIELDS):
+            return None, [Event('invalid', message="Please fill in all required fields.")]
+
+        order_data = {key: customer[key].strip() for key in CUSTOMER_FIELDS}
+        order_data.update({
+            'items': cart.to_items(),
+            'total': cart.total,
+            'order_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'status': 'Confirmed'
+        })
+        # Assigns the order id; the disk write happens in the background
+        try:
+            order = self.orders.place(order_data)
+        except ValueError:
+            return None, [Event('invalid', message="Please check your details: they could not be saved with the order.")]
+        self.inventory.commit(state.session_id)
+        cart.clear()
+        count('orders.placed')
+        return order, [Event('order_placed', message="🎉 Order placed successfully!")]
+
+    def process_batch(self, sessions: Sequence[Any], messages: Sequence[str]) -> List[BotResponse]:
+        """Handle ``messages[i]`` for ``sessions[i]``, in order
+
+        A session may appear several times; its turns are applied in the
+        order given, exactly as if the messages had arrived one by one.
+        """
+        if len(sessions) != len(messages):
+            raise ValueError("sessions and messages must have the same length")
+        return [self.process_message(state, message) for state, message in zip(sessions, messages)]
+
+    def process_message(self, state, message: str) -> BotResponse:
+        """Process user message and generate bot response"""
+        with span('engine.message'):
+            with span('engine.route'):
+                intent, slots = self.router.classify(message)
+            return self._respond(state, message, intent, slots)
+
+    def _respond(self, state, message: str, intent: str, slots: Dict[str, Any]) -> BotResponse:
+        message_lower = message.lower()
+
+        # Handle name collection first
+        if not state.user_name:
+            if intent == 'greeting':
+                return BotResponse("Hello! Welcome to TechMart! 👋 What's your name?", 'greeting')
+
+            for pattern in _NAME_PATTERNS:
+                match = pattern.search(message_lower)
+                if match:
+                    name = match.group(1).capitalize()
+                    state.user_name = name
+                    return BotResponse(f"Nice to meet you, {name}! 😊 I'm here to help you find the perfect laptop. You can ask me about our HP, Dell, or Lenovo laptops, or tell me what you're looking for.", 'introduce')
+
+            return BotResponse("Could you please tell me your name? You can say 'My name is [Your Name]' or just type your name.", 'introduce')
+
+        user_name = state.user_name
+
+        # Handle product ordering from search results
+        if intent == 'order':
+            product = self._match_last_result(state, slots['tokens'])
+            if product is not None:
+                event = self.add_to_cart(state, product['id'])
+                if event.kind != 'cart_add':
+                    return BotResponse(f"Sorry {user_name}, {product['name']} is out of stock right now. Would you like me to find a similar laptop?", 'order', events=[event])
+                return BotResponse(f"Perfect! I've added {product['name']} to your cart. Would you like to continue shopping or proceed to checkout?", 'order', events=[event])
+            # Nothing to add yet, so answer the next best intent instead
+            intent = self.router.best(slots['scores'], exclude=('order',))
+
+        # Greetings (after name is known)
+        if intent == 'greeting':
+            return BotResponse(f"Hello {user_name}! How can I help you find the perfect laptop today? 😊", intent)
+
+        # Side-by-side comparison of named products or the last results
+        if intent == 'compare':
+            product_ids = resolve_products(self.catalog, message, state.last_results)
+            if len(product_ids) < MIN_COMPARE:
+                return BotResponse(f"Happy to compare, {user_name}! Name two to five laptops, like 'compare XPS 13 and Spectre x360', or search first and say 'compare them'.", intent)
+            table = self.compare(product_ids)
+            state.last_results = list(table.product_ids)
+            return BotResponse(f"Here's how they compare, {user_name} (best values marked ✓):\n\n{table_text(table)}", intent, product_ids=list(table.product_ids))
+
+        # Forget the filters built up over earlier turns ("start over with hp laptops" also searches)
+        if intent == 'reset':
+            state.search_filters = SearchFilters()
+            update = parse_filters(self.catalog, message) if not self.catalog.empty else SearchFilters()
+            if not update.is_empty():
+                response = self._filtered_response(state, update, 'search', f"Starting over, {user_name}! I found {{count}} laptops:")
+                if response is not None:
+                    return response
+            return BotResponse(f"All filters cleared, {user_name}! What kind of laptop are you looking for?", intent)
+
+        # Product search, refining the filters of earlier turns ("dell laptops", then "with 16GB")
+        if intent == 'search':
+            catalog = self.catalog
+            response = None
+            if not catalog.empty:
+                update = parse_filters(catalog, message)
+                response = self._filtered_response(state, update, intent, f"Great choice, {user_name}! I found {{count}} laptops that match your search:")
+            if response is not None:
+                return response
+            return BotResponse(f"Sorry {user_name}, I couldn't find any laptops matching your search. Could you try different keywords? We have HP, Dell, and Lenovo laptops available.", intent)
+
+        # Price range queries (a budget narrows the current search, if any)
+        if intent == 'price':
+            price_index = self.catalog.price_index
+            min_price, max_price = slots.get('min_price'), slots.get('max_price')
+            if min_price is not None or max_price is not None:
+                response = self._filtered_response(state, parse_filters(self.catalog, message), intent,
+                                                   f"Great question, {user_name}! I found {{count}} laptops in your budget:")
+                if response is not None:
+                    return response
+                return BotResponse(f"Sorry {user_name}, we don't have laptops in that price range. Our laptops range from {format_price(price_index.min_price)} to {format_price(price_index.max_price)}. Could you adjust your budget?", intent)
+            return BotResponse(f"Great question, {user_name}! Our laptops range from {format_price(price_index.min_price)} to {format_price(price_index.max_price)}. What's your budget range? I can help you find something perfect within your budget!", intent)
+
+        # Cart inquiries
+        if intent == 'cart':
+            cart = self.priced_cart(state)
+            if cart:
+                response = f"Here's your cart, {user_name}:\n\n"
+                for line in cart:
+                    response += f"• {line.name} x{line.quantity} - {format_price(line.subtotal)}\n"
+                response += f"\n**Total: {format_price(cart.total)}**\n\nReady to checkout?"
+                return BotResponse(response, intent)
+            return BotResponse(f"Your cart is empty, {user_name}. Browse our products and add some laptops to your cart!", intent)
+
+        # Help
+        if intent == 'help':
+            return BotResponse(f"""I'm here to help you, {user_name}! Here's what I can do:
+
+            • Find laptops by brand (HP, Dell, Lenovo)
+            • Search by specifications or price range, then refine ("under 500k", "with 16GB")
+            • Clear the current filters (say "reset filters")
+            • Help you add products to your cart
+            • Provide product details and comparisons
+            • Assist with your order
+
+            Just ask me anything about our laptops!""", intent)
+
+        # A bare product name or model number ("inspirion", "omen 15en") is a search,
+        # and a bare constraint ("with 16GB") refines the current one
+        catalog = self.catalog
+        if not catalog.empty:
+            update = parse_filters(catalog, message)
+            if update.words or (not update.spec.is_empty() and not state.search_filters.is_empty()):
+                response = self._filtered_response(state, update, 'search', f"Here's what I found, {user_name}:")
+                if response is not None:
+                    return response
+
+        # Default response
+        return BotResponse(f"I'm here to help you find the perfect laptop, {user_name}! You can ask me about specific brands, price ranges, or specifications. What are you looking for today?", intent)
+
+    def _match_last_result(self, state, tokens: List[str]) -> Optional[Dict]:
+        """Pick the product from the last search whose name shares the most words with the message
+
+        Misspelled words ("thinkpd") are corrected against the catalog first.
+        """
+        words = set(self.catalog.correct_terms(tokenize(' '.join(tokens))))
+        best, best_overlap = None, 0
+        for product in self.catalog.get_products(state.last_results):
+            overlap = len(words.intersection(tokenize(product['name'])))
+            if overlap > best_overlap:
+                best, best_overlap = product, overlap
+        return best
+
+    def _results_response(self, state, results: List[Dict], intent: str, intro: str,
+                          cached: Optional[CachedSearch] = None) -> BotResponse:
+        """List the top results and remember them for follow-up ordering
+
+        The listing is memoized on ``cached`` (a query cache entry), so a
+        repeated search only fills in the live stock numbers.
+        """
+        listing = cached.listing if cached is not None else None
+        if listing is None:
+            listing = self._listing(results[:MAX_CHAT_RESULTS])
+            if cached is not None:
+                cached.listing = listing
+        state.last_results = list(listing.product_ids)
+
+        response = intro + "\n\n"
+        for product_id, head in zip(listing.product_ids, listing.heads):
+            response += head + f"   Stock: {self.inventory.available(product_id)} units available\n\n"
+        response += listing.footer
+        return BotResponse(response, intent, product_ids=list(state.last_results))
+
+    def _listing(self, shown: List[Dict]) -> Listing:
+        """Name/price lines for ``shown`` plus the recommendation footer"""
+        product_ids = tuple(product['id'] for product in shown)
+        heads = tuple(f"{idx}. **{product['name']}**\n   Price: {format_price(product['price'])}\n"
+                      for idx, product in enumerate(shown, 1))
+        footer = ""
+        if shown:
+            picks = self.recommendations(shown[0]['id'], limit=2, exclude=product_ids, kinds=('similar', 'cheaper'))
+            if picks['similar']:
+                names = ', '.join(f"{product['name']} ({format_price(product['price'])})" for product in picks['similar'])
+                footer += f"💡 Similar to **{shown[0]['name']}**: {names}\n\n"
+            if picks['cheaper']:
+                product = picks['cheaper'][0]
+                footer += f"💸 Cheaper alternative: {product['name']} ({format_price(product['price'])})\n\n"
+        footer += "You can use the buttons below to view details or add products to your cart!"
+        return Listing(product_ids, heads, footer)
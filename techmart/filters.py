@@ -0,0 +1,156 @@
+"""Conversational search filters that carry over from one chat turn to the next
+
+"show me dell laptops", then "under 500k", then "with 16GB" is one search
+being refined. ``SearchFilters`` holds what the shopper asked for so far,
+sorted into slots: brand words, category words ("gaming", "business"),
+other product words ("xps") and the parsed spec/price constraints.
+
+``merge`` folds a new message into the filters. Product words, a brand or
+category not already in the filters, or search wording ("show me", "find")
+start a new search. Otherwise the message refines the current one: its
+constraints override the same constraint and keep the others, and the
+earlier product words are dropped. The filters also remember their
+ranked candidate rows. When a turn only adds or tightens constraints, the
+new results come from testing just those candidates (``narrow``) instead of
+searching the catalog again.
+"""
+import re
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from techmart.catalog import Catalog, format_price
+from techmart.search import STOPWORDS, tokenize
+from techmart.specs import SpecFilter
+
+# Wording that asks for a new search rather than a refinement
+_NEW_SEARCH_RE = re.compile(r'\b(?:show me|search|find|looking for|look for|i want|i need)\b')
+
+
+@dataclass
+class SearchFilters:
+    """The slots of the search being refined in one chat session"""
+    brands: Tuple[str, ...] = ()
+    categories: Tuple[str, ...] = ()
+    terms: Tuple[str, ...] = ()
+    spec: SpecFilter = field(default_factory=SpecFilter)
+    # Ranked candidate rows for these filters and the catalog version they belong to
+    rows: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+    version: Optional[int] = field(default=None, repr=False, compare=False)
+    # Set on a parsed message that used search wording ("show me ...")
+    new_search: bool = field(default=False, repr=False, compare=False)
+
+    def is_empty(self) -> bool:
+        return not (self.brands or self.categories or self.terms) and self.spec.is_empty()
+
+    @property
+    def words(self) -> List[str]:
+        """Every search word, for text matching"""
+        return [*self.brands, *self.categories, *self.terms]
+
+    def to_state(self) -> Dict[str, Any]:
+        """Slots only (no candidate rows) for session state backends"""
+        return {'brands': list(self.brands), 'categories': list(self.categories), 'terms': list(self.terms),
+                'spec': {f.name: getattr(self.spec, f.name) for f in fields(self.spec)
+                         if getattr(self.spec, f.name) is not None}}
+
+    @classmethod
+    def from_state(cls, data: Dict[str, Any]) -> 'SearchFilters':
+        """Inverse of ``to_state``; candidates are recomputed on the next refinement"""
+        return cls(tuple(data['brands']), tuple(data['categories']), tuple(data['terms']), SpecFilter(**data['spec']))
+
+
+def _vocabulary(catalog: Catalog) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """Brand and category words of this catalog version"""
+    vocabulary = catalog.derived.get('filter_vocabulary')
+    if vocabulary is None:
+        brands = frozenset(term for brand in catalog.brands for term in tokenize(brand))
+        categories = frozenset(term for category in catalog.categories for term in tokenize(category)
+                               if term not in brands and term not in STOPWORDS)
+        vocabulary = catalog.derived['filter_vocabulary'] = (brands, categories)
+    return vocabulary
+
+
+def parse_filters(catalog: Catalog, message: str) -> SearchFilters:
+    """The slots mentioned in one message"""
+    spec, terms = catalog.parse_query(message)
+    brands, categories = _vocabulary(catalog)
+    unique = list(dict.fromkeys(terms))
+    return SearchFilters(tuple(term for term in unique if term in brands),
+                         tuple(term for term in unique if term in categories),
+                         tuple(term for term in unique if term not in brands and term not in categories),
+                         spec, new_search=bool(_NEW_SEARCH_RE.search(message.lower())))
+
+
+def starts_new_search(current: SearchFilters, update: SearchFilters) -> bool:
+    """True if ``update`` replaces ``current`` instead of refining it"""
+    if current.is_empty() or update.terms or (update.new_search and not update.is_empty()):
+        return True
+    # A brand or category the current search does not have ("dell" after "gaming laptops")
+    return (not set(update.brands) <= set(current.brands)
+            or not set(update.categories) <= set(current.categories))
+
+
+def merge(current: SearchFilters, update: SearchFilters) -> SearchFilters:
+    """``current`` refined by the slots of a new message (or replaced by them, see ``starts_new_search``)"""
+    if starts_new_search(current, update):
+        return SearchFilters(update.brands, update.categories, update.terms, update.spec)
+    # Product words of the earlier search ("omen 15en") would rule out most refinements
+    return SearchFilters(current.brands, current.categories, (), current.spec.merged(update.spec))
+
+
+def narrows(previous: SearchFilters, refined: SearchFilters) -> bool:
+    """True if every product matching ``refined`` also matched ``previous``"""
+    for old, new in ((previous.brands, refined.brands), (previous.categories, refined.categories),
+                     (previous.terms, refined.terms)):
+        if old and old != new:
+            return False
+    return refined.spec.within(previous.spec)
+
+
+def narrow(catalog: Catalog, previous: SearchFilters, refined: SearchFilters) -> np.ndarray:
+    """``previous.rows`` that also satisfy ``refined`` (ranking order kept)"""
+    rows = previous.rows
+    postings = catalog.search_index.postings
+    for word in set(refined.words) - set(previous.words):
+        posting = postings[word] if word in postings else {}
+        rows = rows[np.fromiter((row in posting for row in rows.tolist()), dtype=bool, count=len(rows))]
+    if refined.spec != previous.spec and len(rows):
+        rows = rows[refined.spec.mask(catalog.df, rows)]
+    return rows
+
+
+def describe(filters: SearchFilters) -> str:
+    """Short summary of the active filters ("dell, gaming, under ₦500,000.00, 16GB+ RAM")"""
+    spec = filters.spec
+    parts = [word.upper() if len(word) <= 3 else word.title() for word in filters.words]
+    if spec.min_price is not None and spec.max_price is not None:
+        parts.append(f"{format_price(spec.min_price)} - {format_price(spec.max_price)}")
+    elif spec.max_price is not None:
+        parts.append(f"under {format_price(spec.max_price)}")
+    elif spec.min_price is not None:
+        parts.append(f"over {format_price(spec.min_price)}")
+    if spec.min_ram_gb is not None:
+        parts.append(f"{spec.min_ram_gb}GB+ RAM")
+    if spec.max_ram_gb is not None:
+        parts.append(f"up to {spec.max_ram_gb}GB RAM")
+    if spec.min_storage_gb is not None:
+        parts.append(f"{spec.min_storage_gb}GB+ storage")
+    if spec.storage_type is not None:
+        parts.append(spec.storage_type.upper())
+    if spec.gpu_series is not None:
+        parts.append(f"{spec.gpu_series.upper()} {spec.min_gpu_model or ''}".strip())
+    elif spec.gpu_dedicated:
+        parts.append("dedicated graphics")
+    if spec.cpu_family is not None:
+        parts.append(spec.cpu_family.title() if not spec.cpu_family.startswith('i') else f"Core {spec.cpu_family}")
+    elif spec.min_cpu_tier is not None:
+        parts.append(f"tier {spec.min_cpu_tier}+ CPU")
+    if spec.min_screen_in is not None or spec.max_screen_in is not None:
+        parts.append(f'{spec.min_screen_in or spec.max_screen_in:g}" screen')
+    if spec.min_refresh_hz is not None:
+        parts.append(f"{spec.min_refresh_hz}Hz+")
+    if spec.os is not None:
+        parts.append(spec.os.title())
+    return ', '.join(parts)
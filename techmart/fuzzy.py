@@ -0,0 +1,143 @@
+"""Typo-tolerant term lookup ("thinkpd", "inspirion", "omen 15en")
+
+``FuzzyIndex`` is built once per catalog version from the search index
+vocabulary. It follows SymSpell: every indexed word is stored under each
+string obtained by deleting up to ``max_edits`` of its characters, so a
+misspelled word is corrected by generating its own deletions and looking
+them up, then confirming the few candidates with a bounded edit distance.
+No lookup ever scans the vocabulary.
+
+Hyphenated model numbers ("15-en1013dx") are also kept glued together in a
+sorted list, so a partial model number typed without the hyphen ("15en")
+is found by binary search on the prefix.
+"""
+import bisect
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from techmart.search import tokenize
+
+# Words shorter than this are never corrected (too many near neighbours)
+MIN_FUZZY_LENGTH = 4
+
+# Words this long and longer may be two edits away instead of one
+TWO_EDIT_LENGTH = 8
+
+# Shortest partial model number looked up by prefix
+MIN_PREFIX_LENGTH = 3
+
+# A prefix shared by more model numbers than this is too vague to use
+MAX_PREFIX_MATCHES = 64
+
+# Corrections remembered per index (chat typos repeat)
+MEMO_SIZE = 10_000
+
+_MODEL_RE = re.compile(r'[a-z0-9]+(?:-[a-z0-9]+)+')
+
+
+def max_edits(word: str) -> int:
+    """Edits tolerated in a word of this length"""
+    if len(word) < MIN_FUZZY_LENGTH:
+        return 0
+    return 1 if len(word) < TWO_EDIT_LENGTH else 2
+
+
+def deletions(word: str, edits: int) -> Set[str]:
+    """``word`` and every string made by deleting up to ``edits`` characters"""
+    found = {word}
+    frontier = {word}
+    for _ in range(edits):
+        frontier = {item[:i] + item[i + 1:] for item in frontier for i in range(len(item))}
+        found |= frontier
+    return found
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or ``limit + 1`` once it exceeds ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class FuzzyIndex:
+    """Deletion dictionary over the indexed words plus glued model numbers"""
+
+    def __init__(self, words: Iterable[str], names: Sequence[str],
+                 frequency: Callable[[str], int] = lambda word: 0):
+        # Plain numbers ("15", "2023") are never corrected: 14 and 16 are different laptops
+        self.words = {word for word in words if not word.isdigit()}
+        self.deletes: Dict[str, List[str]] = {}
+        for word in self.words:
+            for key in deletions(word, max_edits(word)):
+                self.deletes.setdefault(key, []).append(word)
+        self.names = names
+        self.frequency = frequency
+        self._models: Optional[Tuple[List[str], List[str]]] = None
+        self._memo: Dict[str, Tuple[str, ...]] = {}
+
+    def _model_table(self) -> Tuple[List[str], List[str]]:
+        """Sorted glued model numbers and the same numbers as written, built on first use"""
+        if self._models is None:
+            # One regex pass over all names at once; model numbers are tokenized only when looked up
+            models: Dict[str, str] = {}
+            for match in _MODEL_RE.findall('\n'.join(self.names).lower()):
+                glued = match.replace('-', '')
+                if not glued.isdigit() and not glued.isalpha():
+                    models.setdefault(glued, match)
+            glued_sorted = sorted(models)
+            self._models = glued_sorted, [models[glued] for glued in glued_sorted]
+        return self._models
+
+    def closest(self, word: str) -> Optional[str]:
+        """The indexed word nearest to ``word`` within its edit budget (ties go to the commoner word)"""
+        edits = max_edits(word)
+        if not edits or word.isdigit():
+            return None
+        candidates = {candidate for key in deletions(word, edits) for candidate in self.deletes.get(key, ())}
+        best: Optional[Tuple[int, int, str]] = None
+        for candidate in candidates:
+            limit = min(edits, max_edits(candidate))
+            distance = edit_distance(word, candidate, limit)
+            if distance <= limit:
+                rank = (distance, -self.frequency(candidate), candidate)
+                if best is None or rank < best:
+                    best = rank
+        return None if best is None else best[2]
+
+    def model_prefix(self, word: str) -> Tuple[str, ...]:
+        """Search terms for a partial model number: those shared by every model it starts"""
+        if len(word) < MIN_PREFIX_LENGTH or word.isdigit() or word.isalpha():
+            return ()
+        models, written = self._model_table()
+        start = bisect.bisect_left(models, word)
+        end = bisect.bisect_left(models, word + '\x7f', start)
+        if start == end or end - start > MAX_PREFIX_MATCHES:
+            return ()
+        first = tokenize(written[start])
+        shared = set(first)
+        for name in written[start + 1:end]:
+            shared.intersection_update(tokenize(name))
+        return tuple(term for term in first if term in shared)
+
+    def correct(self, word: str) -> Tuple[str, ...]:
+        """Indexed terms to search for instead of the unknown ``word`` (empty if none fit)"""
+        corrected = self._memo.get(word)
+        if corrected is None:
+            closest = self.closest(word)
+            corrected = (closest,) if closest else self.model_prefix(word)
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            self._memo[word] = corrected
+        return corrected
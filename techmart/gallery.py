@@ -0,0 +1,108 @@
+"""Paginated product gallery: server-side filter/sort and cached card HTML
+
+Only the rows on the visible page are turned into widgets. The row
+selection for a given filter/sort is memoized per catalog, and each
+product's card markup is rendered once per catalog version.
+"""
+import html
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from techmart.catalog import Catalog, format_price
+from techmart.metrics import count
+
+GALLERY_PAGE_SIZE = 10
+
+# Filter/sort selections remembered per catalog version
+SELECTION_CACHE_SIZE = 64
+
+ALL = 'All'
+
+# Stock is live (see techmart.inventory), so cached cards carry a placeholder for it
+STOCK_PLACEHOLDER = '{{stock}}'
+
+SORT_OPTIONS = ('Featured', 'Price: Low to High', 'Price: High to Low', 'Name: A to Z')
+
+
+@dataclass(frozen=True)
+class GalleryQuery:
+    """Filter and sort settings chosen in the gallery controls"""
+    brand: str = ALL
+    category: str = ALL
+    min_price: Optional[int] = None
+    max_price: Optional[int] = None
+    sort: str = SORT_OPTIONS[0]
+
+
+def render_card_html(product: Dict) -> str:
+    """Markup for one product card in the gallery grid"""
+    return f"""
+            <div class="product-card">
+                <h4>{html.escape(product['name'])}</h4>
+                <p><strong>Brand:</strong> {html.escape(product['brand'])}</p>
+                <p><strong>Category:</strong> {html.escape(product['category'])}</p>
+                <p class="price-tag">{format_price(product['price'])}</p>
+                <p><strong>Stock:</strong> {STOCK_PLACEHOLDER} units</p>
+                <p><small>{html.escape(product['specifications'][:80])}...</small></p>
+            </div>
+            """
+
+
+def card_html(catalog: Catalog, row: int, stock: int) -> str:
+    """Cached card markup for ``row`` with the live ``stock`` filled in
+
+    The cache lives and dies with the catalog version.
+    """
+    cache = catalog.derived.setdefault('card_html', {})
+    markup = cache.get(row)
+    if markup is None:
+        count('gallery.card_cache_miss')
+        markup = cache[row] = render_card_html(catalog.record(row))
+    else:
+        count('gallery.card_cache_hit')
+    return markup.replace(STOCK_PLACEHOLDER, str(stock), 1)
+
+
+def _sort_order(catalog: Catalog, sort: str) -> np.ndarray:
+    if sort == 'Price: Low to High':
+        return catalog.price_index.rows
+    if sort == 'Price: High to Low':
+        return catalog.price_index.rows[::-1]
+    if sort == 'Name: A to Z':
+        order = catalog.derived.get('name_order')
+        if order is None:
+            order = catalog.derived['name_order'] = np.argsort(catalog.df['name_lower'].to_numpy(), kind='stable')
+        return order
+    return np.arange(len(catalog))
+
+
+def select_rows(catalog: Catalog, query: GalleryQuery) -> np.ndarray:
+    """Row positions matching ``query`` in display order (memoized per catalog version)"""
+    return catalog.memoized('gallery_rows', query, lambda: _select_rows(catalog, query), SELECTION_CACHE_SIZE)
+
+
+def _select_rows(catalog: Catalog, query: GalleryQuery) -> np.ndarray:
+    df = catalog.df
+    order = _sort_order(catalog, query.sort)
+    mask = np.ones(len(df), dtype=bool)
+    if query.brand != ALL:
+        mask &= df['brand'].to_numpy() == query.brand
+    if query.category != ALL:
+        mask &= df['category'].to_numpy() == query.category
+    if query.min_price is not None:
+        mask &= df['price'].to_numpy() >= query.min_price
+    if query.max_price is not None:
+        mask &= df['price'].to_numpy() <= query.max_price
+    rows = order[mask[order]]
+    rows.setflags(write=False)
+    return rows
+
+
+def page_rows(rows: np.ndarray, page: int, page_size: int = GALLERY_PAGE_SIZE) -> Tuple[np.ndarray, int, int]:
+    """Slice out one page; returns ``(rows, page, page_count)`` with ``page`` clamped"""
+    page_count = max(1, -(-len(rows) // page_size))
+    page = min(max(page, 1), page_count)
+    start = (page - 1) * page_size
+    return rows[start:start + page_size], page, page_count
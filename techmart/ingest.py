@@ -0,0 +1,281 @@
+"""Streaming, chunked ingestion of large product feeds
+
+Supplier feeds share the ``products.csv`` columns but can run to hundreds
+of MB. ``ingest_catalog`` reads the feed in fixed-size chunks. Each chunk
+goes to a worker process that validates and normalizes the rows, derives
+the spec columns and builds that chunk's search postings. The parent then
+dedupes by id (the last occurrence wins) and stitches the chunks and their
+postings into one ``Catalog``. Only a bounded number of chunks are in
+flight at a time, and finished chunks are folded in as they arrive (see
+``_Merger``): string columns are shared with the final table, not copied,
+and postings are written once into their final arrays. Peak memory is
+the finished catalog plus the chunks in flight and one extra copy of the
+numeric columns (about 50 bytes a row) while they are concatenated.
+
+``python -m techmart.ingest feed.csv --out products.csv`` writes the clean
+catalog plus its snapshot (see ``techmart.snapshot``).
+"""
+import argparse
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from techmart.catalog import PRODUCT_COLUMNS, Catalog, file_signature
+from techmart.pricing import PriceIndex
+from techmart.search import SearchIndex
+from techmart.snapshot import write_snapshot
+
+CHUNK_ROWS = 50_000
+
+# Chunks queued per worker before the reader waits for results
+CHUNKS_IN_FLIGHT = 2
+
+# Keep at most this many reject messages (the count is always exact)
+MAX_REJECTS_KEPT = 1_000
+
+_REQUIRED = ['id', 'name', 'brand', 'price']
+
+
+class ChunkResult(NamedTuple):
+    df: pd.DataFrame
+    terms: List[str]
+    offsets: np.ndarray
+    rows: np.ndarray
+    weights: np.ndarray
+    rejects: List[Tuple[int, str]]
+
+
+@dataclass
+class IngestResult:
+    catalog: Optional[Catalog] = None
+    rows_read: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    rejects: List[Tuple[int, str]] = field(default_factory=list)
+
+
+def normalize_chunk(raw: pd.DataFrame, first_row: int) -> Tuple[pd.DataFrame, List[Tuple[int, str]]]:
+    """Validate and coerce one chunk of raw string columns
+
+    Returns the valid rows in ``PRODUCT_COLUMNS`` order and ``(row, reason)``
+    for every rejected row (rows numbered from 1 after the header). Prices
+    are whole naira, the catalog's unit; currency signs, separators and
+    kobo decimals are accepted and rounded.
+    """
+    raw = raw.reset_index(drop=True)
+    text = {column: raw[column].fillna('').astype(str).str.strip() if column in raw else pd.Series([''] * len(raw))
+            for column in PRODUCT_COLUMNS}
+
+    ids = pd.to_numeric(text['id'], errors='coerce')
+    prices = pd.to_numeric(text['price'].str.replace(r'[₦,\s]|NGN', '', regex=True), errors='coerce')
+    stock = pd.to_numeric(text['stock_quantity'].replace('', '0'), errors='coerce')
+
+    problems = [
+        (ids.isna() | (ids <= 0) | (ids % 1 != 0), "invalid id"),
+        (text['name'] == '', "missing name"),
+        (text['brand'] == '', "missing brand"),
+        (prices.isna() | (prices < 0), "invalid price"),
+        (stock.isna() | (stock < 0) | (stock % 1 != 0), "invalid stock quantity"),
+    ]
+    bad = np.zeros(len(raw), dtype=bool)
+    rejects = []
+    for mask, reason in problems:
+        mask = mask.to_numpy() & ~bad
+        rejects.extend((first_row + row, reason) for row in np.flatnonzero(mask).tolist())
+        bad |= mask
+    rejects.sort()
+
+    good = ~bad
+    df = pd.DataFrame({
+        'id': ids[good].astype('int64').to_numpy(),
+        'name': text['name'][good].to_numpy(),
+        'brand': text['brand'][good].to_numpy(),
+        'category': text['category'][good].to_numpy(),
+        'price': prices[good].round().astype('int64').to_numpy(),
+        'stock_quantity': stock[good].astype('int64').to_numpy(),
+        'specifications': text['specifications'][good].to_numpy(),
+        'image_url': text['image_url'][good].to_numpy(),
+    })
+    return df, rejects
+
+
+def process_chunk(raw: pd.DataFrame, first_row: int) -> ChunkResult:
+    """Normalize a chunk, derive its columns and index it (runs in a worker)"""
+    df, rejects = normalize_chunk(raw, first_row)
+    prepared = Catalog._prepare(df)
+    terms, offsets, rows, weights = SearchIndex.build(prepared).to_arrays()
+    return ChunkResult(prepared, terms, offsets, rows, weights, rejects)
+
+
+class _InlineExecutor(Executor):
+    """Runs chunks in the calling process (``workers=1``)"""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def _concat(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate prepared chunks, merging the per-chunk categorical columns"""
+    if not frames:
+        return Catalog._prepare(pd.DataFrame({column: [] for column in PRODUCT_COLUMNS}))
+    categorical = [name for name, dtype in frames[0].dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    df = pd.concat(frames, ignore_index=True)
+    for name in categorical:
+        df[name] = union_categoricals([frame[name] for frame in frames], ignore_order=True)
+    return df
+
+
+class _Merger:
+    """Folds chunk results into one table and search index as they arrive
+
+    A chunk's postings are re-keyed to catalog-wide term ids on arrival, so
+    its term list is dropped straight away. ``finish`` dedupes by id and
+    scatters each chunk's postings into the final arrays, releasing the
+    chunk as it goes, so the postings are never held twice.
+    """
+
+    def __init__(self) -> None:
+        self.term_ids: Dict[str, int] = {}
+        self.frames: List[pd.DataFrame] = []
+        # Per chunk: (term id, row in the feed before dedupe, weight) for every posting
+        self.postings: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self.rows = 0
+
+    def add(self, part: ChunkResult) -> None:
+        term_ids = self.term_ids
+        local_terms = np.array([term_ids.setdefault(term, len(term_ids)) for term in part.terms], dtype=np.int32)
+        self.postings.append((np.repeat(local_terms, np.diff(part.offsets)),
+                              part.rows.astype(np.int32) + np.int32(self.rows), part.weights))
+        self.frames.append(part.df)
+        self.rows += len(part.df)
+
+    def finish(self) -> Tuple[pd.DataFrame, SearchIndex, int]:
+        """Dedupe rows by id (last wins); returns ``(df, index, duplicates)``"""
+        ids = (np.concatenate([frame['id'].to_numpy() for frame in self.frames]) if self.frames
+               else np.empty(0, dtype=np.int64))
+        keep = ~pd.Series(ids).duplicated(keep='last').to_numpy()
+        new_row = np.where(keep, np.cumsum(keep) - 1, -1).astype(np.int32)
+        del ids
+
+        # Only chunks that lost rows to a later duplicate are copied
+        frames, start = [], 0
+        for frame in self.frames:
+            part_keep = keep[start:start + len(frame)]
+            start += len(frame)
+            frames.append(frame if part_keep.all() else frame[part_keep])
+        self.frames = []
+        df = _concat(frames)
+        del frames
+
+        # Stable counting sort by term: each chunk is written straight to its final slots
+        term_count = len(self.term_ids)
+        counts = np.zeros(term_count, dtype=np.int64)
+        for term_of, rows, _ in self.postings:
+            counts += np.bincount(term_of[new_row[rows] >= 0], minlength=term_count)
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        all_rows = np.empty(offsets[-1], dtype=np.int32)
+        all_weights = np.empty(offsets[-1], dtype=np.float32)
+        cursor = offsets[:-1].copy()
+        postings, self.postings = self.postings[::-1], []
+        while postings:
+            term_of, rows, weights = postings.pop()
+            rows = new_row[rows]
+            alive = rows >= 0
+            order = np.argsort(term_of[alive], kind='stable')
+            term_of, rows, weights = term_of[alive][order], rows[alive][order], weights[alive][order]
+            rank = np.arange(len(term_of)) - np.searchsorted(term_of, term_of)
+            slots = cursor[term_of] + rank
+            all_rows[slots] = rows
+            all_weights[slots] = weights
+            cursor += np.bincount(term_of, minlength=term_count)
+
+        index = SearchIndex.from_arrays(list(self.term_ids), offsets, all_rows, all_weights, df['id'].tolist())
+        return df, index, int((~keep).sum())
+
+
+def ingest_catalog(path: str, chunk_rows: int = CHUNK_ROWS, workers: Optional[int] = None) -> IngestResult:
+    """Build a ``Catalog`` from the feed at ``path`` without loading it whole
+
+    ``workers`` defaults to one process per core; 1 processes chunks inline.
+    """
+    path = os.path.abspath(path)
+    signature = file_signature(path)
+    workers = workers or os.cpu_count() or 1
+    executor = (_InlineExecutor() if workers == 1 else
+                ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')))
+
+    result = IngestResult()
+    merger = _Merger()
+    pending: Deque[Future] = deque()
+
+    def collect(future: Future) -> None:
+        part = future.result()
+        merger.add(part)
+        result.rejected += len(part.rejects)
+        room = MAX_REJECTS_KEPT - len(result.rejects)
+        if room > 0:
+            result.rejects.extend(part.rejects[:room])
+
+    try:
+        reader = pd.read_csv(path, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+        first_row = 1
+        for raw in reader:
+            missing = [column for column in _REQUIRED if column not in raw.columns]
+            if missing:
+                raise ValueError(f"{path} is missing required columns: {', '.join(missing)}")
+            pending.append(executor.submit(process_chunk, raw, first_row))
+            result.rows_read += len(raw)
+            first_row += len(raw)
+            while len(pending) >= workers * CHUNKS_IN_FLIGHT:
+                collect(pending.popleft())
+        while pending:
+            collect(pending.popleft())
+    except pd.errors.EmptyDataError:
+        pass
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+    df, search_index, result.duplicates = merger.finish()
+    price_index = PriceIndex(df['price'].to_numpy())
+    result.catalog = Catalog.from_prepared(df, path, signature, search_index, price_index)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validate, dedupe and index a supplier product feed")
+    parser.add_argument('feed', help="CSV feed in the products.csv format")
+    parser.add_argument('--out', default='products.csv', help="clean catalog CSV to write (plus its snapshot)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    result = ingest_catalog(args.feed, args.chunk_rows, args.workers)
+    result.catalog.df[PRODUCT_COLUMNS].to_csv(args.out, index=False)
+    # Snapshot keyed to the written file, so the app skips parsing it
+    catalog = Catalog.from_prepared(result.catalog.df, os.path.abspath(args.out), file_signature(args.out),
+                                    result.catalog.search_index, result.catalog.price_index)
+    write_snapshot(catalog)
+
+    print(f"Read {result.rows_read} rows: {len(catalog)} products, "
+          f"{result.duplicates} duplicate ids replaced, {result.rejected} rejected")
+    for row, reason in result.rejects[:20]:
+        print(f"  row {row}: {reason}")
+    if result.rejected > 20:
+        print(f"  ... and {result.rejected - 20} more")
+    print(f"Wrote {args.out} and its snapshot")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,428 @@
+"""Live stock shared by every session, with reserve/commit/release holds
+
+Adding a laptop to a cart reserves a unit: it leaves ``available`` right away
+and is tracked as a hold owned by the session. Checkout commits the
+session's holds (the units are sold), removing an item releases them, and
+holds that are not refreshed within ``HOLD_TTL`` seconds expire and return
+to stock, so abandoned carts do not lock inventory forever.
+
+Writers take a per-SKU lock (striped over a fixed pool); readers such as
+the gallery just read the current count from a dict and never lock.
+
+With several app workers (``TECHMART_STATE_BACKEND=sqlite``) carts follow
+a session from worker to worker, so stock and holds must too:
+``SqliteInventory`` keeps them in the shared session database, and every
+reservation is one short transaction.
+"""
+import heapq
+import itertools
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from techmart.catalog import Catalog, get_catalog
+from techmart.state import DEFAULT_STATE_BACKEND, DEFAULT_STATE_DB
+
+HOLD_TTL = 15 * 60
+
+_LOCK_STRIPES = 64
+
+
+class Hold:
+    __slots__ = ('quantity', 'expires')
+
+    def __init__(self, quantity: int, expires: float):
+        self.quantity = quantity
+        self.expires = expires
+
+
+class InventoryService:
+    """Atomic stock reservations keyed by product id"""
+
+    def __init__(self, catalog: Catalog, ttl: float = HOLD_TTL):
+        self.ttl = ttl
+        self.catalog_version = None
+        self._available: Dict[int, int] = {}
+        # session id -> product id -> hold
+        self._holds: Dict[str, Dict[int, Hold]] = {}
+        # product id -> units sold by this process (orders are not written back to the file)
+        self._sold: Dict[int, int] = {}
+        self._locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+        self._sync_lock = threading.Lock()
+        self._expiry: List[Tuple[float, int, str, int]] = []
+        self._expiry_lock = threading.Lock()
+        self._sequence = itertools.count()
+        self.sync(catalog)
+
+    def _lock(self, product_id: int) -> threading.Lock:
+        return self._locks[hash(product_id) % _LOCK_STRIPES]
+
+    def sync(self, catalog: Catalog) -> None:
+        """Adopt the stock counts of a newly loaded catalog version
+
+        The file is the source of truth for on-hand stock; units sold since
+        the process started and units currently held by carts are
+        subtracted from it. After a delta reload only the changed products
+        are recounted; the rest keep their live counts.
+        """
+        if catalog.version == self.catalog_version:
+            return
+        with self._sync_lock:
+            if catalog.version == self.catalog_version:
+                return
+            # Rare (reload only): stop every writer while the counts are swapped
+            for lock in self._locks:
+                lock.acquire()
+            try:
+                self._resync(catalog)
+            finally:
+                for lock in self._locks:
+                    lock.release()
+
+    def _resync(self, catalog: Catalog) -> None:
+        delta = catalog.delta
+        if delta is not None and delta.base_version == self.catalog_version:
+            # Delta reload: only the changed products take their counts from the file
+            self._apply_delta(catalog, set(delta.changed_ids), delta.removed_ids)
+            return
+        held = self._held_units()
+        stock = dict(zip(catalog.df['id'].tolist(), catalog.df['stock_quantity'].tolist()))
+        sold = self._sold
+        self._available = {product_id: max(0, quantity - sold.get(product_id, 0) - held.get(product_id, 0))
+                           for product_id, quantity in stock.items()}
+        self.catalog_version = catalog.version
+
+    def _apply_delta(self, catalog: Catalog, changed_ids: Set[int], removed_ids: List[int]) -> None:
+        held = self._held_units(changed_ids)
+        for product_id in removed_ids:
+            self._available.pop(product_id, None)
+        for product in catalog.get_products(changed_ids):
+            product_id = product['id']
+            self._available[product_id] = max(0, product['stock_quantity'] - self._sold.get(product_id, 0)
+                                              - held.get(product_id, 0))
+        self.catalog_version = catalog.version
+
+    def _held_units(self, product_ids: Optional[Set[int]] = None) -> Dict[int, int]:
+        """Units held by carts per product (only ``product_ids`` if given)"""
+        held: Dict[int, int] = {}
+        for holds in list(self._holds.values()):
+            for product_id, hold in list(holds.items()):
+                if product_ids is None or product_id in product_ids:
+                    held[product_id] = held.get(product_id, 0) + hold.quantity
+        return held
+
+    def available(self, product_id: int) -> int:
+        """Units that can still be reserved (lock-free read)"""
+        return self._available.get(int(product_id), 0)
+
+    def held(self, session_id: str, product_id: int) -> int:
+        hold = self._holds.get(session_id, {}).get(int(product_id))
+        return hold.quantity if hold else 0
+
+    def _schedule(self, expires: float, session_id: str, product_id: int) -> None:
+        with self._expiry_lock:
+            heapq.heappush(self._expiry, (expires, next(self._sequence), session_id, product_id))
+
+    def set_hold(self, session_id: str, product_id: int, quantity: int) -> bool:
+        """Make the session hold exactly ``quantity`` units of ``product_id``
+
+        Returns False (and changes nothing) if the extra units are not in
+        stock. ``quantity`` 0 releases the hold.
+        """
+        self.expire()
+        product_id = int(product_id)
+        with self._lock(product_id):
+            if product_id not in self._available:
+                # Dropped by a reload: a hold can still be let go, but never taken
+                if quantity <= 0:
+                    self._holds.get(session_id, {}).pop(product_id, None)
+                    return True
+                return False
+            holds = self._holds.setdefault(session_id, {})
+            hold = holds.get(product_id)
+            current = hold.quantity if hold else 0
+            delta = quantity - current
+            if delta > self._available[product_id]:
+                return False
+            self._available[product_id] -= delta
+            if quantity <= 0:
+                holds.pop(product_id, None)
+                return True
+            expires = time.monotonic() + self.ttl
+            if hold is None:
+                holds[product_id] = Hold(quantity, expires)
+            else:
+                hold.quantity, hold.expires = quantity, expires
+        self._schedule(expires, session_id, product_id)
+        return True
+
+    def reserve(self, session_id: str, product_id: int, quantity: int = 1) -> bool:
+        """Hold ``quantity`` more units for the session if they are in stock"""
+        return self.set_hold(session_id, product_id, self.held(session_id, product_id) + quantity)
+
+    def release(self, session_id: str, product_id: Optional[int] = None) -> None:
+        """Return a session's held units (one product, or all of them) to stock"""
+        product_ids = list(self._holds.get(session_id, {})) if product_id is None else [int(product_id)]
+        for pid in product_ids:
+            self.set_hold(session_id, pid, 0)
+        if not self._holds.get(session_id, True):
+            self._holds.pop(session_id, None)
+
+    def commit(self, session_id: str) -> Dict[int, int]:
+        """Turn the session's holds into sales; returns ``{product_id: quantity}``"""
+        holds = self._holds.get(session_id, {})
+        sold = {}
+        for product_id in list(holds):
+            with self._lock(product_id):
+                hold = holds.pop(product_id, None)
+                if hold is not None:
+                    sold[product_id] = hold.quantity
+                    self._sold[product_id] = self._sold.get(product_id, 0) + hold.quantity
+        if not holds:
+            self._holds.pop(session_id, None)
+        return sold
+
+    def touch(self, session_id: str) -> None:
+        """Extend the session's holds; called on every rerun of an active session"""
+        holds = self._holds.get(session_id)
+        if not holds:
+            return
+        expires = time.monotonic() + self.ttl
+        for product_id, hold in list(holds.items()):
+            # Only refresh once a meaningful part of the TTL has passed
+            if hold.expires - expires < -self.ttl / 10:
+                hold.expires = expires
+                self._schedule(expires, session_id, product_id)
+
+    def expire(self) -> None:
+        """Release holds whose TTL has passed"""
+        now = time.monotonic()
+        if not self._expiry or self._expiry[0][0] > now or not self._expiry_lock.acquire(blocking=False):
+            return
+        try:
+            due = []
+            while self._expiry and self._expiry[0][0] <= now:
+                due.append(heapq.heappop(self._expiry))
+        finally:
+            self._expiry_lock.release()
+        for _, _, session_id, product_id in due:
+            with self._lock(product_id):
+                holds = self._holds.get(session_id, {})
+                hold = holds.get(product_id)
+                if hold is None or hold.expires > now:
+                    continue
+                holds.pop(product_id)
+                # A product dropped by a reload since the hold was taken has no stock to return to
+                if product_id in self._available:
+                    self._available[product_id] += hold.quantity
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stock (
+    product_id INTEGER PRIMARY KEY,
+    on_hand INTEGER NOT NULL,
+    sold INTEGER NOT NULL DEFAULT 0,
+    held INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS holds (
+    session_id TEXT NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (session_id, product_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS holds_expires ON holds (expires);
+"""
+
+# Expired holds are swept at most this often (seconds) per process
+EXPIRE_INTERVAL = 1.0
+
+
+class SqliteInventory:
+    """``InventoryService`` over a SQLite database (WAL) shared by every worker on the host
+
+    ``stock`` keeps the file count, the units sold and the units held per
+    product, so availability is a single-row read. Hold expiry uses wall
+    clock time, which all workers share.
+    """
+
+    def __init__(self, catalog: Catalog, path: str = DEFAULT_STATE_DB, ttl: float = HOLD_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.catalog_version = None
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._next_expiry = 0.0
+        self._conn().executescript(_SCHEMA)
+        self.sync(catalog)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; transactions are opened explicitly
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _write(self, work):
+        """Run ``work(conn)`` in one write transaction and return its result"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = work(conn)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return result
+
+    def sync(self, catalog: Catalog) -> None:
+        """Adopt the stock counts of a newly loaded catalog version (sales and holds are kept)"""
+        if catalog.version == self.catalog_version:
+            return
+        with self._sync_lock:
+            if catalog.version == self.catalog_version:
+                return
+            delta = catalog.delta
+            if delta is not None and delta.base_version == self.catalog_version:
+                counts = [(product['id'], product['stock_quantity'])
+                          for product in catalog.get_products(delta.changed_ids)]
+                removed = list(delta.removed_ids)
+            else:
+                counts = list(zip(catalog.df['id'].tolist(), catalog.df['stock_quantity'].tolist()))
+                removed = None
+
+            def adopt(conn):
+                conn.executemany('INSERT INTO stock (product_id, on_hand) VALUES (?, ?) '
+                                 'ON CONFLICT (product_id) DO UPDATE SET on_hand = excluded.on_hand '
+                                 'WHERE on_hand != excluded.on_hand', counts)
+                if removed is None:
+                    listed = {product_id for product_id, _ in counts}
+                    gone = [(row[0],) for row in conn.execute('SELECT product_id FROM stock')
+                            if row[0] not in listed]
+                else:
+                    gone = [(product_id,) for product_id in removed]
+                conn.executemany('DELETE FROM stock WHERE product_id = ?', gone)
+
+            self._write(adopt)
+            self.catalog_version = catalog.version
+
+    def available(self, product_id: int) -> int:
+        """Units that can still be reserved"""
+        row = self._conn().execute('SELECT on_hand - sold - held FROM stock WHERE product_id = ?',
+                                   (int(product_id),)).fetchone()
+        return max(0, row[0]) if row else 0
+
+    def held(self, session_id: str, product_id: int) -> int:
+        row = self._conn().execute('SELECT quantity FROM holds WHERE session_id = ? AND product_id = ?',
+                                   (session_id, int(product_id))).fetchone()
+        return row[0] if row else 0
+
+    def _set_hold(self, conn: sqlite3.Connection, session_id: str, product_id: int, target) -> bool:
+        stock = conn.execute('SELECT on_hand - sold - held FROM stock WHERE product_id = ?', (product_id,)).fetchone()
+        if stock is None:
+            return False
+        row = conn.execute('SELECT quantity FROM holds WHERE session_id = ? AND product_id = ?',
+                           (session_id, product_id)).fetchone()
+        current = row[0] if row else 0
+        quantity = max(target(current), 0)
+        delta = quantity - current
+        if delta > stock[0]:
+            return False
+        conn.execute('UPDATE stock SET held = held + ? WHERE product_id = ?', (delta, product_id))
+        if quantity:
+            conn.execute('INSERT OR REPLACE INTO holds (session_id, product_id, quantity, expires) VALUES (?, ?, ?, ?)',
+                         (session_id, product_id, quantity, time.time() + self.ttl))
+        else:
+            conn.execute('DELETE FROM holds WHERE session_id = ? AND product_id = ?', (session_id, product_id))
+        return True
+
+    def set_hold(self, session_id: str, product_id: int, quantity: int) -> bool:
+        """Make the session hold exactly ``quantity`` units (False, and no change, if not in stock)"""
+        self.expire()
+        return self._write(lambda conn: self._set_hold(conn, session_id, int(product_id), lambda current: quantity))
+
+    def reserve(self, session_id: str, product_id: int, quantity: int = 1) -> bool:
+        """Hold ``quantity`` more units for the session if they are in stock"""
+        self.expire()
+        return self._write(lambda conn: self._set_hold(conn, session_id, int(product_id),
+                                                       lambda current: current + quantity))
+
+    def _take_holds(self, conn: sqlite3.Connection, session_id: str, product_id: Optional[int],
+                    column: Optional[str]) -> Dict[int, int]:
+        """Delete a session's holds, moving their units back to stock (or to ``column``)"""
+        if product_id is None:
+            rows = conn.execute('SELECT product_id, quantity FROM holds WHERE session_id = ?', (session_id,)).fetchall()
+        else:
+            rows = conn.execute('SELECT product_id, quantity FROM holds WHERE session_id = ? AND product_id = ?',
+                                (session_id, int(product_id))).fetchall()
+        update = 'UPDATE stock SET held = held - ?' + (f', {column} = {column} + ?' if column else '') + \
+                 ' WHERE product_id = ?'
+        conn.executemany(update, [(quantity, quantity, pid) if column else (quantity, pid) for pid, quantity in rows])
+        conn.executemany('DELETE FROM holds WHERE session_id = ? AND product_id = ?',
+                         [(session_id, pid) for pid, _ in rows])
+        return dict(rows)
+
+    def release(self, session_id: str, product_id: Optional[int] = None) -> None:
+        """Return a session's held units (one product, or all of them) to stock"""
+        self._write(lambda conn: self._take_holds(conn, session_id, product_id, None))
+
+    def commit(self, session_id: str) -> Dict[int, int]:
+        """Turn the session's holds into sales; returns ``{product_id: quantity}``"""
+        return self._write(lambda conn: self._take_holds(conn, session_id, None, 'sold'))
+
+    def touch(self, session_id: str) -> None:
+        """Extend the session's holds once a meaningful part of the TTL has passed"""
+        now = time.time()
+        stale = now + self.ttl - self.ttl / 10
+        conn = self._conn()
+        # Read first, so an active session with fresh holds never takes the write lock
+        if conn.execute('SELECT 1 FROM holds WHERE session_id = ? AND expires < ? LIMIT 1',
+                        (session_id, stale)).fetchone():
+            self._write(lambda conn: conn.execute('UPDATE holds SET expires = ? WHERE session_id = ?',
+                                                  (now + self.ttl, session_id)))
+
+    def expire(self) -> None:
+        """Release holds whose TTL has passed (checked at most once per ``EXPIRE_INTERVAL``)"""
+        now = time.time()
+        if now < self._next_expiry:
+            return
+        self._next_expiry = now + EXPIRE_INTERVAL
+        conn = self._conn()
+        if not conn.execute('SELECT 1 FROM holds WHERE expires <= ? LIMIT 1', (now,)).fetchone():
+            return
+
+        def sweep(conn):
+            rows = conn.execute('SELECT session_id, product_id, quantity FROM holds WHERE expires <= ?',
+                                (now,)).fetchall()
+            conn.executemany('UPDATE stock SET held = held - ? WHERE product_id = ?',
+                             [(quantity, product_id) for _, product_id, quantity in rows])
+            conn.executemany('DELETE FROM holds WHERE session_id = ? AND product_id = ?',
+                             [(session_id, product_id) for session_id, product_id, _ in rows])
+
+        self._write(sweep)
+
+
+_inventory: Optional[InventoryService] = None
+_inventory_lock = threading.Lock()
+
+
+def get_inventory(catalog: Optional[Catalog] = None) -> InventoryService:
+    """Process-wide inventory, kept in step with the current catalog version
+
+    Shared with the other workers through the session database when the
+    state backend is ``sqlite``.
+    """
+    global _inventory
+    catalog = catalog or get_catalog()
+    if _inventory is None:
+        with _inventory_lock:
+            if _inventory is None:
+                if DEFAULT_STATE_BACKEND == 'sqlite':
+                    _inventory = SqliteInventory(catalog, DEFAULT_STATE_DB)
+                else:
+                    _inventory = InventoryService(catalog)
+    _inventory.sync(catalog)
+    return _inventory
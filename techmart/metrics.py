@@ -0,0 +1,142 @@
+"""In-process latency histograms and counters
+
+``span("search")`` (or ``@timed("search")``) times a block into a rolling
+histogram for that stage;
+``count("catalog.cache_hit")`` bumps a counter. Both are cheap enough for
+every rerun. ``METRICS.snapshot()`` gives p50/p95/p99 per stage for the
+debug panel and ``METRICS.prometheus()`` the same data in Prometheus text
+format (served at ``/metrics`` by ``techmart.api``).
+"""
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List
+
+# Percentiles are computed over the most recent samples of each stage
+WINDOW = 2048
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def quantiles(samples: List[float], points=QUANTILES) -> List[float]:
+    """Nearest-rank quantiles of ``samples`` (zeros when empty)"""
+    ordered = sorted(samples)
+    if not ordered:
+        return [0.0 for _ in points]
+    last = len(ordered) - 1
+    return [ordered[min(last, int(q * len(ordered)))] for q in points]
+
+
+class Histogram:
+    """Rolling window of recent durations plus lifetime count and sum"""
+    __slots__ = ('samples', 'count', 'total')
+
+    def __init__(self, window: int = WINDOW):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def quantiles(self, points=QUANTILES) -> List[float]:
+        return quantiles(list(self.samples), points)
+
+
+class Metrics:
+    """Named stage histograms and event counters, safe to share across threads"""
+
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.window)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block (also when it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """``{'stages': {stage: {count, mean_ms, p50_ms, ...}}, 'counters': {...}}``"""
+        with self._lock:
+            histograms = {stage: (h.count, h.total, list(h.samples)) for stage, h in self._histograms.items()}
+            counters = dict(self._counters)
+        stages = {}
+        for stage, (count, total, samples) in sorted(histograms.items()):
+            p50, p95, p99 = quantiles(samples)
+            stages[stage] = {
+                'count': count,
+                'mean_ms': total / count * 1000 if count else 0.0,
+                'p50_ms': p50 * 1000,
+                'p95_ms': p95 * 1000,
+                'p99_ms': p99 * 1000,
+            }
+        return {'stages': stages, 'counters': dict(sorted(counters.items()))}
+
+    def prometheus(self, prefix: str = 'techmart') -> str:
+        """Prometheus text exposition of every stage and counter"""
+        with self._lock:
+            histograms = {stage: (h.count, h.total, list(h.samples)) for stage, h in self._histograms.items()}
+            counters = dict(self._counters)
+        lines = [
+            f"# HELP {prefix}_stage_seconds Latency per stage (quantiles over the last {self.window} samples)",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for stage, (count, total, samples) in sorted(histograms.items()):
+            for quantile, value in zip(QUANTILES, quantiles(samples)):
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {value:.9f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {total:.9f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {count}')
+        lines.append(f"# HELP {prefix}_events_total Cache hits/misses, cart operations and other events")
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, value in sorted(counters.items()):
+            lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = Metrics()
+
+
+def span(stage: str):
+    """Time a block into the process-wide ``METRICS``"""
+    return METRICS.span(stage)
+
+
+def timed(stage: str):
+    """Decorator form of ``span`` for whole functions"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with METRICS.span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name: str, amount: int = 1) -> None:
+    METRICS.count(name, amount)
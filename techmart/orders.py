@@ -0,0 +1,288 @@
+"""Durable order storage in a local SQLite database (WAL mode)
+
+``OrderStore.place`` assigns an order id and returns immediately. A single
+background writer thread drains the queue and commits pending orders in
+batches, so concurrent checkouts from many sessions share one transaction
+and one fsync. Lookups by order id, email and date go through indexes,
+and orders that are still queued are visible to lookups straight away.
+
+Orders are validated when placed, so a bad one is rejected up front
+rather than stalling the writer. A batch that still fails is retried a
+few times when the database is busy or locked; any other failure falls
+back to row-by-row inserts, and rows that cannot be stored are appended
+to ``<db>.failed.jsonl`` so the rest of the batch commits.
+"""
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from techmart.metrics import count
+
+DEFAULT_ORDERS_DB = os.environ.get('TECHMART_ORDERS_DB', 'orders.db')
+
+# Writer batching: commit after this many orders or this many seconds
+BATCH_SIZE = 100
+BATCH_INTERVAL = 0.05
+
+# A batch that finds the database busy or locked is retried this many times, this far apart
+MAX_WRITE_ATTEMPTS = 5
+RETRY_DELAY = 0.5
+
+# How long the exit hook waits for queued orders to commit
+FLUSH_TIMEOUT = 10.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    order_date TEXT NOT NULL,
+    customer_name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    phone TEXT,
+    address TEXT,
+    total INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    items TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_email ON orders (email);
+CREATE INDEX IF NOT EXISTS orders_date ON orders (order_date);
+"""
+
+_COLUMNS = ['order_id', 'order_date', 'customer_name', 'email', 'phone', 'address', 'total', 'status', 'items']
+
+_INSERT = f"INSERT OR REPLACE INTO orders ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+
+_TEXT_FIELDS = ('customer_name', 'email', 'phone', 'address')
+_REQUIRED_FIELDS = ('customer_name', 'email')
+
+
+class OrderIdGenerator:
+    """Monotonic, collision-free order ids: ``ORD<yyyymmddHHMMSS><ms>-<node>``
+
+    Ids are millisecond timestamps bumped by one whenever two orders land in
+    the same millisecond, so they strictly increase within a process. The
+    node suffix keeps ids from different worker processes apart.
+    """
+
+    def __init__(self, node: Optional[int] = None):
+        self.node = (os.getpid() if node is None else node) % 1000
+        self._last = 0
+        self._lock = threading.Lock()
+
+    def next_id(self) -> str:
+        with self._lock:
+            tick = max(time.time_ns() // 1_000_000, self._last + 1)
+            self._last = tick
+        stamp = datetime.fromtimestamp(tick / 1000).strftime('%Y%m%d%H%M%S')
+        return f"ORD{stamp}{tick % 1000:03d}-{self.node:03d}"
+
+
+class OrderStore:
+    """SQLite-backed order log with a batching background writer"""
+
+    def __init__(self, path: str = DEFAULT_ORDERS_DB):
+        self.path = path
+        self.ids = OrderIdGenerator()
+        self._queue: 'queue.Queue[Optional[Dict[str, Any]]]' = queue.Queue()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._pending_lock = threading.Lock()
+        # order id -> failed write attempts so far (busy/locked database only)
+        self._attempts: Dict[str, int] = {}
+        self.failed_path = f"{path}.failed.jsonl"
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.close()
+        self._writer = threading.Thread(target=self._write_loop, name='order-writer', daemon=True)
+        self._writer.start()
+        # Don't lose orders still queued when the process exits
+        atexit.register(self.flush)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def place(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue ``order`` for durable storage and return it with its id set
+
+        Never blocks on disk I/O; call ``flush`` when the caller must know
+        the order has been committed. Raises ``ValueError`` for an order
+        that could not be stored: customer fields that are not strings (or
+        numbers), a blank name or email, or items and totals that do not
+        serialize.
+        """
+        order = dict(order)
+        for field in _TEXT_FIELDS:
+            value = order.get(field)
+            if value is None:
+                value = ''
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = str(value)
+            if not isinstance(value, str):
+                raise ValueError(f"{field} must be a string")
+            order[field] = value.strip()
+        missing = [field for field in _REQUIRED_FIELDS if not order[field]]
+        if missing:
+            raise ValueError(f"{', '.join(missing)} required")
+        order['order_id'] = self.ids.next_id()
+        order.setdefault('order_date', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        order.setdefault('status', 'Confirmed')
+        try:
+            self._row(order)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"order cannot be stored: {e}") from e
+        with self._pending_lock:
+            self._pending[order['order_id']] = order
+        self._queue.put(order)
+        return order
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + BATCH_INTERVAL
+            while len(batch) < BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                orders = [order for order in batch if order is not None]
+                if orders:
+                    self._write(conn, orders)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, conn: sqlite3.Connection, orders: List[Dict[str, Any]]) -> None:
+        try:
+            with conn:
+                conn.executemany(_INSERT, [self._row(order) for order in orders])
+        except sqlite3.OperationalError:
+            # Database busy or locked: keep the orders pending and retry shortly
+            time.sleep(RETRY_DELAY)
+            for order in orders:
+                self._retry(order, "database busy or locked")
+        except Exception:
+            # One bad row fails the whole batch; insert one at a time so the good orders still commit
+            for order in orders:
+                try:
+                    with conn:
+                        conn.execute(_INSERT, self._row(order))
+                except sqlite3.OperationalError:
+                    self._retry(order, "database busy or locked")
+                except Exception as e:
+                    self._dead_letter(order, repr(e))
+                else:
+                    self._committed([order])
+        else:
+            self._committed(orders)
+
+    def _committed(self, orders: List[Dict[str, Any]]) -> None:
+        with self._pending_lock:
+            for order in orders:
+                self._pending.pop(order['order_id'], None)
+                self._attempts.pop(order['order_id'], None)
+
+    def _retry(self, order: Dict[str, Any], reason: str) -> None:
+        attempts = self._attempts.get(order['order_id'], 0) + 1
+        if attempts >= MAX_WRITE_ATTEMPTS:
+            self._dead_letter(order, reason)
+            return
+        self._attempts[order['order_id']] = attempts
+        self._queue.put(order)
+
+    def _dead_letter(self, order: Dict[str, Any], reason: str) -> None:
+        """Set aside an order that cannot be written, so it can be repaired and replayed"""
+        count('orders.write_failed')
+        try:
+            with open(self.failed_path, 'a', encoding='utf-8') as out:
+                out.write(json.dumps({'reason': reason, 'order': order}, default=str) + '\n')
+        except OSError:
+            pass
+        self._committed([order])
+
+    @staticmethod
+    def _row(order: Dict[str, Any]) -> tuple:
+        return (
+            order['order_id'], order['order_date'], order.get('customer_name', ''), order.get('email', ''),
+            order.get('phone', ''), order.get('address', ''), int(order.get('total', 0)), order['status'],
+            json.dumps(order.get('items', []), default=int),
+        )
+
+    @staticmethod
+    def _order(row: sqlite3.Row) -> Dict[str, Any]:
+        order = dict(row)
+        order['items'] = json.loads(order['items'])
+        return order
+
+    def flush(self, timeout: Optional[float] = FLUSH_TIMEOUT) -> bool:
+        """Wait until every queued order has been written; False if ``timeout`` ran out first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def get(self, order_id: str) -> Optional[Dict[str, Any]]:
+        with self._pending_lock:
+            pending = self._pending.get(order_id)
+        if pending is not None:
+            return dict(pending)
+        row = self._reader().execute('SELECT * FROM orders WHERE order_id = ?', (order_id,)).fetchone()
+        return None if row is None else self._order(row)
+
+    def _with_pending(self, rows: List[sqlite3.Row], match) -> List[Dict[str, Any]]:
+        orders = {row['order_id']: self._order(row) for row in rows}
+        with self._pending_lock:
+            for order_id, order in self._pending.items():
+                if match(order):
+                    orders[order_id] = dict(order)
+        return [orders[order_id] for order_id in sorted(orders)]
+
+    def find_by_email(self, email: str) -> List[Dict[str, Any]]:
+        rows = self._reader().execute('SELECT * FROM orders WHERE email = ? ORDER BY order_id', (email,)).fetchall()
+        return self._with_pending(rows, lambda order: order.get('email') == email)
+
+    def find_by_date(self, start: str, end: str) -> List[Dict[str, Any]]:
+        """Orders with ``start <= order_date < end`` (``YYYY-MM-DD[ HH:MM:SS]`` strings)"""
+        rows = self._reader().execute(
+            'SELECT * FROM orders WHERE order_date >= ? AND order_date < ? ORDER BY order_id', (start, end)
+        ).fetchall()
+        return self._with_pending(rows, lambda order: start <= order['order_date'] < end)
+
+
+_stores: Dict[str, OrderStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_order_store(path: str = DEFAULT_ORDERS_DB) -> OrderStore:
+    """Process-wide order store for ``path`` (one writer thread per database)"""
+    path = os.path.abspath(path)
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None:
+                store = _stores[path] = OrderStore(path)
+    return store
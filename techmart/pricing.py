@@ -0,0 +1,155 @@
+"""Price parsing for chat messages ("under 500k", "₦400,000 - ₦600,000", "1.2m")
+and the sorted price index used to answer them"""
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+_AMOUNT = r'(₦|ngn|n)?\s*(\d[\d,]*(?:\.\d+)?)\s*(k|m|million|thousand)?\b'
+
+_RANGE_RE = re.compile(r'(?:between\s+)?' + _AMOUNT + r'\s*(?:-|–|to|and)\s*' + _AMOUNT)
+_MAX_RE = re.compile(r'(?:under|below|less than|cheaper than|at most|max(?:imum)?|up to|within|<=?|≤)\s*' + _AMOUNT)
+_MIN_RE = re.compile(r'(?:over|above|more than|at least|from|min(?:imum)?|>=?|≥)\s*' + _AMOUNT)
+
+# A number followed by one of these is a spec or a date, not a price ("16 GB", "15.6 inch", "144Hz")
+_UNIT_RE = re.compile(r'\s*(?:gb|tb|mb|ghz|hz|mhz|inch|"|-inch|p\b|th\b|nd\b|rd\b|w\b|wh\b|mah\b|cores?\b'
+                      r'|years?\b|yrs?\b)')
+
+# Bare numbers in this range are model years ("from 2020"), not prices
+_YEARS = range(1990, 2100)
+
+_MULTIPLIERS = {'k': 1_000, 'thousand': 1_000, 'm': 1_000_000, 'million': 1_000_000}
+
+PriceBounds = Tuple[Optional[int], Optional[int]]
+
+
+def parse_amount(number: str, suffix: Optional[str]) -> int:
+    """Convert a matched number and optional k/m suffix into naira
+
+    Bare numbers below 1,000 are read as thousands, since nobody shops for
+    a ₦500 laptop ("under 500" means ₦500,000).
+    """
+    value = float(number.replace(',', ''))
+    if suffix:
+        value *= _MULTIPLIERS[suffix]
+    elif value < 1_000:
+        value *= 1_000
+    return int(round(value))
+
+
+def _is_price(currency: Optional[str], number: str, suffix: Optional[str], following: str = '') -> bool:
+    """True if a matched amount reads as a price
+
+    Amounts followed by a unit ("16 GB", "15.6 inch", "144Hz") are specs,
+    bare years ("from 2020") are dates, and bare numbers below 100 are too
+    small to mean thousands of naira.
+    """
+    if _UNIT_RE.match(following):
+        return False
+    if suffix or currency:
+        return True
+    if number.isdigit() and int(number) in _YEARS:
+        return False
+    return float(number.replace(',', '')) >= 100
+
+
+def find_price_bounds(message: str) -> Tuple[PriceBounds, List[Tuple[int, int]]]:
+    """Return ``((min, max), spans)`` for the price constraint in ``message``
+
+    ``spans`` lists the character ranges that were consumed (empty when the
+    message holds no price constraint).
+
+    >>> find_price_bounds('hp laptops under 500k')[0]
+    (None, 500000)
+    >>> find_price_bounds('between 400 and 600k')[0]
+    (400000, 600000)
+    >>> find_price_bounds('at least 16 GB RAM')[0]
+    (None, None)
+    >>> find_price_bounds('more than 8 GB of ram')[0]
+    (None, None)
+    >>> find_price_bounds('dell laptops from 2020')[0]
+    (None, None)
+    >>> find_price_bounds('over 15.6 inch screen, above 120hz')[0]
+    (None, None)
+    """
+    text = message.lower()
+
+    match = _RANGE_RE.search(text)
+    if match:
+        low_currency, low_num, low_suffix, high_currency, high_num, high_suffix = match.groups()
+        # "400-600k" applies the trailing suffix to both ends
+        low_suffix = low_suffix or high_suffix
+        if (_is_price(low_currency, low_num, low_suffix)
+                and _is_price(high_currency, high_num, high_suffix, text[match.end():])):
+            low = parse_amount(low_num, low_suffix)
+            high = parse_amount(high_num, high_suffix)
+            if low > high:
+                low, high = high, low
+            return (low, high), [match.span()]
+
+    low = high = None
+    spans = []
+    for pattern in (_MAX_RE, _MIN_RE):
+        for match in pattern.finditer(text):
+            currency, number, suffix = match.groups()
+            if not _is_price(currency, number, suffix, text[match.end():]):
+                continue
+            value = parse_amount(number, suffix)
+            if pattern is _MAX_RE:
+                high = value
+            else:
+                low = value
+            spans.append(match.span())
+            break
+    return (low, high), sorted(spans)
+
+
+def parse_price_bounds(message: str) -> PriceBounds:
+    """Return ``(min, max)`` naira bounds mentioned in ``message`` (either may be None)"""
+    return find_price_bounds(message)[0]
+
+
+class PriceIndex:
+    """Catalog rows sorted by price once per catalog load, queried by binary search"""
+
+    def __init__(self, prices: np.ndarray, rows: Optional[np.ndarray] = None):
+        # ``rows`` may be passed in when the sort order is already known (catalog snapshots)
+        self.rows = np.argsort(prices, kind='stable') if rows is None else rows
+        self.prices = np.asarray(prices)[self.rows]
+        if self.rows.flags.writeable:
+            self.rows.setflags(write=False)
+        self.prices.setflags(write=False)
+
+    def patched(self, prices: np.ndarray, changed_rows: np.ndarray) -> 'PriceIndex':
+        """Index over ``prices`` (a changed catalog) where only ``changed_rows`` moved
+
+        The other rows keep their relative order, so only the changed rows are
+        sorted; rows past the end of ``prices`` are dropped.
+        """
+        prices = np.asarray(prices, dtype=np.int64)
+        keep = (self.rows < len(prices)) & ~np.isin(self.rows, changed_rows)
+        # Merge on (price, row), the order a stable argsort of the prices gives
+        width = max(len(prices), 1)
+        kept = self.rows[keep].astype(np.int64)
+        kept_keys = prices[kept] * width + kept
+        changed = np.asarray(changed_rows, dtype=np.int64)
+        changed_keys = np.sort(prices[changed] * width + changed)
+        merged = np.insert(kept_keys, np.searchsorted(kept_keys, changed_keys), changed_keys)
+        return PriceIndex(prices, rows=merged % width)
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    @property
+    def min_price(self) -> Optional[int]:
+        return int(self.prices[0]) if len(self.prices) else None
+
+    @property
+    def max_price(self) -> Optional[int]:
+        return int(self.prices[-1]) if len(self.prices) else None
+
+    def range_rows(self, low: Optional[int] = None, high: Optional[int] = None) -> np.ndarray:
+        """Row positions with ``low <= price <= high``, cheapest first"""
+        start = 0 if low is None else int(np.searchsorted(self.prices, low, side='left'))
+        end = len(self.prices) if high is None else int(np.searchsorted(self.prices, high, side='right'))
+        return self.rows[start:max(start, end)]
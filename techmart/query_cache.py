@@ -0,0 +1,153 @@
+"""Process-wide cache of search results for repeated chat queries
+
+Most chat searches are small variations of the same few dozen queries, so
+results are cached under a normalized key: the parsed spec/price filter
+plus the sorted, de-duplicated search terms (lowercased, stopwords
+dropped, misspellings corrected). "Cheap HP laptops" and "hp cheap" share
+an entry.
+
+Entries hold the matching row positions as a compact int32 array, plus
+whatever the engine memoizes next to them (the formatted reply listing).
+Keys include the catalog version, so a reload never serves stale rows and
+sessions still finishing a rerun on the old version keep their entries
+while new sessions fill in the new one. Only the ``MAX_VERSIONS`` newest
+versions are cached; putting a newer one drops the oldest version's
+entries. Entries also expire after ``TTL`` seconds and the least recently
+used ones are evicted to stay within ``MAX_BYTES``.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Sequence, Set
+
+import numpy as np
+
+from techmart.metrics import count
+
+# Memory budget for cached row arrays plus per-entry overhead
+MAX_BYTES = 32 * 1024 * 1024
+
+# Seconds an entry stays valid (catalog reloads invalidate sooner)
+TTL = 600.0
+
+# Catalog versions cached side by side (the current one and the one before a reload)
+MAX_VERSIONS = 2
+
+# Rough size of an entry's key, bookkeeping and memoized reply text
+ENTRY_OVERHEAD = 1024
+
+
+class CachedSearch:
+    """One cached result: matching rows, best first, plus memoized renderings"""
+    __slots__ = ('rows', 'created', 'listing')
+
+    def __init__(self, rows: np.ndarray, created: float):
+        self.rows = rows
+        self.created = created
+        # Set by the engine the first time the reply for these results is formatted
+        self.listing: Optional[Any] = None
+
+    @property
+    def size(self) -> int:
+        return self.rows.nbytes + ENTRY_OVERHEAD
+
+
+class QueryCache:
+    """LRU + TTL cache of search results, keyed by catalog version and query"""
+
+    def __init__(self, max_bytes: int = MAX_BYTES, ttl: float = TTL, max_versions: int = MAX_VERSIONS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_versions = max_versions
+        # (catalog version, query key) -> entry
+        self._entries: 'OrderedDict[Hashable, CachedSearch]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._versions: Set[int] = set()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def _admit(self, version: int) -> bool:
+        """Whether ``version`` may be cached, making room for it if it is newer than those kept"""
+        if version in self._versions:
+            return True
+        if len(self._versions) >= self.max_versions:
+            oldest = min(self._versions)
+            if version < oldest:
+                return False
+            stale = [key for key in self._entries if key[0] == oldest]
+            for key in stale:
+                self.bytes -= self._entries.pop(key).size
+            if stale:
+                count('query_cache.invalidated')
+            self._versions.discard(oldest)
+        self._versions.add(version)
+        return True
+
+    def get(self, version: int, key: Hashable) -> Optional[CachedSearch]:
+        """The live entry for ``key`` under catalog ``version`` (None on a miss)"""
+        key = (version, key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.created > self.ttl:
+                self.bytes -= self._entries.pop(key).size
+                entry = None
+            if entry is None:
+                self.misses += 1
+                count('query_cache.miss')
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        count('query_cache.hit')
+        return entry
+
+    def put(self, version: int, key: Hashable, rows: Sequence[int]) -> CachedSearch:
+        """Store ``rows`` for ``key``; results bigger than a quarter of the budget are not kept
+
+        Nor are results for a version older than every one kept.
+        """
+        entry = CachedSearch(np.asarray(rows, dtype=np.int32), time.monotonic())
+        if entry.size > self.max_bytes // 4:
+            return entry
+        key = (version, key)
+        with self._lock:
+            if not self._admit(version):
+                return entry
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.size
+            self._entries[key] = entry
+            self.bytes += entry.size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.size
+                self.evictions += 1
+                count('query_cache.evicted')
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self._versions.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count, memory use and hit rate since the process started"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'versions': sorted(self._versions),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared by every session and engine in the process
+QUERY_CACHE = QueryCache()
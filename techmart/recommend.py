@@ -0,0 +1,204 @@
+"""Similar-product recommendations from a numeric spec feature matrix
+
+Each catalog version is turned once into a float32 feature matrix: log
+price, category and brand one-hots, and the parsed spec columns (CPU tier
+and generation, RAM, storage, GPU, screen, refresh rate), standardized so
+no single column dominates the distance. Rows are then clustered with a
+few rounds of k-means into an inverted-file index. A lookup only scans
+the clusters nearest to the product, so it touches a few thousand rows
+whatever the catalog size, and the top-k come from ``np.argpartition``.
+Small catalogs use a single cluster, which makes the search exact.
+"""
+import threading
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from techmart.catalog import Catalog
+from techmart.metrics import span
+
+# Catalogs up to this size are searched exhaustively (one cluster)
+EXACT_ROWS = 4_096
+
+# Clusters scanned per lookup; filtered lists (cheaper/upgrade) scan twice as many
+PROBES = 8
+
+KMEANS_ITERATIONS = 8
+
+# Rows sampled to train the cluster centroids
+TRAINING_ROWS_PER_CLUSTER = 64
+
+# One-hot columns kept per categorical field (the most common values)
+MAX_ONE_HOT = 32
+
+# Relative weight of each feature group in the distance
+WEIGHTS = {
+    'price': 2.0,
+    'category': 1.5,
+    'brand': 0.75,
+    'specs': 1.0,
+}
+
+# A cheaper alternative costs at least this much less
+CHEAPER_MARGIN = 0.05
+
+# An upgrade's spec score beats the product's by at least this (in standard deviations)
+UPGRADE_MARGIN = 0.25
+
+_SPEC_FEATURES = ['cpu_tier', 'cpu_generation', 'ram_gb', 'storage_gb', 'gpu_model', 'screen_in', 'refresh_hz']
+_LOG_FEATURES = {'ram_gb', 'storage_gb'}
+_PERFORMANCE_FEATURES = ['cpu_tier', 'cpu_generation', 'ram_gb', 'storage_gb', 'gpu_model', 'gpu_dedicated']
+
+
+def _standardize(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.float32)
+    std = values.std()
+    return (values - values.mean()) / (std if std > 0 else 1.0)
+
+
+def _one_hot(column: pd.Series) -> np.ndarray:
+    """Indicator columns for the ``MAX_ONE_HOT`` most common values"""
+    top = column.value_counts().index[:MAX_ONE_HOT]
+    codes = pd.Index(top).get_indexer(column)
+    matrix = np.zeros((len(column), len(top)), dtype=np.float32)
+    known = codes >= 0
+    matrix[np.flatnonzero(known), codes[known]] = 1.0
+    # Two different values end up one unit apart, like one standard deviation
+    return matrix / np.sqrt(2)
+
+
+def build_features(df: pd.DataFrame) -> np.ndarray:
+    """The ``rows x features`` float32 matrix used for similarity"""
+    groups = [
+        WEIGHTS['price'] * _standardize(np.log(np.maximum(df['price'].to_numpy(), 1)))[:, None],
+        WEIGHTS['category'] * _one_hot(df['category']),
+        WEIGHTS['brand'] * _one_hot(df['brand']),
+    ]
+    specs = []
+    for name in _SPEC_FEATURES:
+        values = df[name].to_numpy().astype(np.float32)
+        specs.append(_standardize(np.log2(1 + values) if name in _LOG_FEATURES else values))
+    specs.append(_standardize((df['storage_type'] == 'ssd').to_numpy()))
+    specs.append(_standardize(df['gpu_dedicated'].to_numpy()))
+    # Nine columns: scaled down so the group weighs about as much as three features
+    groups.append(WEIGHTS['specs'] * np.column_stack(specs) / np.sqrt(len(specs) / 3))
+    return np.ascontiguousarray(np.hstack(groups), dtype=np.float32)
+
+
+def performance_score(df: pd.DataFrame) -> np.ndarray:
+    """Higher is a more capable machine (sum of standardized spec columns)"""
+    score = np.zeros(len(df), dtype=np.float32)
+    for name in _PERFORMANCE_FEATURES:
+        values = df[name].to_numpy().astype(np.float32)
+        score += _standardize(np.log2(1 + values) if name in _LOG_FEATURES else values)
+    return score
+
+
+def _nearest(points: np.ndarray, centroids: np.ndarray, chunk: int = 16_384) -> np.ndarray:
+    """Index of the closest centroid for every point"""
+    centroid_norms = (centroids * centroids).sum(axis=1)
+    labels = np.empty(len(points), dtype=np.int32)
+    for start in range(0, len(points), chunk):
+        block = points[start:start + chunk]
+        labels[start:start + chunk] = np.argmin(centroid_norms - 2 * block @ centroids.T, axis=1)
+    return labels
+
+
+def _kmeans(points: np.ndarray, clusters: int, seed: int = 0) -> np.ndarray:
+    """Centroids from Lloyd's iterations on a sample of ``points``"""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(points), clusters * TRAINING_ROWS_PER_CLUSTER)
+    sample = points[rng.choice(len(points), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, clusters, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        labels = _nearest(sample, centroids)
+        counts = np.bincount(labels, minlength=clusters)
+        filled = counts > 0
+        for dim in range(points.shape[1]):
+            sums = np.bincount(labels, weights=sample[:, dim], minlength=clusters)
+            centroids[filled, dim] = sums[filled] / counts[filled]
+    return centroids
+
+
+class Recommender:
+    """Nearest neighbours over one catalog version's feature matrix"""
+
+    def __init__(self, catalog: Catalog):
+        df = catalog.df
+        features = build_features(df)
+        self.prices = df['price'].to_numpy()
+        self.scores = performance_score(df)
+
+        clusters = 1 if len(df) <= EXACT_ROWS else int(np.sqrt(len(df)))
+        if clusters == 1:
+            self.centroids = features.mean(axis=0, keepdims=True) if len(df) else np.zeros((1, features.shape[1]))
+            labels = np.zeros(len(df), dtype=np.int32)
+        else:
+            self.centroids = _kmeans(features, clusters)
+            labels = _nearest(features, self.centroids)
+
+        # Rows grouped by cluster so each cluster is one contiguous slice
+        order = np.argsort(labels, kind='stable')
+        self.rows = order
+        self.features = features[order]
+        self.norms = (self.features * self.features).sum(axis=1)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=len(self.centroids)))])
+        self.position = np.empty(len(df), dtype=np.int64)
+        self.position[order] = np.arange(len(df))
+
+    def _neighbours(self, row: int, limit: int, probes: int, exclude: Sequence[int],
+                    keep: Optional[Callable[[np.ndarray], np.ndarray]] = None) -> List[int]:
+        query = self.features[self.position[row]]
+        to_centroids = ((self.centroids - query) ** 2).sum(axis=1)
+        if probes < len(to_centroids):
+            nearest = np.argpartition(to_centroids, probes)[:probes]
+        else:
+            nearest = np.arange(len(to_centroids))
+        spans = [np.arange(self.offsets[cluster], self.offsets[cluster + 1]) for cluster in nearest]
+        candidates = np.concatenate(spans) if spans else np.empty(0, dtype=np.int64)
+
+        rows = self.rows[candidates]
+        allowed = ~np.isin(rows, [row, *exclude])
+        if keep is not None:
+            allowed &= keep(rows)
+        candidates, rows = candidates[allowed], rows[allowed]
+        if not len(rows):
+            return []
+        distances = self.norms[candidates] - 2 * self.features[candidates] @ query
+        if limit < len(distances):
+            top = np.argpartition(distances, limit)[:limit]
+        else:
+            top = np.arange(len(distances))
+        top = top[np.argsort(distances[top], kind='stable')]
+        return rows[top].tolist()
+
+    def similar(self, row: int, limit: int = 3, exclude: Sequence[int] = ()) -> List[int]:
+        """Rows of the laptops closest to ``row`` overall"""
+        return self._neighbours(row, limit, PROBES, exclude)
+
+    def cheaper(self, row: int, limit: int = 3, exclude: Sequence[int] = ()) -> List[int]:
+        """Closest laptops costing at least ``CHEAPER_MARGIN`` less"""
+        ceiling = self.prices[row] * (1 - CHEAPER_MARGIN)
+        return self._neighbours(row, limit, PROBES * 2, exclude, keep=lambda rows: self.prices[rows] <= ceiling)
+
+    def upgrades(self, row: int, limit: int = 3, exclude: Sequence[int] = ()) -> List[int]:
+        """Closest laptops that cost more and have clearly better specs"""
+        price, score = self.prices[row], self.scores[row] + UPGRADE_MARGIN
+        return self._neighbours(row, limit, PROBES * 2, exclude,
+                                keep=lambda rows: (self.prices[rows] > price) & (self.scores[rows] >= score))
+
+
+_build_lock = threading.Lock()
+
+
+def get_recommender(catalog: Catalog) -> Recommender:
+    """The catalog version's recommender, built on first use"""
+    recommender = catalog.derived.get('recommender')
+    if recommender is None:
+        with _build_lock:
+            recommender = catalog.derived.get('recommender')
+            if recommender is None:
+                with span('recommend.build'):
+                    recommender = catalog.derived['recommender'] = Recommender(catalog)
+    return recommender
@@ -0,0 +1,137 @@
+"""Compiled intent router for chat messages
+
+The intent table below is declarative: each intent lists the phrases that
+vote for it and how much each vote is worth. ``IntentRouter`` compiles every
+phrase of every intent into one token trie, so classifying a message is a
+single left-to-right pass over its words whose cost depends on the message
+length and the longest phrase, not on how many keywords the table holds.
+Price bounds parsed from the message are exposed as slots and also vote
+for the ``price`` intent.
+"""
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from techmart.pricing import find_price_bounds
+from techmart.search import normalize_token
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+
+DEFAULT_INTENT = 'default'
+
+# Extra score for the price intent when a concrete budget was parsed
+PRICE_BOUNDS_WEIGHT = 2.0
+
+
+@dataclass(frozen=True)
+class Intent:
+    """One routable intent; ``priority`` breaks score ties (higher wins)"""
+    name: str
+    priority: int
+    phrases: Tuple[str, ...]
+    weight: float = 1.0
+
+
+INTENTS = (
+    Intent('greeting', 1, ('hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening')),
+    Intent('help', 2, ('help', 'what can you do', 'how does this work'), weight=2.0),
+    Intent('search', 3, (
+        'laptop', 'notebook', 'search', 'find', 'looking for', 'show me', 'recommend',
+        'gaming', 'business', 'budget', 'ultrabook', 'workstation', '2-in-1', 'convertible',
+        'rtx', 'gtx', 'ssd', 'ram', 'i3', 'i5', 'i7', 'i9', 'ryzen', 'oled', 'touchscreen',
+    )),
+    Intent('search', 3, ('hp', 'dell', 'lenovo'), weight=2.0),
+    Intent('price', 4, (
+        'price', 'cost', 'budget', 'cheap', 'cheapest', 'affordable', 'expensive', 'how much', 'naira',
+    )),
+    Intent('cart', 5, ('cart', 'checkout', 'basket', 'my order'), weight=2.0),
+    Intent('order', 6, ('add', 'buy', 'purchase', 'order', "i'll take", 'take it'), weight=3.0),
+    # Outweighs the brand and spec words of the products being compared
+    Intent('compare', 7, ('compare', 'comparison', 'versus', 'vs', 'difference between', 'which is better',
+                          'side by side'), weight=8.0),
+    # Clears the search filters kept across turns; outweighs the words of a new search after it
+    Intent('reset', 8, ('reset', 'clear filters', 'clear all filters', 'remove filters', 'start over', 'new search',
+                        'clear search'), weight=8.0),
+)
+
+
+def tokenize_message(message: str) -> List[str]:
+    """Lowercase word tokens with simple plurals folded ('laptops' -> 'laptop')"""
+    return [normalize_token(token) for token in _WORD_RE.findall(message.lower())]
+
+
+class IntentRouter:
+    """Scores every intent in one pass over the message and picks the best"""
+
+    def __init__(self, intents: Iterable[Intent] = INTENTS):
+        self.priorities: Dict[str, int] = {}
+        # token -> child node; the None key holds (intent, weight) votes
+        self.trie: Dict[Any, Any] = {}
+        self.max_phrase_len = 0
+        for intent in intents:
+            self.priorities[intent.name] = max(intent.priority, self.priorities.get(intent.name, intent.priority))
+            for phrase in intent.phrases:
+                tokens = tokenize_message(phrase)
+                node = self.trie
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                node.setdefault(None, []).append((intent.name, intent.weight))
+                self.max_phrase_len = max(self.max_phrase_len, len(tokens))
+
+    def _match(self, tokens: List[str], start: int) -> Tuple[int, Optional[list]]:
+        """Longest phrase starting at ``start``: (length, votes)"""
+        node = self.trie
+        best_len, best_votes = 0, None
+        for offset in range(min(self.max_phrase_len, len(tokens) - start)):
+            node = node.get(tokens[start + offset])
+            if node is None:
+                break
+            if None in node:
+                best_len, best_votes = offset + 1, node[None]
+        return best_len, best_votes
+
+    def score(self, message: str) -> Tuple[Dict[str, float], Dict[str, Any]]:
+        """Return per-intent scores and the slots extracted from ``message``"""
+        tokens = tokenize_message(message)
+        scores: Dict[str, float] = {}
+        keywords: List[str] = []
+
+        position = 0
+        while position < len(tokens):
+            length, votes = self._match(tokens, position)
+            if not votes:
+                position += 1
+                continue
+            keywords.append(' '.join(tokens[position:position + length]))
+            for name, weight in votes:
+                scores[name] = scores.get(name, 0.0) + weight
+            position += length
+
+        slots: Dict[str, Any] = {'keywords': keywords, 'tokens': tokens}
+        (min_price, max_price), _ = find_price_bounds(message)
+        if min_price is not None or max_price is not None:
+            slots['min_price'], slots['max_price'] = min_price, max_price
+            scores['price'] = scores.get('price', 0.0) + PRICE_BOUNDS_WEIGHT
+        slots['scores'] = scores
+        return scores, slots
+
+    def best(self, scores: Dict[str, float], exclude: Iterable[str] = ()) -> str:
+        """Highest scoring intent (ties go to priority), ignoring ``exclude``"""
+        candidates = [name for name in scores if name not in exclude]
+        if not candidates:
+            return DEFAULT_INTENT
+        return max(candidates, key=lambda name: (scores[name], self.priorities.get(name, 0)))
+
+    def classify(self, message: str) -> Tuple[str, Dict[str, Any]]:
+        """Return ``(intent, slots)``; ``slots['scores']`` holds every intent's score"""
+        scores, slots = self.score(message)
+        return self.best(scores), slots
+
+
+# Compiled once per process; the table is static
+ROUTER = IntentRouter()
+
+
+def classify(message: str) -> Tuple[str, Dict[str, Any]]:
+    """Classify ``message`` with the default intent table"""
+    return ROUTER.classify(message)
@@ -0,0 +1,258 @@
+"""Inverted-index product search
+
+The index is built once per catalog version. A query is tokenized the same
+way as the indexed text, the posting lists of its terms are intersected
+(falling back to a union when no product matches every term), and the
+candidates are ranked by how strongly each term matched: a brand or
+category hit outweighs a hit buried in the specifications.
+"""
+import heapq
+import re
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Field weights used for ranking; a term scores the best field it appears in
+FIELD_WEIGHTS = {
+    'brand': 5.0,
+    'category': 4.0,
+    'name': 3.0,
+    'specifications': 1.0,
+}
+
+# Filler words that carry no product information in chat queries
+STOPWORDS = frozenset("""
+    a an and any are at be can do for from get give have i im in is it me my of on or
+    please show some that the there to want what which with you your looking find search
+    need would like got laptop laptops notebook notebooks computer computers pc
+""".split())
+
+
+def normalize_token(token: str) -> str:
+    """Fold simple plurals so 'laptops' and 'laptop' share a posting list"""
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss') and not token[-2].isdigit():
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized index terms (stopwords removed)"""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        token = normalize_token(token)
+        if token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+class PackedPostings(Mapping):
+    """Read-only term -> {row: weight} view over flat (CSR) posting arrays
+
+    Used for indexes loaded from a catalog snapshot: a term's posting dict
+    is only materialized the first time a query touches it.
+    """
+
+    def __init__(self, terms: Sequence[str], offsets: np.ndarray, rows: np.ndarray, weights: np.ndarray):
+        self._slots = {term: slot for slot, term in enumerate(terms)}
+        self._offsets = offsets
+        self._rows = rows
+        self._weights = weights
+        self._cache: Dict[str, Dict[int, float]] = {}
+
+    def __getitem__(self, term: str) -> Dict[int, float]:
+        posting = self._cache.get(term)
+        if posting is None:
+            slot = self._slots[term]
+            start, end = int(self._offsets[slot]), int(self._offsets[slot + 1])
+            posting = self._cache[term] = dict(zip(self._rows[start:end].tolist(), self._weights[start:end].tolist()))
+        return posting
+
+    def __contains__(self, term: object) -> bool:
+        return term in self._slots
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._slots)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+
+class PatchedPostings(Mapping):
+    """Copy-on-write view of another postings mapping with some rows changed
+
+    ``patch`` maps term -> {row: weight}, where a weight of None removes the
+    row. Terms the patch does not touch share the base posting dicts; a
+    patched term's dict is rebuilt the first time a query needs it. Patches
+    from successive catalog reloads are folded into one layer.
+    """
+
+    def __init__(self, base: Mapping, patch: Dict[str, Dict[int, Optional[float]]]):
+        cache: Dict[str, Dict[int, float]] = {}
+        if isinstance(base, PatchedPostings):
+            merged = dict(base._patch)
+            for term, rows in patch.items():
+                merged[term] = {**merged.get(term, {}), **rows}
+            cache = {term: posting for term, posting in dict(base._cache).items() if term not in patch}
+            base, patch = base._base, merged
+        self._base = base
+        self._patch = patch
+        self._cache = cache
+
+    def _patched(self, term: str) -> Dict[int, float]:
+        posting = self._cache.get(term)
+        if posting is None:
+            posting = dict(self._base[term]) if term in self._base else {}
+            for row, weight in self._patch[term].items():
+                if weight is None:
+                    posting.pop(row, None)
+                else:
+                    posting[row] = weight
+            self._cache[term] = posting
+        return posting
+
+    def __getitem__(self, term: str) -> Dict[int, float]:
+        if term not in self._patch:
+            return self._base[term]
+        posting = self._patched(term)
+        if not posting:
+            raise KeyError(term)
+        return posting
+
+    def __contains__(self, term: object) -> bool:
+        if term in self._patch:
+            return bool(self._patched(term))
+        return term in self._base
+
+    def __iter__(self) -> Iterator[str]:
+        for term in self._base:
+            if term not in self._patch:
+                yield term
+        for term in self._patch:
+            if self._patched(term):
+                yield term
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+def row_terms(df: pd.DataFrame) -> List[Dict[str, float]]:
+    """``{term: weight}`` for each row of ``df``, weighted as ``SearchIndex.build`` does"""
+    terms: List[Dict[str, float]] = [{} for _ in range(len(df))]
+    for field, weight in FIELD_WEIGHTS.items():
+        for row, text in enumerate(df[field].tolist()):
+            for term in set(tokenize(text)):
+                if weight > terms[row].get(term, 0.0):
+                    terms[row][term] = weight
+    return terms
+
+
+class SearchIndex:
+    """Term -> {row position: weight} postings over the catalog's text fields"""
+
+    def __init__(self, postings: Mapping, ids: List[int]):
+        self.postings = postings
+        self.ids = ids
+
+    def to_arrays(self) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """Flatten the postings into ``(terms, offsets, rows, weights)`` for storage"""
+        terms = list(self.postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        rows: List[int] = []
+        weights: List[float] = []
+        for slot, term in enumerate(terms):
+            posting = self.postings[term]
+            rows.extend(posting.keys())
+            weights.extend(posting.values())
+            offsets[slot + 1] = len(rows)
+        return terms, offsets, np.asarray(rows, dtype=np.int32), np.asarray(weights, dtype=np.float32)
+
+    @classmethod
+    def from_arrays(cls, terms: Sequence[str], offsets: np.ndarray, rows: np.ndarray, weights: np.ndarray,
+                    ids: List[int]) -> 'SearchIndex':
+        """Inverse of ``to_arrays``; postings are unpacked lazily per term"""
+        return cls(PackedPostings(terms, offsets, rows, weights), ids)
+
+    def patched(self, old: pd.DataFrame, old_rows: Sequence[int], new: pd.DataFrame, new_rows: Sequence[int],
+                ids: List[int]) -> 'SearchIndex':
+        """Copy with the text of ``old`` unindexed at ``old_rows`` and ``new`` indexed at ``new_rows``
+
+        Only the given rows are tokenized; this index is left untouched.
+        """
+        patch: Dict[str, Dict[int, Optional[float]]] = {}
+        for row, terms in zip(old_rows, row_terms(old)):
+            for term in terms:
+                patch.setdefault(term, {})[int(row)] = None
+        for row, terms in zip(new_rows, row_terms(new)):
+            for term, weight in terms.items():
+                patch.setdefault(term, {})[int(row)] = weight
+        return SearchIndex(PatchedPostings(self.postings, patch), ids)
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> 'SearchIndex':
+        postings: Dict[str, Dict[int, float]] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for row, text in enumerate(df[field].tolist()):
+                for term in set(tokenize(text)):
+                    posting = postings.setdefault(term, {})
+                    if weight > posting.get(row, 0.0):
+                        posting[row] = weight
+        return cls(postings, [int(i) for i in df['id'].tolist()])
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.postings
+
+    def has_terms(self, query: str) -> bool:
+        """True if any term of ``query`` occurs in the index"""
+        return any(term in self.postings for term in tokenize(query))
+
+    def co_occur(self, terms: Sequence[str]) -> bool:
+        """True if some product holds every one of ``terms``"""
+        if any(term not in self.postings for term in terms):
+            return False
+        ordered = sorted(set(terms), key=lambda t: len(self.postings[t]))
+        if not ordered:
+            return False
+        candidates = set(self.postings[ordered[0]])
+        for term in ordered[1:]:
+            candidates.intersection_update(self.postings[term])
+            if not candidates:
+                return False
+        return True
+
+    def _score(self, terms: Iterable[str]) -> Dict[int, float]:
+        known = sorted({t for t in terms if t in self.postings}, key=lambda t: len(self.postings[t]))
+        if not known:
+            return {}
+
+        # Intersect starting from the rarest term so the candidate set stays small
+        candidates = set(self.postings[known[0]])
+        for term in known[1:]:
+            candidates.intersection_update(self.postings[term])
+            if not candidates:
+                break
+
+        scores: Dict[int, float] = {}
+        if candidates:
+            for row in candidates:
+                scores[row] = sum(self.postings[term][row] for term in known)
+        else:
+            for term in known:
+                for row, weight in self.postings[term].items():
+                    scores[row] = scores.get(row, 0.0) + weight
+        return scores
+
+    def search_rows(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """Return matching row positions, best match first"""
+        scores = self._score(tokenize(query))
+        key = lambda row: (scores[row], -row)
+        if limit is None or limit >= len(scores):
+            return sorted(scores, key=key, reverse=True)
+        return heapq.nlargest(limit, scores, key=key)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """Return product ids ranked by relevance to ``query``"""
+        return [self.ids[row] for row in self.search_rows(query, limit)]
@@ -0,0 +1,184 @@
+"""Columnar binary snapshots of a prepared catalog
+
+``python -m techmart.snapshot products.csv`` parses the CSV once and
+writes ``products.csv.snapshot/``: one ``.npy`` file per numeric column,
+codes plus categories for categorical spec columns, a NUL-joined UTF-8
+string pool per text column, and the search and price indexes in flat
+array form. The manifest records the CSV's ``(mtime_ns, size)``, so a
+snapshot is only used while the CSV it was compiled from is unchanged;
+otherwise the catalog falls back to parsing the CSV.
+
+Numeric columns and index arrays are memory-mapped read-only, so startup
+costs little more than decoding the string pools, and worker processes
+loading the same snapshot share those pages through the OS page cache.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from techmart.pricing import PriceIndex
+from techmart.search import FIELD_WEIGHTS, STOPWORDS, SearchIndex
+
+if TYPE_CHECKING:
+    from techmart.catalog import Catalog
+
+# Bump whenever the prepared columns or the index layout change
+FORMAT_VERSION = 1
+
+SNAPSHOT_SUFFIX = '.snapshot'
+
+_MANIFEST = 'manifest.json'
+_SEPARATOR = '\x00'
+
+
+class SnapshotParts(NamedTuple):
+    df: pd.DataFrame
+    search_index: SearchIndex
+    price_index: PriceIndex
+
+
+def snapshot_path(csv_path: str) -> str:
+    return os.path.abspath(csv_path) + SNAPSHOT_SUFFIX
+
+
+def _index_fingerprint() -> str:
+    """Changes whenever tokenization settings would produce a different index"""
+    settings = json.dumps([FIELD_WEIGHTS, sorted(STOPWORDS)])
+    return hashlib.sha1(settings.encode('utf-8')).hexdigest()
+
+
+def _write_strings(path: str, values: List[str]) -> None:
+    if any(_SEPARATOR in value for value in values):
+        raise ValueError(f"NUL character in text column for {os.path.basename(path)}")
+    with open(path, 'wb') as f:
+        f.write(_SEPARATOR.join(values).encode('utf-8'))
+
+
+def _read_strings(path: str, count: int) -> List[str]:
+    if count == 0:
+        return []
+    with open(path, 'rb') as f:
+        values = f.read().decode('utf-8').split(_SEPARATOR)
+    if len(values) != count:
+        raise ValueError(f"{os.path.basename(path)}: expected {count} strings, found {len(values)}")
+    return values
+
+
+def write_snapshot(catalog: 'Catalog', directory: Optional[str] = None) -> str:
+    """Write ``catalog`` as a snapshot of its source CSV; returns the directory
+
+    The files are written to a temporary directory that then replaces the
+    old snapshot, so readers never see a half-written one.
+    """
+    directory = directory or snapshot_path(catalog.source)
+    parent = os.path.dirname(directory)
+    staging = tempfile.mkdtemp(prefix='.snapshot-', dir=parent)
+    try:
+        columns: List[Dict[str, Any]] = []
+        for name in catalog.df.columns:
+            series = catalog.df[name]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                np.save(os.path.join(staging, f'{name}.codes.npy'), series.cat.codes.to_numpy())
+                columns.append({'name': name, 'kind': 'category', 'categories': series.cat.categories.tolist()})
+            elif series.dtype.kind in 'biuf':
+                np.save(os.path.join(staging, f'{name}.npy'), series.to_numpy())
+                columns.append({'name': name, 'kind': 'array'})
+            else:
+                _write_strings(os.path.join(staging, f'{name}.txt'), [str(value) for value in series.tolist()])
+                columns.append({'name': name, 'kind': 'text'})
+
+        terms, offsets, rows, weights = catalog.search_index.to_arrays()
+        _write_strings(os.path.join(staging, 'search.terms.txt'), terms)
+        np.save(os.path.join(staging, 'search.offsets.npy'), offsets)
+        np.save(os.path.join(staging, 'search.rows.npy'), rows)
+        np.save(os.path.join(staging, 'search.weights.npy'), weights)
+        np.save(os.path.join(staging, 'price.rows.npy'), catalog.price_index.rows)
+
+        manifest = {
+            'format': FORMAT_VERSION,
+            'index': _index_fingerprint(),
+            'source': catalog.source,
+            'signature': list(catalog.signature) if catalog.signature else None,
+            'rows': len(catalog.df),
+            'terms': len(terms),
+            'columns': columns,
+        }
+        with open(os.path.join(staging, _MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=1)
+
+        # Swap the new snapshot in; the old one (if any) is removed afterwards
+        retired = None
+        if os.path.exists(directory):
+            retired = tempfile.mkdtemp(prefix='.snapshot-old-', dir=parent)
+            os.replace(directory, os.path.join(retired, 'snapshot'))
+        os.replace(staging, directory)
+        if retired:
+            shutil.rmtree(retired, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return directory
+
+
+def read_snapshot(csv_path: str, signature: Tuple[int, int]) -> Optional[SnapshotParts]:
+    """Load the snapshot compiled from ``csv_path`` at ``signature``
+
+    Returns None when there is no snapshot or it is stale, unreadable or
+    from an incompatible format; the caller then parses the CSV.
+    """
+    directory = snapshot_path(csv_path)
+    try:
+        with open(os.path.join(directory, _MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (manifest.get('format') != FORMAT_VERSION or manifest.get('index') != _index_fingerprint()
+            or manifest.get('signature') != list(signature)):
+        return None
+
+    def load(name: str) -> np.ndarray:
+        return np.load(os.path.join(directory, name), mmap_mode='r')
+
+    try:
+        rows = manifest['rows']
+        data: Dict[str, Any] = {}
+        for column in manifest['columns']:
+            name, kind = column['name'], column['kind']
+            if kind == 'array':
+                data[name] = load(f'{name}.npy')
+            elif kind == 'category':
+                data[name] = pd.Categorical.from_codes(load(f'{name}.codes.npy'), column['categories'])
+            else:
+                data[name] = _read_strings(os.path.join(directory, f'{name}.txt'), rows)
+        df = pd.DataFrame(data, copy=False)
+
+        terms = _read_strings(os.path.join(directory, 'search.terms.txt'), manifest['terms'])
+        search_index = SearchIndex.from_arrays(terms, load('search.offsets.npy'), load('search.rows.npy'),
+                                               load('search.weights.npy'), df['id'].tolist())
+        price_index = PriceIndex(df['price'].to_numpy(), rows=load('price.rows.npy'))
+    except (OSError, ValueError, KeyError):
+        return None
+    if len(df) != rows:
+        return None
+    return SnapshotParts(df, search_index, price_index)
+
+
+def main() -> None:
+    # Imported here: techmart.catalog itself imports this module
+    from techmart.catalog import DEFAULT_CATALOG_PATH, compile_snapshot
+
+    parser = argparse.ArgumentParser(description="Compile a product CSV into a columnar catalog snapshot")
+    parser.add_argument('csv', nargs='?', default=DEFAULT_CATALOG_PATH)
+    args = parser.parse_args()
+    print(f"Wrote {compile_snapshot(args.csv)}")
+
+
+if __name__ == '__main__':
+    main()
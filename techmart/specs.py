@@ -0,0 +1,266 @@
+"""Structured parsing of the free-text ``specifications`` column
+
+``parse_specifications`` runs once per catalog load and turns strings such as
+``Intel Core i7-1165G7, 16GB RAM, 512GB SSD, NVIDIA RTX 3060, 15.6" FHD 144Hz
+Display, Windows 11`` into typed, NumPy-backed columns. ``SpecFilter`` then
+answers constraints like "16GB+ RAM, SSD, RTX GPU, under 600k" with boolean
+masks over those columns, so no regex runs per row at request time.
+"""
+import re
+from dataclasses import dataclass, fields
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from techmart.pricing import find_price_bounds
+
+# Columns added to the catalog by parse_specifications
+SPEC_COLUMNS = [
+    'cpu_family', 'cpu_tier', 'cpu_generation', 'ram_gb', 'storage_gb', 'storage_type',
+    'gpu', 'gpu_series', 'gpu_model', 'gpu_dedicated', 'screen_in', 'refresh_hz', 'os',
+]
+
+# Assumed when a spec string does not mention a refresh rate
+DEFAULT_REFRESH_HZ = 60
+
+_GPU_SERIES = ['rtx', 'gtx', 'quadro', 'mx', 'radeon', 'iris xe', 'uhd']
+
+
+def _intel_generation(model: str) -> int:
+    # 11300H / 1165G7 -> 11, 8565U -> 8
+    if len(model) >= 5 or (len(model) == 4 and model.startswith('1')):
+        return int(model[:2])
+    return int(model[:1])
+
+
+def parse_specifications(specifications: pd.Series) -> pd.DataFrame:
+    """Extract typed spec columns (one row per product) from raw spec strings"""
+    text = specifications.fillna('').astype(str).str.lower()
+
+    intel = text.str.extract(r'\b(i[3579])-(\d{4,5})')
+    ryzen = text.str.extract(r'ryzen\s*([3579])\s*(\d)\d{3}')
+    entry = text.str.extract(r'\b(celeron|pentium|athlon)\b')[0]
+
+    cpu_family = intel[0].where(intel[0].notna(), 'ryzen ' + ryzen[0])
+    cpu_family = cpu_family.where(cpu_family.notna(), entry).fillna('other')
+    cpu_tier = intel[0].str[1].where(intel[0].notna(), ryzen[0])
+    cpu_tier = pd.to_numeric(cpu_tier, errors='coerce').fillna(entry.notna().astype(int)).astype(np.int8)
+    cpu_generation = intel[1].map(_intel_generation, na_action='ignore')
+    cpu_generation = cpu_generation.where(cpu_generation.notna(), pd.to_numeric(ryzen[1], errors='coerce'))
+
+    storage = text.str.extract(r'(\d+(?:\.\d+)?)\s*(gb|tb)\s*(ssd|hdd|emmc)')
+    storage_gb = pd.to_numeric(storage[0], errors='coerce') * np.where(storage[1] == 'tb', 1024, 1)
+
+    gpu = specifications.fillna('').astype(str).str.extract(
+        r'((?:NVIDIA|AMD Radeon|Intel (?:Iris Xe|UHD))[^,]*)', flags=re.IGNORECASE)[0]
+    gpu_lower = gpu.str.lower()
+    gpu_series = gpu_lower.str.extract('(' + '|'.join(_GPU_SERIES) + ')')[0]
+    gpu_model = gpu_lower.str.extract(r'(?:rtx|gtx|mx|quadro)\s*a?t?(\d{3,4})')[0]
+
+    return pd.DataFrame({
+        'cpu_family': pd.Categorical(cpu_family),
+        'cpu_tier': cpu_tier,
+        'cpu_generation': cpu_generation.fillna(0).astype(np.int16),
+        'ram_gb': pd.to_numeric(text.str.extract(r'(\d+)\s*gb\s*ram')[0], errors='coerce').fillna(0).astype(np.int16),
+        'storage_gb': storage_gb.fillna(0).astype(np.int32),
+        'storage_type': pd.Categorical(storage[2].fillna('unknown')),
+        'gpu': gpu.fillna('').astype(str),
+        'gpu_series': pd.Categorical(gpu_series.fillna('other')),
+        'gpu_model': pd.to_numeric(gpu_model, errors='coerce').fillna(0).astype(np.int16),
+        'gpu_dedicated': gpu_lower.str.contains('nvidia', na=False).to_numpy(dtype=bool),
+        'screen_in': pd.to_numeric(text.str.extract(r'(\d{2}(?:\.\d)?)"')[0], errors='coerce').fillna(0).astype(np.float32),
+        'refresh_hz': pd.to_numeric(text.str.extract(r'(\d{2,3})\s*hz')[0], errors='coerce').fillna(DEFAULT_REFRESH_HZ).astype(np.int16),
+        'os': pd.Categorical(text.str.extract(r'(windows \d+(?: pro| s| home)?|chrome ?os|ubuntu|linux)')[0].fillna('none')),
+    }, index=specifications.index)
+
+
+@dataclass
+class SpecFilter:
+    """Constraints over the parsed spec columns (``None`` means unconstrained)"""
+    min_price: Optional[int] = None
+    max_price: Optional[int] = None
+    min_ram_gb: Optional[int] = None
+    max_ram_gb: Optional[int] = None
+    min_storage_gb: Optional[int] = None
+    storage_type: Optional[str] = None
+    gpu_series: Optional[str] = None
+    min_gpu_model: Optional[int] = None
+    gpu_dedicated: Optional[bool] = None
+    cpu_family: Optional[str] = None
+    min_cpu_tier: Optional[int] = None
+    min_screen_in: Optional[float] = None
+    max_screen_in: Optional[float] = None
+    min_refresh_hz: Optional[int] = None
+    os: Optional[str] = None
+
+    def is_empty(self) -> bool:
+        return all(getattr(self, f.name) is None for f in fields(self))
+
+    def key(self) -> Tuple[Any, ...]:
+        """Hashable form of the constraints (field order), for cache keys"""
+        return tuple(self.__dict__.values())
+
+    def merged(self, newer: 'SpecFilter') -> 'SpecFilter':
+        """These constraints with each one that ``newer`` sets replaced by its value"""
+        return SpecFilter(**{f.name: getattr(self, f.name) if getattr(newer, f.name) is None else getattr(newer, f.name)
+                             for f in fields(self)})
+
+    def within(self, other: 'SpecFilter') -> bool:
+        """True if every product matching these constraints also matches ``other``"""
+        for f in fields(self):
+            mine, theirs = getattr(self, f.name), getattr(other, f.name)
+            if theirs is None:
+                continue
+            if mine is None:
+                return False
+            if f.name.startswith('min_'):
+                tighter = mine >= theirs
+            elif f.name.startswith('max_'):
+                tighter = mine <= theirs
+            else:
+                tighter = mine == theirs
+            if not tighter:
+                return False
+        return True
+
+    def mask(self, df: pd.DataFrame, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Vectorized boolean mask of the rows in ``df`` satisfying every constraint
+
+        With ``rows``, only those row positions are tested and the mask is
+        aligned with ``rows``.
+        """
+        mask = np.ones(len(df) if rows is None else len(rows), dtype=bool)
+
+        def take(values: np.ndarray) -> np.ndarray:
+            return values if rows is None else values[rows]
+
+        def bound(column, low=None, high=None):
+            if low is None and high is None:
+                return
+            values = take(df[column].to_numpy())
+            if low is not None:
+                mask[:] &= values >= low
+            if high is not None:
+                mask[:] &= values <= high
+
+        def equals(column, value):
+            categories = df[column].cat.categories
+            if value not in categories:
+                mask[:] = False
+            else:
+                mask[:] &= take(df[column].cat.codes.to_numpy()) == categories.get_loc(value)
+
+        bound('price', self.min_price, self.max_price)
+        bound('ram_gb', self.min_ram_gb, self.max_ram_gb)
+        bound('storage_gb', self.min_storage_gb)
+        bound('gpu_model', self.min_gpu_model)
+        bound('cpu_tier', self.min_cpu_tier)
+        bound('screen_in', self.min_screen_in, self.max_screen_in)
+        bound('refresh_hz', self.min_refresh_hz)
+        for column in ('storage_type', 'gpu_series', 'cpu_family', 'os'):
+            value = getattr(self, column)
+            if value is not None:
+                equals(column, value)
+        if self.gpu_dedicated is not None:
+            mask &= take(df['gpu_dedicated'].to_numpy()) == self.gpu_dedicated
+        return mask
+
+
+_AT_LEAST = r'(?:≥|>=|at least|min(?:imum)?(?: of)?|more than|over|above)'
+_AT_MOST = r'(?:≤|<=|at most|max(?:imum)?(?: of)?|up to|less than|under)'
+
+_STORAGE_RE = re.compile(_AT_LEAST + r'?\s*(\d+(?:\.\d+)?)\s*(gb|tb)\s*(ssd|hdd|emmc|storage)\b|(\d+(?:\.\d+)?)\s*tb\b')
+_RAM_RE = re.compile(r'(' + _AT_LEAST + '|' + _AT_MOST + r')?\s*(\d+)\s*gb\s*\+?\s*(?:of\s+)?(ram|memory)?\b')
+_STORAGE_TYPE_RE = re.compile(r'\b(ssd|hdd|emmc)\b')
+_GPU_RE = re.compile(r'\b(rtx|gtx|quadro|mx)\b\s*a?(\d{3,4})?')
+_DEDICATED_RE = re.compile(r'\b(?:dedicated|discrete)\s+(?:gpu|graphics)\b')
+_CPU_RE = re.compile(r'\b(?:intel\s+)?(?:core\s+)?(i[3579])\b|\bryzen\s*([3579])\b|\b(celeron|pentium)\b')
+_SCREEN_RE = re.compile(r'(\d{2}(?:\.\d)?)\s*(?:"|-?\s*inch(?:es)?\b|-?\s*in\b)')
+_REFRESH_RE = re.compile(r'(\d{2,3})\s*hz\b|\bhigh[- ]refresh\b')
+
+
+def parse_spec_filter(message: str) -> Tuple[SpecFilter, str]:
+    """Parse spec and price constraints out of a chat message
+
+    Returns the filter plus the message with the consumed phrases removed,
+    so the remainder can still go through text search. A bare "16GB RAM" is
+    read as a minimum, which is what shoppers almost always mean. Storage
+    and memory sizes are taken before prices, so "at least 16 GB RAM" is
+    never read as a budget.
+
+    >>> spec, rest = parse_spec_filter('at least 16 GB RAM')
+    >>> spec.min_ram_gb, spec.min_price, rest
+    (16, None, '')
+    >>> spec, rest = parse_spec_filter('more than 8 GB of ram')
+    >>> spec.min_ram_gb, spec.min_price, rest
+    (8, None, '')
+    >>> spec, rest = parse_spec_filter('dell laptops from 2020')
+    >>> spec.is_empty(), rest
+    (True, 'dell laptops from 2020')
+    >>> spec, rest = parse_spec_filter('hp under 500k with 16gb')
+    >>> spec.max_price, spec.min_ram_gb, rest
+    (500000, 16, 'hp with')
+    """
+    text = message.lower()
+    spec = SpecFilter()
+    spans: List[Tuple[int, int]] = []
+
+    def free(match) -> bool:
+        start, end = match.span()
+        return all(end <= s or start >= e for s, e in spans)
+
+    for match in _STORAGE_RE.finditer(text):
+        if not free(match):
+            continue
+        if match.group(4):
+            spec.min_storage_gb = int(float(match.group(4)) * 1024)
+        else:
+            size = float(match.group(1)) * (1024 if match.group(2) == 'tb' else 1)
+            spec.min_storage_gb = int(size)
+            if match.group(3) != 'storage':
+                spec.storage_type = match.group(3)
+        spans.append(match.span())
+
+    for match in _RAM_RE.finditer(text):
+        qualifier, size, ram_word = match.groups()
+        # Without "RAM" only small sizes are plausibly memory ("with 16GB")
+        if not free(match) or (not ram_word and int(size) > 64):
+            continue
+        if qualifier and re.fullmatch(_AT_MOST, qualifier):
+            spec.max_ram_gb = int(size)
+        else:
+            spec.min_ram_gb = int(size)
+        spans.append(match.span())
+
+    # Prices are looked for with the storage and memory phrases blanked out
+    masked = text
+    for start, end in spans:
+        masked = masked[:start] + ' ' * (end - start) + masked[end:]
+    (spec.min_price, spec.max_price), price_spans = find_price_bounds(masked)
+    spans.extend(price_spans)
+
+    simple = [
+        (_STORAGE_TYPE_RE, lambda m: setattr(spec, 'storage_type', m.group(1))),
+        (_GPU_RE, lambda m: (setattr(spec, 'gpu_series', m.group(1)),
+                             setattr(spec, 'min_gpu_model', int(m.group(2)) if m.group(2) else None))),
+        (_DEDICATED_RE, lambda m: setattr(spec, 'gpu_dedicated', True)),
+        (_CPU_RE, lambda m: setattr(spec, 'cpu_family', m.group(1) or m.group(3) or f'ryzen {m.group(2)}')),
+        (_SCREEN_RE, lambda m: (setattr(spec, 'min_screen_in', float(m.group(1))),
+                                setattr(spec, 'max_screen_in', int(float(m.group(1))) + 0.99))),
+        (_REFRESH_RE, lambda m: setattr(spec, 'min_refresh_hz', int(m.group(1)) if m.group(1) else 120)),
+    ]
+    for pattern, apply in simple:
+        for match in pattern.finditer(text):
+            if free(match):
+                apply(match)
+                spans.append(match.span())
+                break
+
+    residual = []
+    position = 0
+    for start, end in sorted(spans):
+        residual.append(message[position:start])
+        position = max(position, end)
+    residual.append(message[position:])
+    return spec, ' '.join(part.strip(' ,;') for part in residual if part.strip(' ,;'))
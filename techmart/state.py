@@ -0,0 +1,276 @@
+"""Pluggable session state backends, so several app workers can share sessions
+
+Streamlit keeps ``st.session_state`` in the memory of the worker process
+that serves the browser tab. To run several workers behind a load balancer,
+the keys that make up a shopper's session (``SHARED_KEYS``) are mirrored to
+a backend that every worker can reach:
+
+- ``MemoryBackend`` keeps them in this process (one worker; a page reload
+  resumes the session)
+- ``SqliteBackend`` keeps them in a local SQLite database in WAL mode that
+  all workers on the host open
+
+``SessionSync`` does the mirroring for one session. ``pull`` at the start of
+a rerun is a single revision lookup unless another worker wrote since.
+``push`` at the end of a rerun writes only the keys that changed, all in
+one transaction. Carts and transcripts carry a revision counter, so an
+unchanged one is never serialized. Values are stored as compact JSON,
+zlib-compressed above ``COMPRESS_ABOVE`` bytes; chat HTML is re-rendered
+on load instead of being stored, and search filters keep their slots but
+not their candidate rows.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, MutableMapping, Optional, Tuple
+
+from techmart.cart import Cart
+from techmart.chat_history import ChatTranscript
+from techmart.filters import SearchFilters
+from techmart.metrics import count, span
+
+SHARED_KEYS = ('user_name', 'cart', 'chat_history', 'last_results', 'viewing_product', 'search_filters')
+
+DEFAULT_STATE_BACKEND = os.environ.get('TECHMART_STATE_BACKEND', 'memory')
+DEFAULT_STATE_DB = os.environ.get('TECHMART_STATE_DB', 'sessions.db')
+
+# Serialized values longer than this are zlib-compressed
+COMPRESS_ABOVE = 512
+
+# Sessions idle for longer than this (seconds) are purged
+STATE_TTL = 24 * 3600
+
+# Purge idle sessions once every this many saves
+PURGE_EVERY = 1000
+
+_JSON = b'j'
+_ZLIB = b'z'
+
+# key -> (to plain data, from plain data) for the keys that hold objects
+_CODECS = {
+    'cart': (Cart.to_state, Cart.from_state),
+    'chat_history': (ChatTranscript.to_state, ChatTranscript.from_state),
+    'search_filters': (SearchFilters.to_state, SearchFilters.from_state),
+}
+
+
+def encode(key: str, value: Any) -> bytes:
+    """Compact bytes for one shared key's value"""
+    codec = _CODECS.get(key)
+    data = json.dumps(codec[0](value) if codec else value, separators=(',', ':'), ensure_ascii=False).encode()
+    if len(data) > COMPRESS_ABOVE:
+        return _ZLIB + zlib.compress(data, 1)
+    return _JSON + data
+
+
+def decode(key: str, blob: bytes) -> Any:
+    """Inverse of ``encode``"""
+    blob = bytes(blob)
+    data = zlib.decompress(blob[1:]) if blob[:1] == _ZLIB else blob[1:]
+    value = json.loads(data)
+    codec = _CODECS.get(key)
+    return codec[1](value) if codec else value
+
+
+def _fingerprint(value: Any, blob: Optional[bytes] = None) -> Any:
+    """Cheap change marker: the revision of carts and transcripts, else the encoded bytes"""
+    revision = getattr(value, 'revision', None)
+    if revision is not None:
+        return id(value), revision
+    return blob
+
+
+class MemoryBackend:
+    """Serialized session state in this process: session id -> (revision, key -> bytes)"""
+
+    def __init__(self, ttl: float = STATE_TTL):
+        self.ttl = ttl
+        self._sessions: Dict[str, Tuple[int, float, Dict[str, bytes]]] = {}
+        self._lock = threading.Lock()
+        self._saves = 0
+
+    def revision(self, session_id: str) -> int:
+        entry = self._sessions.get(session_id)
+        return entry[0] if entry else 0
+
+    def load(self, session_id: str) -> Tuple[int, Dict[str, bytes]]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return (entry[0], dict(entry[2])) if entry else (0, {})
+
+    def save(self, session_id: str, changes: Dict[str, bytes]) -> Tuple[int, int]:
+        """Store ``changes``; returns ``(previous revision, new revision)``"""
+        now = time.time()
+        with self._lock:
+            previous, _, values = self._sessions.get(session_id, (0, now, {}))
+            values = {**values, **changes}
+            self._sessions[session_id] = (previous + 1, now, values)
+            self._saves += 1
+            if self._saves % PURGE_EVERY == 0:
+                self._purge(now)
+        return previous, previous + 1
+
+    def _purge(self, now: float) -> None:
+        for session_id in [sid for sid, (_, updated, _) in self._sessions.items() if now - updated > self.ttl]:
+            del self._sessions[session_id]
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_values (
+    session_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (session_id, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated);
+"""
+
+
+class SqliteBackend:
+    """Session state in a SQLite database (WAL) shared by every worker on the host"""
+
+    def __init__(self, path: str = DEFAULT_STATE_DB, ttl: float = STATE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._saves = 0
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; transactions are opened explicitly
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def revision(self, session_id: str) -> int:
+        row = self._conn().execute('SELECT revision FROM sessions WHERE session_id = ?', (session_id,)).fetchone()
+        return row[0] if row else 0
+
+    def load(self, session_id: str) -> Tuple[int, Dict[str, bytes]]:
+        conn = self._conn()
+        conn.execute('BEGIN')
+        try:
+            revision = self.revision(session_id)
+            rows = conn.execute('SELECT key, value FROM session_values WHERE session_id = ?', (session_id,)).fetchall()
+        finally:
+            conn.execute('COMMIT')
+        return revision, {key: bytes(value) for key, value in rows}
+
+    def save(self, session_id: str, changes: Dict[str, bytes]) -> Tuple[int, int]:
+        """Store ``changes`` in one transaction; returns ``(previous revision, new revision)``"""
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            previous = self.revision(session_id)
+            conn.executemany('INSERT OR REPLACE INTO session_values (session_id, key, value) VALUES (?, ?, ?)',
+                             [(session_id, key, blob) for key, blob in changes.items()])
+            conn.execute('INSERT OR REPLACE INTO sessions (session_id, revision, updated) VALUES (?, ?, ?)',
+                         (session_id, previous + 1, now))
+            self._saves += 1
+            if self._saves % PURGE_EVERY == 0:
+                self._purge(conn, now)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return previous, previous + 1
+
+    def _purge(self, conn: sqlite3.Connection, now: float) -> None:
+        stale = 'SELECT session_id FROM sessions WHERE updated < ?'
+        conn.execute(f'DELETE FROM session_values WHERE session_id IN ({stale})', (now - self.ttl,))
+        conn.execute('DELETE FROM sessions WHERE updated < ?', (now - self.ttl,))
+
+    def delete(self, session_id: str) -> None:
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('DELETE FROM session_values WHERE session_id = ?', (session_id,))
+        conn.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+        conn.execute('COMMIT')
+
+
+class SessionSync:
+    """Mirrors one session's shared keys between a state mapping and a backend"""
+
+    def __init__(self, backend, session_id: str):
+        self.backend = backend
+        self.session_id = session_id
+        # Backend revision this session last loaded or wrote (-1 forces a reload)
+        self.revision = 0
+        # key -> fingerprint of the value the backend holds
+        self._stored: Dict[str, Any] = {}
+
+    def pull(self, state: MutableMapping) -> bool:
+        """Load the shared keys into ``state`` if the backend has a newer revision"""
+        with span('state.pull'):
+            if self.backend.revision(self.session_id) == self.revision:
+                return False
+            self.revision, blobs = self.backend.load(self.session_id)
+            for key, blob in blobs.items():
+                value = decode(key, blob)
+                state[key] = value
+                self._stored[key] = _fingerprint(value, blob)
+        count('state.loaded')
+        return True
+
+    def push(self, state: MutableMapping) -> int:
+        """Write the shared keys that changed since the last pull/push; returns how many"""
+        with span('state.push'):
+            changes: Dict[str, bytes] = {}
+            for key in SHARED_KEYS:
+                if key not in state:
+                    continue
+                value = state[key]
+                blob = None
+                marker = _fingerprint(value)
+                if marker is None:
+                    blob = marker = encode(key, value)
+                if marker == self._stored.get(key):
+                    continue
+                changes[key] = blob if blob is not None else encode(key, value)
+                self._stored[key] = marker
+            if not changes:
+                return 0
+            expected = self.revision
+            previous, revision = self.backend.save(self.session_id, changes)
+            # Another worker wrote in between: reload everything on the next pull
+            self.revision = revision if previous == expected else -1
+        count('state.saved_keys', len(changes))
+        return len(changes)
+
+
+_backends: Dict[Tuple[str, str], Any] = {}
+_backends_lock = threading.Lock()
+
+
+def get_state_backend(name: str = DEFAULT_STATE_BACKEND, path: str = DEFAULT_STATE_DB):
+    """Process-wide backend by name: ``memory`` or ``sqlite`` (at ``path``)"""
+    key = (name, os.path.abspath(path) if name == 'sqlite' else '')
+    backend = _backends.get(key)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(key)
+            if backend is None:
+                if name == 'memory':
+                    backend = MemoryBackend()
+                elif name == 'sqlite':
+                    backend = SqliteBackend(path)
+                else:
+                    raise ValueError(f"Unknown state backend {name!r} (expected 'memory' or 'sqlite')")
+                _backends[key] = backend
+    return backend
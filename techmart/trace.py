@@ -0,0 +1,323 @@
+"""Opt-in recording of chat traffic and offline replay against the headless engine
+
+Set ``TECHMART_TRACE=traces.jsonl`` and the app (and the HTTP API) append
+one compact JSON line per chat message and per cart/view button action:
+the session (a hash of its id, never the id itself), the message or
+button action, the intent, the product ids shown, the events raised, a
+digest of the reply text and how long the bot logic took. Entries are
+queued, then hashed, serialized and written by a background thread, so
+recording adds a few microseconds to a request. Traces hold what shoppers typed in the chat;
+checkout details are never recorded.
+
+Replay drives ``ChatEngine`` with a trace at full speed, with sessions
+spread over a process pool (turns of one session stay in order in one
+worker), and reports the behavior diffs against the recording plus
+recorded and replayed latency percentiles::
+
+    python -m techmart.trace traces.jsonl --workers 4 --out report.json
+    python -m techmart.trace traces.jsonl --repeat 20      # 20x the sessions, as load
+    python -m techmart.trace traces.jsonl --check          # exit 1 on any behavior diff
+
+Each worker starts with full stock, so out-of-stock answers recorded late
+on a busy day replay as diffs.
+"""
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from techmart.catalog import get_catalog
+from techmart.engine import ChatEngine, SessionState
+from techmart.filters import SearchFilters
+from techmart.inventory import InventoryService
+from techmart.metrics import count, quantiles
+
+DEFAULT_TRACE = os.environ.get('TECHMART_TRACE', '')
+
+# Writer batching: flush after this many lines or this many seconds
+BATCH_SIZE = 256
+BATCH_INTERVAL = 0.2
+
+# Behavior diffs kept as examples in a replay report
+MAX_EXAMPLES = 20
+
+# Stock counts change between recording and replay; they are left out of the reply digest
+_VOLATILE_RE = re.compile(r'Stock: \d+ units')
+
+
+def session_key(session_id: str) -> str:
+    """Stable pseudonym for a session id (the id itself resumes the session, so it is never written)"""
+    return hashlib.blake2b(session_id.encode(), digest_size=6).hexdigest()
+
+
+def reply_digest(text: str) -> str:
+    """Short digest of a reply, ignoring live stock numbers"""
+    return hashlib.blake2b(_VOLATILE_RE.sub('Stock: # units', text).encode(), digest_size=6).hexdigest()
+
+
+class TraceRecorder:
+    """Append-only JSONL trace with a batching background writer"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: 'queue.Queue[tuple]' = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name='trace-writer', daemon=True)
+        self._writer.start()
+        # Don't lose lines still queued when the process exits
+        atexit.register(self.flush)
+
+    def message(self, session_id: str, message: str, response, seconds: float) -> None:
+        """Record a chat turn and the ``BotResponse`` it produced"""
+        # Hashing and JSON happen on the writer thread
+        self._queue.put(('msg', time.time(), session_id, message, response, seconds))
+
+    def action(self, session_id: str, action: str, product_id: Optional[int], events: Optional[Sequence] = None,
+               seconds: float = 0.0, quantity: Optional[int] = None) -> None:
+        """Record a button action (``cart``, ``view``, ``search_cart``, ``remove``...) on a product
+
+        ``events`` are the engine events it raised; leave it None for
+        actions that bypass the engine, so replay does not compare them.
+        """
+        self._queue.put(('btn', time.time(), session_id, action, product_id, events, seconds, quantity))
+
+    @staticmethod
+    def _entry(item: tuple) -> Dict[str, Any]:
+        """The trace line for a queued message or action"""
+        if item[0] == 'msg':
+            _, when, session_id, message, response, seconds = item
+            return {'t': round(when, 3), 's': session_key(session_id), 'k': 'msg', 'm': message,
+                    'i': response.intent, 'ids': list(response.product_ids),
+                    'e': [event.kind for event in response.events], 'h': reply_digest(response.text),
+                    'ms': round(seconds * 1000, 3)}
+        _, when, session_id, action, product_id, events, seconds, quantity = item
+        entry = {'t': round(when, 3), 's': session_key(session_id), 'k': 'btn', 'a': action, 'p': product_id,
+                 'ms': round(seconds * 1000, 3)}
+        if events is not None:
+            entry['e'] = [event.kind for event in events]
+        if quantity is not None:
+            entry['q'] = quantity
+        return entry
+
+    def _write_loop(self) -> None:
+        with open(self.path, 'a', encoding='utf-8') as out:
+            while True:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + BATCH_INTERVAL
+                while len(batch) < BATCH_SIZE:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                lines = [json.dumps(self._entry(item), separators=(',', ':'), ensure_ascii=False) + '\n'
+                         for item in batch]
+                if lines:
+                    out.writelines(lines)
+                    out.flush()
+                    count('trace.recorded', len(lines))
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every queued line is on disk"""
+        self._queue.join()
+
+
+_recorders: Dict[str, TraceRecorder] = {}
+_recorders_lock = threading.Lock()
+
+
+def get_trace_recorder(path: str = DEFAULT_TRACE) -> Optional[TraceRecorder]:
+    """Process-wide recorder for ``path``, or None when tracing is off (no path)"""
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    recorder = _recorders.get(path)
+    if recorder is None:
+        with _recorders_lock:
+            recorder = _recorders.get(path)
+            if recorder is None:
+                recorder = _recorders[path] = TraceRecorder(path)
+    return recorder
+
+
+def load_trace(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Trace lines grouped by session, in recorded order (unreadable lines are skipped)"""
+    sessions: Dict[str, List[Dict[str, Any]]] = {}
+    with open(path, encoding='utf-8') as lines:
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash
+                continue
+            sessions.setdefault(entry['s'], []).append(entry)
+    return sessions
+
+
+# Per replay worker, built once by the pool initializer (with its own stock)
+_engine: Optional[ChatEngine] = None
+
+
+def _init_worker(catalog_path: Optional[str]) -> None:
+    global _engine
+    catalog = get_catalog(catalog_path) if catalog_path else get_catalog()
+    _engine = ChatEngine(catalog, InventoryService(catalog))
+
+
+def _replay_entry(engine, state, entry: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+    """Run one recorded entry; returns what to compare and the seconds it took"""
+    start = time.perf_counter()
+    if entry['k'] == 'msg':
+        response = engine.process_message(state, entry['m'])
+        seconds = time.perf_counter() - start
+        return {'i': response.intent, 'ids': list(response.product_ids),
+                'e': [event.kind for event in response.events], 'h': reply_digest(response.text)}, seconds
+    action, product_id = entry['a'], entry['p']
+    events = []
+    if action == 'clear_cart':
+        events = [engine.set_quantity(state, line.product_id, 0) for line in list(state.cart)]
+    elif action.endswith('cart'):
+        events = [engine.add_to_cart(state, product_id)]
+    elif action == 'quantity':
+        # Same rules as POST /cart with a quantity
+        quantity = entry['q']
+        if product_id in state.cart:
+            events = [engine.set_quantity(state, product_id, quantity)]
+        elif quantity > 0:
+            events = [engine.add_to_cart(state, product_id)]
+            if events[0].kind == 'cart_add' and quantity > 1:
+                events.append(engine.set_quantity(state, product_id, quantity))
+    elif action in ('remove', 'increment', 'decrement'):
+        line = state.cart.get(product_id)
+        if line is not None:
+            quantity = {'remove': 0, 'increment': line.quantity + 1, 'decrement': line.quantity - 1}[action]
+            events = [engine.set_quantity(state, product_id, quantity)]
+    elif action.endswith('view'):
+        state.viewing_product = product_id
+    elif action == 'reset_filters':
+        state.search_filters = SearchFilters()
+    seconds = time.perf_counter() - start
+    return {'e': [event.kind for event in events]}, seconds
+
+
+def _replay_sessions(batch: List[Tuple[str, List[Dict[str, Any]]]]) -> Dict[str, Any]:
+    """Replay whole sessions in one worker; returns latencies and diffs"""
+    engine = _engine
+    latencies: Dict[str, List[Tuple[float, float]]] = {}
+    diffs: List[Dict[str, Any]] = []
+    events = 0
+    for session, entries in batch:
+        state = SessionState(session_id=session)
+        state.viewing_product = None
+        for index, entry in enumerate(entries):
+            replayed, seconds = _replay_entry(engine, state, entry)
+            events += 1
+            kind = f"message:{entry['i']}" if entry['k'] == 'msg' else f"button:{entry['a']}"
+            latencies.setdefault(kind, []).append((entry.get('ms', 0.0), seconds * 1000))
+            # Fields the recording lacks (events of actions outside the engine) are not compared
+            for field, value in replayed.items():
+                if field in entry and entry[field] != value:
+                    diffs.append({'session': session, 'index': index, 'field': field,
+                                  'input': entry.get('m', entry.get('a')), 'recorded': entry[field], 'replayed': value})
+    return {'events': events, 'latencies': latencies, 'diffs': diffs}
+
+
+def replay(path: str, workers: Optional[int] = None, repeat: int = 1,
+           catalog_path: Optional[str] = None) -> Dict[str, Any]:
+    """Replay the trace at ``path`` over a process pool and summarize diffs and latency"""
+    sessions = list(load_trace(path).items())
+    # Copies of each session under new names multiply the load with the same traffic shape
+    sessions = [(f"{session}.{copy}" if copy else session, entries)
+                for copy in range(max(1, repeat)) for session, entries in sessions]
+    workers = max(1, workers or os.cpu_count() or 1)
+    batches = [sessions[i::workers] for i in range(workers) if sessions[i::workers]]
+    start = time.perf_counter()
+    if len(batches) > 1:
+        with ProcessPoolExecutor(len(batches), initializer=_init_worker, initargs=(catalog_path,)) as pool:
+            results = list(pool.map(_replay_sessions, batches))
+    else:
+        _init_worker(catalog_path)
+        results = [_replay_sessions(batch) for batch in batches]
+    elapsed = time.perf_counter() - start
+    return summarize(results, len(sessions), len(batches), elapsed)
+
+
+def summarize(results: Iterable[Dict[str, Any]], sessions: int, workers: int, elapsed: float) -> Dict[str, Any]:
+    """Merge worker results into one report"""
+    latencies: Dict[str, List[Tuple[float, float]]] = {}
+    diffs: List[Dict[str, Any]] = []
+    events = 0
+    for result in results:
+        events += result['events']
+        diffs.extend(result['diffs'])
+        for kind, samples in result['latencies'].items():
+            latencies.setdefault(kind, []).extend(samples)
+    by_field: Dict[str, int] = {}
+    for diff in diffs:
+        by_field[diff['field']] = by_field.get(diff['field'], 0) + 1
+    latency = {}
+    for kind, samples in sorted(latencies.items()):
+        recorded = quantiles([ms for ms, _ in samples])
+        replayed = quantiles([ms for _, ms in samples])
+        latency[kind] = {'count': len(samples),
+                         'recorded_ms': dict(zip(('p50', 'p95', 'p99'), [round(ms, 3) for ms in recorded])),
+                         'replayed_ms': dict(zip(('p50', 'p95', 'p99'), [round(ms, 3) for ms in replayed]))}
+    return {
+        'events': events,
+        'sessions': sessions,
+        'workers': workers,
+        'seconds': round(elapsed, 3),
+        'events_per_second': round(events / elapsed, 1) if elapsed else 0.0,
+        'diffs': len(diffs),
+        'diffs_by_field': by_field,
+        'diff_examples': diffs[:MAX_EXAMPLES],
+        'latency': latency,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{report['events']} events from {report['sessions']} sessions on {report['workers']} workers "
+          f"in {report['seconds']}s ({report['events_per_second']} events/s)")
+    print(f"{'case':<28}{'count':>8}{'recorded p50/p95/p99 ms':>30}{'replayed p50/p95/p99 ms':>30}")
+    for kind, stats in report['latency'].items():
+        recorded = '/'.join(f"{ms:.2f}" for ms in stats['recorded_ms'].values())
+        replayed = '/'.join(f"{ms:.2f}" for ms in stats['replayed_ms'].values())
+        print(f"{kind:<28}{stats['count']:>8}{recorded:>30}{replayed:>30}")
+    print(f"behavior diffs: {report['diffs']} {report['diffs_by_field'] or ''}")
+    for diff in report['diff_examples']:
+        print(f"  {diff['session']}#{diff['index']} {diff['input']!r}: {diff['field']} "
+              f"{diff['recorded']!r} -> {diff['replayed']!r}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded chat trace against the chat engine")
+    parser.add_argument('trace', help="trace file written with TECHMART_TRACE set")
+    parser.add_argument('--workers', type=int, default=None, help="replay processes (default: one per core)")
+    parser.add_argument('--repeat', type=int, default=1, help="replay every session this many times, as load")
+    parser.add_argument('--catalog', default=None, help="products CSV to replay against (default: products.csv)")
+    parser.add_argument('--out', default=None, help="write the full report as JSON")
+    parser.add_argument('--check', action='store_true', help="exit 1 if any reply differs from the recording")
+    args = parser.parse_args()
+
+    report = replay(args.trace, args.workers, args.repeat, args.catalog)
+    print_report(report)
+    if args.out:
+        with open(args.out, 'w') as out:
+            json.dump(report, out, indent=2)
+    if args.check and report['diffs']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()